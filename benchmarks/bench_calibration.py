@@ -0,0 +1,179 @@
+"""Replay benchmark: how fast elo calibration finds the right puzzles vs rule_based.
+
+Simulated students (simulation.StudentModel, no learning) answer puzzles
+whose true difficulty also varies within a level: carrying/borrowing,
+bigger numbers and some per-puzzle noise make a puzzle up to about half
+a level harder or easier than its label says. Each method aims for the
+puzzle the student gets right TARGET of the time; the table shows how far
+the served puzzles' true success chance is from that, by answer number,
+and the median answer number from which a student is served within
++/-BAND of it five times running (and the share who never are). "cold" starts from the prior item ratings, "warm" from a
+bank that already replayed WARM_SESSIONS other students. Item rating
+quality is the rank correlation of item ratings with true difficulty.
+
+Run: python benchmarks/bench_calibration.py
+"""
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from adaptive_engine import AdaptiveEngine
+from calibration import LEVELS, CalibratedQueue, ItemBank, StudentCalibration
+from puzzle_generator import OP_ADD, OP_SUB, PuzzleGenerator, PuzzleQueue, problem_space
+from simulation.students import StudentModel
+from tracker import PerformanceTracker
+
+TARGET = 0.7
+BAND = 0.1
+STUDENTS = 500
+ANSWERS = 40
+WARM_SESSIONS = 2000
+WINDOWS = ((1, 5), (6, 10), (11, 20), (21, 40))
+
+
+def true_offsets(bank, seed=0):
+    """Per-item difficulty within its level, in levels (centred on 0)"""
+    rng = np.random.default_rng(seed)
+    offsets = np.empty(bank.size)
+    for level in LEVELS:
+        space = problem_space(level)
+        start = bank.offsets[level]
+        for i in range(space.size):
+            a, b, answer = space.num1[i], space.num2[i], space.answers[i]
+            op = space.family_ops[space.family[i]]
+            if op == OP_ADD:
+                carry = (a % 10) + (b % 10) >= 10
+            elif op == OP_SUB:
+                carry = (a % 10) < (b % 10)
+            else:
+                carry = False
+            offsets[start + i] = 0.25 * np.log10(max(answer, a, 2)) + 0.25 * carry
+        block = offsets[start:start + space.size]
+        block -= block.mean()
+        block += rng.normal(0, 0.15, space.size)
+    return offsets
+
+
+def make_students(n, seed):
+    rng = random.Random(seed)
+    return [StudentModel(skill=rng.uniform(0.2, 0.95), error_rate=0.05) for _ in range(n)]
+
+
+def play_rule_based(student, bank, offsets, seed):
+    """Served success chances for one rule_based session"""
+    queue = PuzzleQueue(PuzzleGenerator(seed=seed))
+    tracker = PerformanceTracker()
+    engine = AdaptiveEngine()
+    rng = random.Random(seed)
+    difficulty = 'Easy'
+    served = []
+    for _ in range(ANSWERS):
+        puzzle, answer = queue.next_puzzle(difficulty)
+        offset = offsets[bank.global_id(difficulty, puzzle.item)]
+        served.append(student.p_correct(difficulty, offset))
+        tracker.start_question()
+        user_answer, _ = student.answer(answer, difficulty, rng, offset)
+        tracker.record_answer(puzzle, user_answer, answer, difficulty)
+        difficulty = engine.adapt_difficulty(difficulty, tracker)
+    return served
+
+
+def play_elo(student, bank, offsets, seed):
+    """Served success chances for one elo session (updates the bank)"""
+    calibration = StudentCalibration(bank, start_difficulty='Easy', target_success=TARGET, seed=seed)
+    queue = CalibratedQueue(PuzzleGenerator(seed=seed), calibration)
+    rng = random.Random(seed)
+    served = []
+    for _ in range(ANSWERS):
+        puzzle, answer = queue.next_puzzle(None)
+        global_id = queue._last[1]
+        difficulty, offset = bank.level_of(global_id), offsets[global_id]
+        served.append(student.p_correct(difficulty, offset))
+        user_answer, _ = student.answer(answer, difficulty, rng, offset)
+        queue.record_result(difficulty, puzzle, user_answer == answer)
+    return served
+
+
+def converged_at(served):
+    """Answer number from which 5 answers in a row are within BAND of TARGET"""
+    run = 0
+    for i, p in enumerate(served):
+        run = run + 1 if abs(p - TARGET) <= BAND else 0
+        if run == 5:
+            return i - 3
+    return None
+
+
+def rank_correlation(a, b):
+    ranks_a = np.argsort(np.argsort(a))
+    ranks_b = np.argsort(np.argsort(b))
+    return float(np.corrcoef(ranks_a, ranks_b)[0, 1])
+
+
+def report(name, sessions):
+    served = np.array(sessions)
+    gaps = [np.abs(served[:, lo - 1:hi] - TARGET).mean() for lo, hi in WINDOWS]
+    converged = [converged_at(s) for s in sessions]
+    reached = [c for c in converged if c is not None]
+    median = f'{int(np.median(reached))}' if reached else '-'
+    print(f"{name:<16}" + ''.join(f"{g:>9.3f}" for g in gaps)
+          + f"{median:>12} {100 * (len(sessions) - len(reached)) / len(sessions):>9.1f}%")
+
+
+def main():
+    bank = ItemBank()
+    offsets = true_offsets(bank)
+    level_of = np.array([bank.levels[g] for g in range(bank.size)])
+    truth = level_of + offsets
+    students = make_students(STUDENTS, seed=1)
+    print(f"target success {TARGET}, {STUDENTS} students x {ANSWERS} answers")
+    print(f"{'':<16}" + ''.join(f"{f'{lo}-{hi}':>9}" for lo, hi in WINDOWS)
+          + f"{'converged@':>12} {'not in 40':>10}")
+    print(f"{'':<16}{'mean |p - target| by answer number':^36}")
+    
+    report('rule_based', [play_rule_based(s, bank, offsets, i) for i, s in enumerate(students)])
+    cold_corr = rank_correlation(np.array(bank.ratings), truth)
+    report('elo (cold bank)', [play_elo(s, ItemBank(), offsets, i) for i, s in enumerate(students)])
+    
+    warm = ItemBank()
+    start = time.perf_counter()
+    for i, s in enumerate(make_students(WARM_SESSIONS, seed=2)):
+        play_elo(s, warm, offsets, 10_000 + i)
+    warm_seconds = time.perf_counter() - start
+    report('elo (warm bank)', [play_elo(s, warm, offsets, i) for i, s in enumerate(students)])
+    
+    print()
+    print(f"item rating vs true difficulty (rank correlation): prior {cold_corr:.3f}, "
+          f"after {WARM_SESSIONS} sessions {rank_correlation(np.array(warm.ratings), truth):.3f}")
+    within = [
+        rank_correlation(np.array(warm.ratings)[level_of == k], offsets[level_of == k])
+        for k in range(len(LEVELS))
+    ]
+    prior = [
+        rank_correlation(np.array(bank.ratings)[level_of == k], offsets[level_of == k])
+        for k in range(len(LEVELS))
+    ]
+    print("within each level:  prior " + ', '.join(f'{c:.2f}' for c in prior)
+          + "   warm " + ', '.join(f'{c:.2f}' for c in within))
+    
+    n = WARM_SESSIONS * ANSWERS
+    print(f"replay: {n / warm_seconds:,.0f} answers/s including puzzle selection")
+    calibration = StudentCalibration(warm, seed=0)
+    start = time.perf_counter()
+    for i in range(20_000):
+        calibration.record(i % warm.size, i % 3 != 0)
+    update = (time.perf_counter() - start) / 20_000
+    start = time.perf_counter()
+    for _ in range(20_000):
+        warm.nearest(calibration.target(), calibration.seen)
+    lookup = (time.perf_counter() - start) / 20_000
+    print(f"per answer: rating update {update * 1e6:.2f} us, nearest item lookup {lookup * 1e6:.2f} us")
+
+
+if __name__ == '__main__':
+    main()
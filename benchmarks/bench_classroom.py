@@ -0,0 +1,123 @@
+"""Classroom dashboard refresh latency at 10k active sessions.
+
+10,000 simulated students in 400 classes answer through PerformanceTracker,
+which reports every answer to a ClassroomAggregator. Measures the cost the
+aggregator adds per answer, then the dashboard refresh (one class view and
+the all-classes overview) from aggregator snapshots, both right after
+new answers in every class and when nothing changed. "rescan" computes
+the same numbers from the trackers' raw records, as a dashboard without
+the aggregator would have to.
+
+Run: python benchmarks/bench_classroom.py
+"""
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from classroom import ALL_CLASSES, ClassroomAggregator
+from simulation.students import sample_students
+from tracker import PerformanceTracker
+
+SESSIONS = 10_000
+CLASS_SIZE = 25
+QUESTIONS = 20
+LEVELS = ['Easy', 'Medium', 'Hard']
+
+
+class Clock:
+    now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+
+def build(classroom, clock):
+    students = sample_students('mixed', SESSIONS, seed=0)
+    trackers = [
+        PerformanceTracker(clock=clock, classroom=classroom, class_id=f'class-{i // CLASS_SIZE:03d}',
+                           session_id=f's{i}')
+        for i in range(SESSIONS)
+    ]
+    levels = [0] * SESSIONS
+    rng = random.Random(0)
+    start = time.perf_counter()
+    for _ in range(QUESTIONS):
+        for i, (student, tracker) in enumerate(zip(students, trackers)):
+            difficulty = LEVELS[levels[i]]
+            tracker.start_question()
+            user_answer, response_time = student.answer(10, difficulty, rng)
+            clock.now += response_time / SESSIONS
+            is_correct, _ = tracker.record_answer('1 + 9', user_answer, 10, difficulty)
+            levels[i] = min(levels[i] + 1, 2) if is_correct and rng.random() < 0.2 else levels[i]
+    return trackers, time.perf_counter() - start
+
+
+def rescan(trackers):
+    """Dashboard numbers straight from raw records (the no-aggregator way)"""
+    times = []
+    correct = 0
+    by_difficulty = {}
+    for tracker in trackers:
+        for record in tracker.records:
+            times.append(record['response_time'])
+            correct += record['is_correct']
+            by_difficulty.setdefault(record['difficulty'], []).append(record['response_time'])
+    times.sort()
+    return correct / len(times), times[len(times) // 2], {
+        d: statistics.median(t) for d, t in by_difficulty.items()
+    }
+
+
+def timed(fn, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    clock = Clock()
+    trackers, with_aggregator = build(ClassroomAggregator(active_window=10 ** 9, clock=clock), clock)
+    _, without = build(None, Clock())
+    classroom = trackers[0].classroom
+    answers = SESSIONS * QUESTIONS
+    print(f"{SESSIONS:,} sessions in {SESSIONS // CLASS_SIZE} classes, {answers:,} answers")
+    print(f"record_answer: {without / answers * 1e6:.2f} us without aggregator,"
+          f" {with_aggregator / answers * 1e6:.2f} us with")
+    
+    one_class = 'class-000'
+    
+    def touch_every_class():
+        for i in range(0, SESSIONS, CLASS_SIZE):
+            trackers[i].start_question()
+            trackers[i].record_answer('1 + 9', 10, 10, 'Easy')
+    
+    def fresh(fn):
+        def run():
+            touch_every_class()
+            start = time.perf_counter()
+            fn()
+            return time.perf_counter() - start
+        return min(run() for _ in range(5)) * 1000
+    
+    print(f"\n{'dashboard refresh (ms)':<32} {'changed':>9} {'unchanged':>10} {'rescan':>9}")
+    class_trackers = trackers[:CLASS_SIZE]
+    print(f"{'one class (' + str(CLASS_SIZE) + ' students)':<32}"
+          f" {fresh(lambda: classroom.snapshot(one_class)):>9.3f}"
+          f" {timed(lambda: classroom.snapshot(one_class)):>10.3f}"
+          f" {timed(lambda: rescan(class_trackers)):>9.3f}")
+    overview = lambda: (classroom.snapshot(ALL_CLASSES), classroom.snapshots())
+    print(f"{'all classes (' + format(SESSIONS, ',') + ' students)':<32}"
+          f" {fresh(overview):>9.3f}"
+          f" {timed(overview):>10.3f}"
+          f" {timed(lambda: rescan(trackers), repeat=1):>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""Cold-start regression check and import profiler for the welcome screen.
+
+Each run starts a fresh interpreter that does what the first Streamlit
+script run does before the welcome screen renders: run every module-level
+import of src/main.py (read from the file, so new ones are checked too)
+and build the session objects (rule_based engine).
+    
+    python benchmarks/bench_cold_start.py               # regression check
+    python benchmarks/bench_cold_start.py --profile     # per-module import times
+
+The check fails (exit 1) if the median cold start exceeds --budget-ms or
+if any heavy dependency is imported on the welcome path.
+"""
+import argparse
+import ast
+import os
+import statistics
+import subprocess
+import sys
+
+SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+# Only needed by ml_based sessions, batch generation and the summary chart
+HEAVY_MODULES = ('numpy', 'pandas', 'sklearn', 'scipy', 'joblib')
+
+# Loaded by Streamlit before the script runs (and it imports pandas itself)
+FRAMEWORK_MODULES = ('streamlit',)
+
+
+def main_imports():
+    """The module-level imports of src/main.py, minus the framework"""
+    with open(os.path.join(SRC, 'main.py'), encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    statements = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            node.names = [a for a in node.names if a.name.split('.')[0] not in FRAMEWORK_MODULES]
+        elif not (isinstance(node, ast.ImportFrom)
+                  and node.module.split('.')[0] not in FRAMEWORK_MODULES):
+            continue
+        if node.names:
+            statements.append(ast.unparse(node))
+    return '\n'.join(statements)
+
+
+WELCOME_PATH = f"""
+import sys, time
+start = time.perf_counter()
+sys.path.insert(0, {SRC!r})
+{main_imports()}
+puzzle_gen = PuzzleGenerator()
+queue = PuzzleQueue(puzzle_gen)
+tracker = PerformanceTracker()
+engine = AdaptiveEngine(method='rule_based')
+elapsed = time.perf_counter() - start
+heavy = sorted({{m.split('.')[0] for m in sys.modules}} & set({HEAVY_MODULES!r}))
+print(repr({{'elapsed': elapsed, 'heavy': heavy}}))
+"""
+
+
+def run_once(extra_args=()):
+    result = subprocess.run(
+        [sys.executable, *extra_args, '-c', WELCOME_PATH],
+        capture_output=True, text=True, check=True
+    )
+    return ast.literal_eval(result.stdout), result.stderr
+
+
+def profile(top):
+    """Print the slowest imports on the welcome path (python -X importtime)"""
+    _, stderr = run_once(['-X', 'importtime'])
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        parts = line[len('import time:'):].split('|')
+        self_us, cumulative_us, name = int(parts[0]), int(parts[1]), parts[2].strip()
+        rows.append((cumulative_us, self_us, name))
+    
+    rows.sort(reverse=True)
+    print(f"{'module':<40} {'self (ms)':>10} {'cumulative (ms)':>16}")
+    for cumulative_us, self_us, name in rows[:top]:
+        print(f"{name:<40} {self_us / 1000:>10.2f} {cumulative_us / 1000:>16.2f}")
+
+
+def check(runs, budget_ms):
+    samples = []
+    heavy = []
+    for _ in range(runs):
+        result, _ = run_once()
+        samples.append(result['elapsed'] * 1000)
+        heavy = result['heavy']
+    
+    median = statistics.median(samples)
+    print(f"welcome-screen cold start: median {median:.1f} ms over {runs} runs (budget {budget_ms} ms)")
+    ok = True
+    if heavy:
+        print(f"FAIL: heavy modules imported on the welcome path: {', '.join(heavy)}")
+        ok = False
+    if median > budget_ms:
+        print(f"FAIL: cold start {median:.1f} ms exceeds budget {budget_ms} ms")
+        ok = False
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--profile', action='store_true', help='report import time per module')
+    parser.add_argument('--top', type=int, default=25, help='modules to show with --profile')
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--budget-ms', type=float, default=50.0)
+    args = parser.parse_args()
+    
+    if args.profile:
+        profile(args.top)
+        return
+    sys.exit(0 if check(args.runs, args.budget_ms) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""Columnar export vs JSON/CSV: export speed, file size and full-scan speed.
+
+Plays simulated sessions into PerformanceTrackers, then exports every
+answer three ways: the columnar format (export.py, straight from the
+AnswerLog arrays), a JSON list of the record dicts and a CSV of them.
+The scan computes accuracy and mean response time per difficulty over
+all answers: NumPy on the memory-mapped columns vs pandas DataFrames
+loaded from the JSON and CSV files (page cache warm for all three).
+
+Run: python benchmarks/bench_export.py [--answers 1000000]
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from export import ColumnarReader, ColumnarWriter
+from puzzle_generator import PuzzleGenerator
+from tracker import RECORD_FIELDS, PerformanceTracker
+
+ANSWERS_PER_SESSION = 50
+LEVELS = ('Easy', 'Medium', 'Hard')
+
+
+def play_sessions(n_answers):
+    rng = random.Random(0)
+    trackers = []
+    now = [0.0]
+    for s in range(n_answers // ANSWERS_PER_SESSION):
+        generator = PuzzleGenerator(seed=s)
+        tracker = PerformanceTracker(clock=lambda: now[0])
+        for _ in range(ANSWERS_PER_SESSION):
+            difficulty = LEVELS[rng.randrange(3)]
+            puzzle, answer = generator.generate_puzzle(difficulty)
+            tracker.start_question()
+            now[0] += rng.uniform(1, 20)
+            tracker.record_answer(puzzle, answer if rng.random() < 0.7 else answer + 1, answer, difficulty)
+        trackers.append(tracker)
+    return trackers
+
+
+def records(trackers):
+    for s, tracker in enumerate(trackers):
+        for seq, record in enumerate(tracker.records, 1):
+            record['session'] = f's{s:07d}'
+            record['seq'] = seq
+            yield record
+
+
+def export_columnar(trackers, path):
+    with ColumnarWriter(path) as writer:
+        for s, tracker in enumerate(trackers):
+            writer.append_tracker(f's{s:07d}', tracker)
+
+
+def export_json(trackers, path):
+    with open(path, 'w') as f:
+        json.dump(list(records(trackers)), f)
+
+
+def export_csv(trackers, path):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=('session', 'seq') + RECORD_FIELDS)
+        writer.writeheader()
+        writer.writerows(records(trackers))
+
+
+def scan_columnar(path):
+    data = ColumnarReader(path)
+    difficulty = data['difficulty']
+    counts = np.bincount(difficulty, minlength=len(data.difficulties))
+    correct = np.bincount(difficulty, weights=data['correct'], minlength=len(counts))
+    seconds = np.bincount(difficulty, weights=data['response_time'], minlength=len(counts))
+    return {name: (correct[k] / counts[k], seconds[k] / counts[k])
+            for k, name in enumerate(data.difficulties) if counts[k]}
+
+
+def _summarize(frame):
+    grouped = frame.groupby('difficulty')
+    accuracy = grouped['is_correct'].mean()
+    seconds = grouped['response_time'].mean()
+    return {name: (accuracy[name], seconds[name]) for name in accuracy.index}
+
+
+def scan_json(path):
+    with open(path) as f:
+        return _summarize(pd.DataFrame(json.load(f)))
+
+
+def scan_csv(path):
+    return _summarize(pd.read_csv(path))
+
+
+def size_mb(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)) / 2 ** 20
+    return os.path.getsize(path) / 2 ** 20
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--answers', type=int, default=1_000_000)
+    args = parser.parse_args()
+    
+    start = time.perf_counter()
+    trackers = play_sessions(args.answers)
+    n = sum(len(t.records) for t in trackers)
+    print(f"{n:,} answers in {len(trackers):,} sessions (played in {time.perf_counter() - start:.1f}s)")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        formats = [
+            ('columnar', export_columnar, scan_columnar, os.path.join(tmp, 'columnar')),
+            ('json', export_json, scan_json, os.path.join(tmp, 'answers.json')),
+            ('csv', export_csv, scan_csv, os.path.join(tmp, 'answers.csv')),
+        ]
+        print(f"{'format':<10} {'export s':>9} {'answers/s':>12} {'size MB':>8} {'scan s':>8} {'answers/s':>13}")
+        results = {}
+        for name, export, scan, path in formats:
+            export_seconds, _ = timed(export, trackers, path)
+            scan(path)  # warm the page cache
+            scan_seconds, results[name] = timed(scan, path)
+            print(f"{name:<10} {export_seconds:>9.2f} {n / export_seconds:>12,.0f} {size_mb(path):>8.1f} "
+                  f"{scan_seconds:>8.3f} {n / scan_seconds:>13,.0f}")
+    
+    for level in LEVELS:
+        columnar, csv_result = results['columnar'][level], results['csv'][level]
+        assert abs(columnar[0] - csv_result[0]) < 1e-9 and abs(columnar[1] - csv_result[1]) < 1e-2, level
+
+
+if __name__ == '__main__':
+    main()
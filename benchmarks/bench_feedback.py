@@ -0,0 +1,81 @@
+"""Load test: answers per second per process, blocking vs inline feedback.
+
+Each submitted answer is one script run executing quiz_flow.submit_answer
+on a worker thread. "blocking" also holds the run for FEEDBACK_SECONDS
+like the old time.sleep(2); "inline" returns immediately with the next
+question already prepared. WORKERS bounds the script-runner threads a
+single process can afford to keep busy.
+
+Run: python benchmarks/bench_feedback.py
+"""
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from adaptive_engine import AdaptiveEngine
+from puzzle_generator import PuzzleGenerator, PuzzleQueue
+from quiz_flow import FEEDBACK_SECONDS, prepare_next_question, submit_answer
+from tracker import PerformanceTracker
+
+SESSIONS = 1_000
+WORKERS = 32
+DURATION = 5.0
+
+
+def new_session(seed):
+    puzzle_gen = PuzzleGenerator(seed=seed)
+    state = SimpleNamespace(
+        stage='quiz', difficulty='Easy', question_count=0,
+        max_questions=10 ** 9, current_question=None, current_answer=None,
+        feedback=None, puzzle_gen=puzzle_gen, puzzle_queue=PuzzleQueue(puzzle_gen),
+        tracker=PerformanceTracker(), adaptive_engine=AdaptiveEngine('rule_based'),
+        lock=threading.Lock(), rng=random.Random(seed),
+    )
+    prepare_next_question(state)
+    return state
+
+
+def answer_run(state, blocking):
+    """One Streamlit script run triggered by the Submit button"""
+    with state.lock:
+        answer = state.current_answer if state.rng.random() < 0.7 else -1
+        submit_answer(state, answer, prepare_next=not blocking)
+        if blocking:
+            time.sleep(FEEDBACK_SECONDS)
+            prepare_next_question(state)
+
+
+def load_test(blocking):
+    sessions = [new_session(i) for i in range(SESSIONS)]
+    deadline = time.perf_counter() + DURATION
+    start = time.perf_counter()
+    
+    def worker(offset):
+        i = offset
+        count = 0
+        while time.perf_counter() < deadline:
+            answer_run(sessions[i % SESSIONS], blocking)
+            count += 1
+            i += WORKERS
+        return count
+    
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        done = sum(pool.map(worker, range(WORKERS)))
+    return done / (time.perf_counter() - start)
+
+
+def main():
+    print(f"{WORKERS} script threads, {SESSIONS} sessions, {DURATION:.0f}s per mode")
+    print(f"{'mode':<10} {'answers/s':>12}")
+    for name, blocking in (('blocking', True), ('inline', False)):
+        print(f"{name:<10} {load_test(blocking):>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
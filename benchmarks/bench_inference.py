@@ -0,0 +1,79 @@
+"""Difficulty decisions per second: per-call sklearn vs batched inference.
+
+Every simulated session asks for ROUNDS decisions. "per-call" runs
+model.predict on a 1x3 array per decision (the old _ml_based_adapt path);
+"fast path" is BatchingPredictor.predict with the default small-tree
+inline evaluation; "batched" forces every request through the batching
+worker (blocking callers), and "batched async" keeps all sessions'
+requests in flight at once via submit().
+
+Run: python benchmarks/bench_inference.py
+"""
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from inference import BatchingPredictor
+from model_registry import get_registry
+
+ROUNDS = 5
+MAX_THREADS = 256
+
+
+def random_features(rng):
+    return [rng.random(), rng.random(), rng.randint(0, 5)]
+
+
+def run_sessions(sessions, decide):
+    """Run `sessions` concurrent sessions on a bounded thread pool"""
+    def session(seed):
+        rng = random.Random(seed)
+        for _ in range(ROUNDS):
+            decide(random_features(rng))
+    
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=min(sessions, MAX_THREADS)) as pool:
+        wait([pool.submit(session, i) for i in range(sessions)])
+    elapsed = time.perf_counter() - start
+    return sessions * ROUNDS / elapsed
+
+
+def run_submitted(sessions, predictor):
+    """All sessions' requests in flight at once (non-blocking submit)"""
+    rng = random.Random(0)
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        futures = [predictor.submit(random_features(rng)) for _ in range(sessions)]
+        for future in futures:
+            future.result()
+    elapsed = time.perf_counter() - start
+    return sessions * ROUNDS / elapsed
+
+
+def main():
+    model = get_registry().get_model()
+    fast = BatchingPredictor()
+    predictor = BatchingPredictor(inline_small_trees=False)
+    
+    per_call = lambda f: model.predict(np.array([f]))[0]
+    
+    print(f"{'sessions':>8} {'per-call/s':>12} {'fast path/s':>12} {'batched/s':>12} {'batched async/s':>16}")
+    for sessions in (1, 100, 10_000):
+        print(
+            f"{sessions:>8}"
+            f" {run_sessions(sessions, per_call):>12.0f}"
+            f" {run_sessions(sessions, fast.predict):>12.0f}"
+            f" {run_sessions(sessions, predictor.predict):>12.0f}"
+            f" {run_submitted(sessions, predictor):>16.0f}"
+        )
+    print(f"avg batch size: {predictor.predictions / predictor.batches:.1f}")
+
+
+if __name__ == '__main__':
+    main()
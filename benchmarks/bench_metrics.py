@@ -0,0 +1,151 @@
+"""Instrumentation overhead.
+
+With MATH_ADAPTIVE_METRICS=1, timed functions are called bare and the
+sampler thread arms each one MATH_ADAPTIVE_METRICS_HZ times a second to
+time its next call. The overhead per answer is therefore the samples taken
+per answer times what a sampled call costs over a bare one, plus the CPU
+time the sampler thread used, spread over the answers. Reported for two
+paths:
+
+- library loop: simulated sessions calling generate + record + adapt
+  directly, nothing else per answer (the worst case);
+- served answer: GET puzzle + POST answer through the JSON API handlers
+  in-process (routing, JSON, speculation; no sockets).
+
+(Timing the whole loop with and without metrics in separate processes
+varies by more than the overhead on a shared machine.)
+
+Run: python benchmarks/bench_metrics.py
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+import timeit
+
+os.environ['MATH_ADAPTIVE_METRICS'] = '1'
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import metrics
+from server import QuizServer
+from simulation.runner import build_sessions
+
+CONFIG = {'population': 'mixed', 'method': 'rule_based', 'start_difficulty': 'Easy'}
+SESSIONS = 500
+QUESTIONS = 40
+ROUNDS = 5
+API_SESSIONS = 200
+
+
+class Probe:
+    @metrics.timed('probe')
+    def call(self, a, b):
+        pass
+    
+    @metrics.timed('probe_handler')
+    async def handle(self, a, b):
+        pass
+
+
+def play():
+    sessions = build_sessions(CONFIG, SESSIONS, 0)
+    start = time.perf_counter()
+    for _ in range(QUESTIONS):
+        for session in sessions:
+            session.step()
+    return time.perf_counter() - start
+
+
+async def serve_answers():
+    server = QuizServer()
+    start_body = json.dumps({'max_questions': QUESTIONS}).encode()
+    ids = []
+    for _ in range(API_SESSIONS):
+        _, payload = await server._respond('POST', '/sessions', start_body)
+        ids.append(payload['session_id'])
+    await asyncio.sleep(0)
+    elapsed = 0
+    for k in range(QUESTIONS):
+        answer = json.dumps({'answer': k % 7}).encode()
+        start = time.perf_counter_ns()
+        for session_id in ids:
+            server._encode(*await server._respond('GET', f'/sessions/{session_id}/puzzle', b''), True)
+            server._encode(*await server._respond('POST', f'/sessions/{session_id}/answer', answer), True)
+            await asyncio.sleep(0)  # let the speculation callbacks run
+        elapsed += time.perf_counter_ns() - start
+    server.pool.shutdown()
+    return elapsed
+
+
+def sampler_cpu_ns():
+    return time.clock_gettime_ns(time.pthread_getcpuclockid(metrics._sampler.ident))
+
+
+def sampled_call_cost(n=200_000):
+    """ns a sampled call (armed, then timed) costs over a bare one"""
+    probe = Probe()
+    site = next(s for s in metrics._sites if s.name == 'probe')
+    
+    def sampled():
+        for _ in range(n):
+            site.arm()
+            probe.call(1, 2)
+    
+    def bare():
+        for _ in range(n):
+            probe.call(1, 2)
+    
+    return (min(timeit.repeat(sampled, number=1, repeat=5))
+            - min(timeit.repeat(bare, number=1, repeat=5))) / n * 1e9
+
+
+def sampled_await_cost(n=100_000):
+    probe = Probe()
+    site = next(s for s in metrics._sites if s.name == 'probe_handler')
+    
+    async def loop(arm):
+        start = time.perf_counter_ns()
+        for _ in range(n):
+            if arm:
+                site.arm()
+            await probe.handle(1, 2)
+        return time.perf_counter_ns() - start
+    return (min(asyncio.run(loop(True)) for _ in range(5))
+            - min(asyncio.run(loop(False)) for _ in range(5))) / n
+
+
+def per_answer(run, answers):
+    """(ns per answer, samples per answer, handler samples per answer, sampler ns per answer)"""
+    metrics.reset()
+    sampler_start = sampler_cpu_ns()
+    ns = min(run() for _ in range(ROUNDS)) / answers
+    sampler_ns = (sampler_cpu_ns() - sampler_start) / (ROUNDS * answers)
+    histograms, _ = metrics.collect()
+    samples = sum(h.count for name, h in histograms.items() if not name.startswith('api_'))
+    handlers = sum(h.count for name, h in histograms.items() if name.startswith('api_'))
+    return ns, samples / (ROUNDS * answers), handlers / (ROUNDS * answers), sampler_ns
+
+
+def main():
+    paths = {
+        'library loop': per_answer(lambda: play() * 1e9, SESSIONS * QUESTIONS),
+        'served answer': per_answer(lambda: asyncio.run(serve_answers()), API_SESSIONS * QUESTIONS),
+    }
+    # The sampler must not arm the probes while their cost is measured
+    metrics._sampling.clear()
+    sample_cost = sampled_call_cost()
+    handler_cost = sampled_await_cost()
+    metrics._sampling.set()
+    
+    print(f"sampling {metrics.SAMPLE_HZ:g} times a second per function; a sampled call costs"
+          f" {sample_cost:.0f} ns over a bare one, a sampled handler {handler_cost:.0f} ns")
+    print(f"{'path':<14} {'per answer':>11} {'samples':>8} {'handlers':>9} {'sampler':>8} {'overhead':>15}")
+    for name, (ns, samples, handlers, sampler_ns) in paths.items():
+        overhead_ns = samples * sample_cost + handlers * handler_cost + sampler_ns
+        print(f"{name:<14} {ns / 1000:>8.2f} us {samples:>8.4f} {handlers:>9.4f} {sampler_ns:>5.0f} ns"
+              f" {overhead_ns:>6.0f} ns {overhead_ns / ns * 100:>4.2f}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Session-start latency and per-session memory for ml_based engines.
+
+"per-session fit" reproduces the old behaviour (every AdaptiveEngine fits
+and owns its own DecisionTreeClassifier); "shared registry" is the
+current one. Memory is what a session keeps alive in st.session_state:
+Python heap retained per engine (tracemalloc) and its pickled size, which
+also counts the tree's native arrays that tracemalloc cannot see.
+
+Run: python benchmarks/bench_model_registry.py
+"""
+import os
+import pickle
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from adaptive_engine import AdaptiveEngine
+from model_registry import fit_builtin_model, get_registry
+
+SESSIONS = 500
+
+
+class PerSessionFitEngine:
+    """Stand-in for the old engine: one fitted tree per session"""
+    
+    def __init__(self):
+        self.method = 'ml_based'
+        self.ml_model = fit_builtin_model()
+
+
+def measure(factory):
+    start = time.perf_counter()
+    for _ in range(SESSIONS):
+        factory()
+    latency = (time.perf_counter() - start) / SESSIONS
+    
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    engines = [factory() for _ in range(SESSIONS)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    retained = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    pickled = len(pickle.dumps(engines[0]))
+    del engines
+    return latency, retained / SESSIONS, pickled
+
+
+def main():
+    get_registry().get_model()  # registry warm-up happens once per process
+    
+    rows = [
+        ('per-session fit', measure(PerSessionFitEngine)),
+        ('shared registry', measure(lambda: AdaptiveEngine(method='ml_based'))),
+    ]
+    print(f"{'mode':<18} {'start (us)':>12} {'heap B/session':>15} {'pickled B':>10}")
+    for name, (latency, per_session, pickled) in rows:
+        print(f"{name:<18} {latency * 1e6:>12.1f} {per_session:>15.0f} {pickled:>10}")
+
+
+if __name__ == '__main__':
+    main()
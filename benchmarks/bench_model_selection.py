@@ -0,0 +1,51 @@
+"""Model selection: extract/evaluate time and worker memory vs worker count.
+
+Builds a synthetic answer log (see bench_training.py), then runs the
+full candidate sweep of model_selection.py with 1 worker and with every
+core. Workers map the same feature columns, so peak worker memory should
+stay well below "columns x workers".
+
+Run: python benchmarks/bench_model_selection.py [--answers 250000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from bench_training import build_log
+from model_selection import select_model
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--answers', type=int, default=250_000)
+    args = parser.parse_args()
+    cores = os.cpu_count() or 1
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'log.db')
+        start = time.perf_counter()
+        build_log(path, args.answers)
+        print(f"{args.answers:,} answers ({os.path.getsize(path) / 2 ** 20:.0f} MB log, "
+              f"built in {time.perf_counter() - start:.1f}s)")
+        
+        print(f"{'workers':>8} {'extract s':>10} {'evaluate s':>11} {'columns MB':>11} {'peak worker MB':>15}")
+        for workers in sorted({1, cores}):
+            report = select_model(path, version=f'bench-{workers}', workers=workers,
+                                  model_dir=os.path.join(tmp, 'models'))
+            extract, evaluate = report['stages']['extract'], report['stages']['evaluate']
+            print(f"{workers:>8} {extract['seconds']:>10.2f} {evaluate['seconds']:>11.2f} "
+                  f"{extract['column_mb']:>11.1f} {evaluate['peak_worker_rss_mb']:>15.1f}")
+        
+        print(f"\nwinner: {report['winner']}")
+        print(f"{'candidate':<20} {'accuracy':>9} {'coverage':>9} {'in flow':>8} {'latency us':>11}")
+        for r in report['candidates']:
+            print(f"{r['name']:<20} {r['accuracy']:>9.3f} {r['coverage']:>9.3f} "
+                  f"{r['time_in_flow'] or 0:>8.3f} {r['latency_us']:>11.2f}")
+
+
+if __name__ == '__main__':
+    main()
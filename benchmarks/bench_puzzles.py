@@ -0,0 +1,60 @@
+"""Puzzle generation throughput (one-at-a-time vs generate_batch) and how
+often a session sees the same problem twice, sampling with replacement
+(no_repeat=False) vs the default no-repeat sampler.
+
+Run: python benchmarks/bench_puzzles.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from puzzle_generator import PuzzleGenerator
+
+N = 100_000
+BATCH = 1_000
+SESSIONS = 1_000
+QUESTIONS = 20
+
+
+def single(gen, difficulty):
+    start = time.perf_counter()
+    for _ in range(N):
+        gen.generate_puzzle(difficulty)
+    return N / (time.perf_counter() - start)
+
+
+def batched(gen, difficulty):
+    start = time.perf_counter()
+    for _ in range(N // BATCH):
+        gen.generate_batch(difficulty, BATCH)
+    return N / (time.perf_counter() - start)
+
+
+def repeats_per_session(difficulty, no_repeat):
+    repeats = 0
+    for seed in range(SESSIONS):
+        gen = PuzzleGenerator(seed=seed, no_repeat=no_repeat)
+        problems = [(p.num1, p.num2, p.op) for p, _ in gen.generate_batch(difficulty, QUESTIONS)]
+        repeats += QUESTIONS - len(set(problems))
+    return repeats / SESSIONS
+
+
+def main():
+    gen = PuzzleGenerator(seed=0)
+    print(f"{'difficulty':<10} {'single/s':>12} {'batched/s':>12} {'speedup':>8}")
+    for difficulty in ('Easy', 'Medium', 'Hard'):
+        one = single(gen, difficulty)
+        many = batched(gen, difficulty)
+        print(f"{difficulty:<10} {one:>12.0f} {many:>12.0f} {many / one:>7.1f}x")
+    
+    print(f"\nrepeated problems per {QUESTIONS}-question session")
+    print(f"{'difficulty':<10} {'replacement':>12} {'no-repeat':>12}")
+    for difficulty in ('Easy', 'Medium', 'Hard'):
+        print(f"{difficulty:<10} {repeats_per_session(difficulty, False):>12.2f}"
+              f" {repeats_per_session(difficulty, True):>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
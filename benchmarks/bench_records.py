@@ -0,0 +1,74 @@
+"""Memory per 10k answer records: dict records vs the compact AnswerLog.
+
+"dicts" is the previous PerformanceTracker.records format, one dict per
+answer holding the rendered question string; "compact" is AnswerLog,
+which keeps puzzle codes in typed arrays and renders questions on
+demand. Puzzles come from the real generator, so Easy records include
+the repeated-emoji questions.
+
+Run: python benchmarks/bench_records.py
+"""
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from puzzle_generator import PuzzleGenerator, PuzzleQueue
+from tracker import AnswerLog
+
+RECORDS = 10_000
+
+
+def answers(difficulty):
+    queue = PuzzleQueue(PuzzleGenerator(seed=0))
+    rng = random.Random(0)
+    for _ in range(RECORDS):
+        puzzle, answer = queue.next_puzzle(difficulty)
+        user_answer = answer if rng.random() < 0.7 else answer + 1
+        yield puzzle, user_answer, answer, user_answer == answer, round(rng.uniform(1, 20), 2), difficulty
+
+
+def dict_records(difficulty):
+    return [
+        {
+            'question': str(puzzle),
+            'user_answer': user_answer,
+            'correct_answer': answer,
+            'is_correct': is_correct,
+            'response_time': response_time,
+            'difficulty': difficulty,
+        }
+        for puzzle, user_answer, answer, is_correct, response_time, difficulty in answers(difficulty)
+    ]
+
+
+def compact_records(difficulty):
+    log = AnswerLog()
+    for row in answers(difficulty):
+        log.append(*row)
+    return log
+
+
+def measure(build, difficulty):
+    """Bytes still allocated by the records once they are built"""
+    tracemalloc.start()
+    records = build(difficulty)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del records
+    return size
+
+
+def main():
+    print(f"memory per {RECORDS:,} records")
+    print(f"{'difficulty':>10} {'dicts KB':>10} {'compact KB':>11} {'ratio':>7}")
+    for difficulty in ('Easy', 'Medium', 'Hard'):
+        before = measure(dict_records, difficulty)
+        after = measure(compact_records, difficulty)
+        print(f"{difficulty:>10} {before / 1024:>10.0f} {after / 1024:>11.0f} {before / after:>6.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Rule-based adaptation: per-answer decision cost and bulk replay speed.
+
+"if/elif" is the previous _rule_based_adapt (list slice of the tracker's
+recent answers plus nested conditions); "table" is the compiled RuleTable
+lookup used now. Replay evaluates the rules for many students at once.
+
+Run: python benchmarks/bench_rules.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from adaptive_engine import AdaptiveEngine
+from tracker import PerformanceTracker
+
+DECISIONS = 200_000
+STUDENTS = 100_000
+ANSWERS = 50
+
+
+def if_elif_adapt(current_difficulty, tracker):
+    recent_streak = tracker.get_recent_streak(3)
+    if len(recent_streak) < 3:
+        return current_difficulty
+    if all(recent_streak):
+        if current_difficulty == 'Easy':
+            return 'Medium'
+        elif current_difficulty == 'Medium':
+            return 'Hard'
+    if len([x for x in recent_streak[-2:] if not x]) >= 2:
+        if current_difficulty == 'Hard':
+            return 'Medium'
+        elif current_difficulty == 'Medium':
+            return 'Easy'
+    return current_difficulty
+
+
+def per_answer(decide):
+    tracker = PerformanceTracker()
+    for k in range(10):
+        tracker.start_question()
+        tracker.record_answer('q', k % 2, 1, 'Medium')
+    start = time.perf_counter()
+    for _ in range(DECISIONS):
+        decide('Medium', tracker)
+    return (time.perf_counter() - start) / DECISIONS
+
+
+def main():
+    engine = AdaptiveEngine('rule_based')
+    old = per_answer(if_elif_adapt)
+    new = per_answer(engine.adapt_difficulty)
+    print(f"per decision: if/elif {old * 1e9:.0f} ns, table {new * 1e9:.0f} ns")
+    
+    rng = np.random.default_rng(0)
+    correct = rng.random((STUDENTS, ANSWERS)) < 0.65
+    start = time.perf_counter()
+    engine.rules.replay(correct)
+    elapsed = time.perf_counter() - start
+    print(f"replay {STUDENTS:,} students x {ANSWERS} answers: {elapsed:.2f}s"
+          f" ({STUDENTS * ANSWERS / elapsed / 1e6:.1f}M decisions/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+"""Load test for the JSON API: requests/s and latency with 10k live sessions.
+
+Starts server.py in a child process and drives it from an asyncio client
+over CONNECTIONS keep-alive connections. All sessions are started first,
+then every session takes one question per round (GET puzzle, POST
+answer) until all are finished, so the whole population stays live
+together; finally each session's summary is fetched. A share of the
+sessions is ml_based, whose answers go through the server's thread pool.
+
+Run: python benchmarks/bench_server.py [--sessions 10000] [--connections 500] [--ml-share 0.1]
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from server import QuizServer
+
+QUESTIONS = 10
+
+
+def run_server(port, ready):
+    asyncio.run(QuizServer(ml_workers=4).serve('127.0.0.1', port, ready))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def rss_mb(pid):
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return float('nan')
+
+
+class Connection:
+    """Minimal keep-alive HTTP/1.1 JSON client"""
+    
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+    
+    @classmethod
+    async def open(cls, port):
+        return cls(*await asyncio.open_connection('127.0.0.1', port))
+    
+    async def request(self, method, path, payload=None):
+        body = json.dumps(payload).encode() if payload is not None else b''
+        self.writer.write(
+            f'{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n'.encode()
+            + body
+        )
+        head = await self.reader.readuntil(b'\r\n\r\n')
+        status = int(head[9:12])
+        length = int(head.lower().split(b'content-length:')[1].split(b'\r\n')[0])
+        return status, json.loads(await self.reader.readexactly(length))
+    
+    def close(self):
+        self.writer.close()
+
+
+async def drive(port, n_sessions, n_connections, ml_share):
+    connections = [await Connection.open(port) for _ in range(n_connections)]
+    rng = random.Random(0)
+    methods = ['ml_based' if rng.random() < ml_share else 'rule_based' for _ in range(n_sessions)]
+    latencies = {}
+    
+    async def timed(conn, name, method, path, payload=None):
+        start = time.perf_counter()
+        status, body = await conn.request(method, path, payload)
+        latencies.setdefault(name, []).append(time.perf_counter() - start)
+        if status >= 400:
+            raise RuntimeError(f'{method} {path}: {status} {body}')
+        return body
+    
+    async def run_phase(work):
+        """Spread work(conn, session_index) over the connections"""
+        async def worker(k, conn):
+            for i in range(k, n_sessions, n_connections):
+                await work(conn, i)
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(k, conn) for k, conn in enumerate(connections)))
+        return time.perf_counter() - start
+    
+    ids = [None] * n_sessions
+    
+    async def start(conn, i):
+        body = await timed(conn, 'start session', 'POST', '/sessions',
+                           {'name': f'kid{i}', 'method': methods[i], 'max_questions': QUESTIONS})
+        ids[i] = body['session_id']
+    
+    async def answer_one(conn, i):
+        await timed(conn, 'next puzzle', 'GET', f'/sessions/{ids[i]}/puzzle')
+        await timed(conn, f'submit ({methods[i]})', 'POST', f'/sessions/{ids[i]}/answer',
+                    {'answer': rng.randrange(20)})
+    
+    async def summary(conn, i):
+        await timed(conn, 'summary', 'GET', f'/sessions/{ids[i]}/summary')
+    
+    seconds = {'start': await run_phase(start)}
+    health = (await connections[0].request('GET', '/health'))[1]
+    seconds['quiz'] = 0.0
+    for _ in range(QUESTIONS):
+        seconds['quiz'] += await run_phase(answer_one)
+    seconds['summary'] = await run_phase(summary)
+    for conn in connections:
+        conn.close()
+    return latencies, seconds, health
+
+
+async def warm_up(port):
+    conn = await Connection.open(port)
+    await conn.request('POST', '/sessions', {'method': 'ml_based'})
+    conn.close()
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sessions', type=int, default=10_000)
+    parser.add_argument('--connections', type=int, default=500)
+    parser.add_argument('--ml-share', type=float, default=0.1)
+    args = parser.parse_args()
+    
+    port = free_port()
+    ready = multiprocessing.Event()
+    server = multiprocessing.Process(target=run_server, args=(port, ready), daemon=True)
+    server.start()
+    ready.wait(60)
+    if args.ml_share:
+        asyncio.run(warm_up(port))  # load the ML model before measuring memory
+    idle_mb = rss_mb(server.pid)
+    try:
+        latencies, seconds, health = asyncio.run(
+            drive(port, args.sessions, args.connections, args.ml_share)
+        )
+        live_mb = rss_mb(server.pid)
+    finally:
+        server.terminate()
+        server.join()
+    
+    total = sum(len(v) for v in latencies.values())
+    elapsed = sum(seconds.values())
+    print(f"{args.sessions:,} sessions ({args.ml_share:.0%} ml_based) x {QUESTIONS} questions "
+          f"over {args.connections} connections, {os.cpu_count()} CPU(s)")
+    print(f"{total:,} requests in {elapsed:.1f}s: {total / elapsed:,.0f} requests/s "
+          f"(quiz phase {2 * QUESTIONS * args.sessions / seconds['quiz']:,.0f}/s)")
+    print(f"server RSS {idle_mb:.0f} MB idle, {live_mb:.0f} MB with {health['sessions']:,} live sessions "
+          f"({(live_mb - idle_mb) * 1024 / max(health['sessions'] - 1, 1):.1f} KB per session)")
+    print(f"{'endpoint':<22} {'requests':>9} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for name, values in latencies.items():
+        print(f"{name:<22} {len(values):>9,} {percentile(values, 0.5) * 1e3:>8.2f} "
+              f"{percentile(values, 0.99) * 1e3:>8.2f} {max(values) * 1e3:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Submit-to-next-question latency, with and without speculation.
+
+Times quiz_flow.submit_answer up to the next question being ready
+(record, adapt, next puzzle) for simulated sessions. "speculative" runs
+quiz_flow.speculate while the child is thinking, so submit only commits
+the matching branch; its cost is shown separately because it is off the
+critical path. "discarded" runs speculate too but throws the result
+away, so submit recomputes the difficulty: it is the like-for-like
+control for "speculative", with the same work (and cache state) just
+before each submit. ml_based uses the built-in decision tree; the
+logistic row is a model speculation can't handle, so it falls back to
+predicting on submit (through the batching predictor).
+
+Run: python benchmarks/bench_speculation.py
+"""
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from adaptive_engine import AdaptiveEngine
+from classroom import ClassroomAggregator
+from puzzle_generator import PuzzleGenerator, PuzzleQueue
+from quiz_flow import prepare_next_question, speculate, submit_answer
+from tracker import PerformanceTracker
+
+SESSIONS = 300
+QUESTIONS = 30
+
+
+def register_logistic():
+    import numpy as np
+    from sklearn.linear_model import LogisticRegression
+    from model_registry import get_registry
+    rng = np.random.default_rng(0)
+    X = rng.random((2000, 3)) * [1, 1, 5]
+    y = np.clip((2 * X[:, 0] + (1 - X[:, 1]) + X[:, 2] / 5) // 1.2, 0, 2).astype(int)
+    get_registry().register('bench-logistic', LogisticRegression(max_iter=500).fit(X, y))
+    return 'bench-logistic'
+
+
+def run(method, version, mode):
+    """Per-answer submit latencies and speculate() costs, in ns"""
+    classroom = ClassroomAggregator()
+    submit_ns, speculate_ns = [], []
+    for seed in range(SESSIONS):
+        now = [0.0]
+        rng = random.Random(seed)
+        state = SimpleNamespace(
+            stage='quiz', difficulty='Easy', question_count=0, max_questions=QUESTIONS,
+            current_question=None, current_answer=None, feedback=None, speculation=None,
+            puzzle_queue=PuzzleQueue(PuzzleGenerator(seed=seed)),
+            tracker=PerformanceTracker(clock=lambda: now[0], classroom=classroom),
+            adaptive_engine=AdaptiveEngine(method, model_version=version),
+        )
+        prepare_next_question(state)
+        while state.stage == 'quiz':
+            if mode != 'baseline':
+                start = time.perf_counter_ns()
+                speculate(state)
+                speculate_ns.append(time.perf_counter_ns() - start)
+                if mode == 'discarded':
+                    state.speculation = None
+            now[0] += rng.uniform(2, 30)
+            answer = state.current_answer if rng.random() < 0.7 else -1
+            start = time.perf_counter_ns()
+            submit_answer(state, answer)
+            submit_ns.append(time.perf_counter_ns() - start)
+    return submit_ns, speculate_ns
+
+
+def stats(values):
+    ordered = sorted(values)
+    return (ordered[len(ordered) // 2] / 1e3, ordered[int(0.99 * len(ordered))] / 1e3,
+            sum(ordered) / len(ordered) / 1e3)
+
+
+def main():
+    modes = [('rule_based', None), ('ml_based', None), ('ml_based', register_logistic())]
+    print(f"{SESSIONS} sessions x {QUESTIONS} answers; submit -> next question ready, in us")
+    print(f"{'mode':<24} {'':<12} {'p50':>7} {'p99':>7} {'mean':>7} {'speculate mean':>15}")
+    for method, version in modes:
+        run(method, version, 'speculative')  # warm-up (model load, caches)
+        name = method + (f' ({version})' if version else '')
+        for mode in ('baseline', 'discarded', 'speculative'):
+            submit_ns, speculate_ns = run(method, version, mode)
+            p50, p99, mean = stats(submit_ns)
+            extra = f"{stats(speculate_ns)[2]:>15.2f}" if speculate_ns else ''
+            print(f"{name:<24} {mode:<12} {p50:>7.2f} {p99:>7.2f} {mean:>7.2f} {extra}")
+
+
+if __name__ == '__main__':
+    main()
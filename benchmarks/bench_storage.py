@@ -0,0 +1,101 @@
+"""Tracker storage: write throughput and recovery time.
+
+Writes: one commit (and WAL fsync) per answer vs group commit, with
+SESSIONS threads answering concurrently. Recovery: RECOVERY_ANSWERS
+answers spread over RECOVERY_SESSIONS sessions, then rehydrating the
+running state from snapshot + log tail vs replaying the full log.
+
+Run: python benchmarks/bench_storage.py
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from storage import SQLiteStore
+from tracker import PerformanceTracker
+
+SESSIONS = 32
+ANSWERS_PER_SESSION = 200
+RECOVERY_ANSWERS = 1_000_000
+RECOVERY_SESSIONS = 1_000
+
+
+def record(rng):
+    correct = rng.randint(1, 10)
+    answer = correct if rng.random() < 0.7 else correct + 1
+    return {
+        'question': f'🧮 {correct} + 0', 'user_answer': answer, 'correct_answer': correct,
+        'is_correct': answer == correct, 'response_time': round(rng.uniform(1, 20), 2),
+        'difficulty': rng.choice(['Easy', 'Medium', 'Hard'])
+    }
+
+
+def write_throughput(store, commit_each):
+    def session(i):
+        rng = random.Random(i)
+        for seq in range(1, ANSWERS_PER_SESSION + 1):
+            store.append(f's{i}', seq, record(rng))
+            if commit_each:
+                store.flush()
+    
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=SESSIONS) as pool:
+        list(pool.map(session, range(SESSIONS)))
+    store.flush()
+    return SESSIONS * ANSWERS_PER_SESSION / (time.perf_counter() - start)
+
+
+def populate(store):
+    per_session = RECOVERY_ANSWERS // RECOVERY_SESSIONS
+    start = time.perf_counter()
+    for i in range(RECOVERY_SESSIONS):
+        rng = random.Random(i)
+        tracker = PerformanceTracker(store=store, session_id=f'r{i}')
+        for _ in range(per_session):
+            r = record(rng)
+            tracker.start_question()
+            tracker.record_answer(r['question'], r['user_answer'], r['correct_answer'], r['difficulty'])
+        tracker.records.clear()
+    store.flush()
+    return RECOVERY_ANSWERS / (time.perf_counter() - start)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"writes, {SESSIONS} concurrent sessions:")
+        store = SQLiteStore(os.path.join(tmp, 'each.db'), max_batch=1)
+        print(f"  commit per answer   {write_throughput(store, True):>10.0f} answers/s")
+        store.close()
+        store = SQLiteStore(os.path.join(tmp, 'group.db'))
+        print(f"  group commit        {write_throughput(store, False):>10.0f} answers/s")
+        store.close()
+        
+        store = SQLiteStore(os.path.join(tmp, 'recovery.db'))
+        rate = populate(store)
+        print(f"\n{RECOVERY_ANSWERS:,} answers stored via PerformanceTracker: {rate:.0f} answers/s")
+        
+        one_snapshot = timed(lambda: PerformanceTracker.restore(store, 'r0'))
+        one_full = timed(lambda: PerformanceTracker.restore(store, 'r0', with_records=True))
+        all_snapshot = timed(lambda: [PerformanceTracker.restore(store, f'r{i}') for i in range(RECOVERY_SESSIONS)])
+        all_full = timed(lambda: [PerformanceTracker.restore(store, f'r{i}', with_records=True)
+                                  for i in range(RECOVERY_SESSIONS)])
+        store.close()
+    
+    print("recovery                 snapshot+tail   full log")
+    print(f"  one session            {one_snapshot * 1e3:>10.2f} ms {one_full * 1e3:>8.2f} ms")
+    print(f"  all {RECOVERY_SESSIONS} sessions       {all_snapshot:>10.2f} s  {all_full:>8.2f} s")
+
+
+if __name__ == '__main__':
+    main()
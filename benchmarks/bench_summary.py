@@ -0,0 +1,76 @@
+"""Microbenchmark: cost of one summary screen rerun.
+
+A Streamlit rerun of the summary screen reads the summary, the level
+recommendation and the chart series. Before caching that meant two
+get_summary calls and a DataFrame of every record; now the summary and
+the (downsampled) chart series are computed on the first render after an
+answer ("first") and reused by every rerun. Also reports the chart
+payload (bars sent to the page).
+
+Run: python benchmarks/bench_summary.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from adaptive_engine import AdaptiveEngine
+from puzzle_generator import PuzzleGenerator
+from tracker import PerformanceTracker
+
+
+def session(n_answers):
+    tracker = PerformanceTracker()
+    generator = PuzzleGenerator(seed=0)
+    rng = random.Random(0)
+    for _ in range(n_answers):
+        puzzle, correct_answer = generator.generate_puzzle('Medium')
+        tracker.start_question()
+        answer = correct_answer if rng.random() < 0.7 else correct_answer + 1
+        tracker.record_answer(puzzle, answer, correct_answer, 'Medium')
+    return tracker
+
+
+def rerun_uncached(tracker, engine):
+    summary = tracker.get_summary()
+    engine.recommend_next_level(tracker)
+    df = tracker.to_dataframe()
+    chart = df['is_correct'].astype(int)
+    return summary, len(chart)
+
+
+def rerun_cached(tracker, engine):
+    summary = tracker.get_summary()
+    engine.recommend_next_level(tracker, summary)
+    chart = tracker.chart_data()
+    return summary, len(chart['correct'])
+
+
+def per_rerun(fn, tracker, engine, reruns):
+    start = time.perf_counter()
+    for _ in range(reruns):
+        # Uncached: what every rerun cost before (no answer in between)
+        if fn is rerun_uncached:
+            tracker._summary_cache = (-1, None)
+        _, bars = fn(tracker, engine)
+    return (time.perf_counter() - start) / reruns, bars
+
+
+def main():
+    engine = AdaptiveEngine()
+    rerun_uncached(session(1), engine)  # import pandas outside the timings
+    print(f"{'answers':>8} {'uncached ms':>12} {'bars':>6} {'first ms':>9} {'cached ms':>10} {'bars':>6}")
+    for n in (20, 1_000, 10_000):
+        tracker = session(n)
+        reruns = max(3, 2_000 // n)
+        uncached, uncached_bars = per_rerun(rerun_uncached, tracker, engine, reruns)
+        first, _ = per_rerun(rerun_cached, tracker, engine, 1)
+        cached, cached_bars = per_rerun(rerun_cached, tracker, engine, max(reruns, 100))
+        print(f"{n:>8} {uncached * 1e3:>12.3f} {uncached_bars:>6} "
+              f"{first * 1e3:>9.3f} {cached * 1e3:>10.4f} {cached_bars:>6}")
+
+
+if __name__ == '__main__':
+    main()
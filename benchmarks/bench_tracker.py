@@ -0,0 +1,41 @@
+"""Microbenchmark: per-answer cost of PerformanceTracker.
+
+Each simulated answer does what the quiz loop does: record_answer,
+get_summary and get_recent_streak. Per-answer cost should stay flat as
+the session grows.
+
+Run: python benchmarks/bench_tracker.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from tracker import PerformanceTracker
+
+
+def bench(n_records):
+    tracker = PerformanceTracker()
+    rng = random.Random(0)
+    start = time.perf_counter()
+    for _ in range(n_records):
+        tracker.start_question()
+        answer = rng.randint(0, 1)
+        tracker.record_answer('1 + 1', answer, 1, 'Easy')
+        tracker.get_summary()
+        tracker.get_recent_streak(5)
+    elapsed = time.perf_counter() - start
+    return elapsed / n_records
+
+
+def main():
+    print(f"{'records':>10} {'us/answer':>12}")
+    for n in (10, 100, 1_000, 10_000, 100_000):
+        per_answer = bench(n)
+        print(f"{n:>10} {per_answer * 1e6:>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
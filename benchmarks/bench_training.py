@@ -0,0 +1,73 @@
+"""Out-of-core training pipeline: per-stage time and peak memory vs log size.
+
+Builds synthetic answer logs (SQLiteStore schema) by playing simulated
+students against the rule-based engine, then trains on each. Peak worker
+memory should stay flat as the log grows, since workers only hold one
+chunk plus a fixed-size count table.
+
+Run: python benchmarks/bench_training.py [--answers 250000 1000000]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from simulation.runner import SimulatedSession
+from simulation.students import sample_students
+from storage import SQLiteStore
+from training import train
+
+QUESTIONS_PER_SESSION = 50
+
+
+def build_log(path, n_answers):
+    SQLiteStore(path).close()  # create the schema
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA synchronous=OFF')
+    n_sessions = n_answers // QUESTIONS_PER_SESSION
+    batch = []
+    for i, student in enumerate(sample_students('mixed', n_sessions, seed=1)):
+        session = SimulatedSession(student, 'rule_based', 'Easy', seed=i)
+        for _ in range(QUESTIONS_PER_SESSION):
+            session.step()
+        for seq, r in enumerate(session.tracker.records, 1):
+            batch.append((f's{i:08d}', seq, r['question'], r['user_answer'], r['correct_answer'],
+                          int(r['is_correct']), r['response_time'], r['difficulty']))
+        if len(batch) >= 100_000:
+            conn.executemany('INSERT INTO answers VALUES (?, ?, ?, ?, ?, ?, ?, ?)', batch)
+            batch = []
+    conn.executemany('INSERT INTO answers VALUES (?, ?, ?, ?, ?, ?, ?, ?)', batch)
+    conn.commit()
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--answers', type=int, nargs='+', default=[250_000, 1_000_000])
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_answers in args.answers:
+            path = os.path.join(tmp, f'log-{n_answers}.db')
+            start = time.perf_counter()
+            build_log(path, n_answers)
+            size_mb = os.path.getsize(path) / 2 ** 20
+            print(f"\n{n_answers:,} answers ({size_mb:.0f} MB log, built in {time.perf_counter() - start:.1f}s)")
+            
+            report = train(path, version=f'bench-{n_answers}', workers=args.workers,
+                           model_dir=os.path.join(tmp, 'models'))
+            print(f"  {'stage':<10} {'seconds':>8} {'peak RSS MB':>12} {'worker RSS MB':>14}")
+            for name, stage in report['stages'].items():
+                print(f"  {name:<10} {stage['seconds']:>8.2f} {stage['peak_rss_mb']:>12.1f}"
+                      f" {stage['peak_worker_rss_mb']:>14.1f}")
+            print(f"  featurize: {report['stages']['featurize']['answers_per_second']:,} answers/s;"
+                  f" validation accuracy {report['validation_accuracy']:.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,102 +1,167 @@
-from sklearn.tree import DecisionTreeClassifier
-import numpy as np
-
-class AdaptiveEngine:
-    def __init__(self, method='rule_based'):
-        """
-        method: 'rule_based' or 'ml_based'
-        """
-        self.method = method
-        self.difficulty_levels = ['Easy', 'Medium', 'Hard']
-        self.ml_model = None
-        
-        if method == 'ml_based':
-            self._initialize_ml_model()
-    
-    def _initialize_ml_model(self):
-        """Initialize a simple decision tree for ML-based adaptation"""
-        # Pre-train with sample data
-        # Features: [accuracy_rate, avg_response_time_normalized, consecutive_correct]
-        # Labels: 0=Easy, 1=Medium, 2=Hard
-        
-        X_train = np.array([
-            [0.3, 0.8, 0],  # Low accuracy, slow -> Easy
-            [0.5, 0.6, 1],  # Medium accuracy -> Easy
-            [0.7, 0.5, 2],  # Good accuracy -> Medium
-            [0.8, 0.4, 3],  # High accuracy -> Medium
-            [0.9, 0.3, 3],  # Very high accuracy -> Hard
-            [0.4, 0.7, 0],  # Struggling -> Easy
-            [0.95, 0.2, 4], # Excellent -> Hard
-        ])
-        
-        y_train = np.array([0, 0, 1, 1, 2, 0, 2])
-        
-        self.ml_model = DecisionTreeClassifier(max_depth=3, random_state=42)
-        self.ml_model.fit(X_train, y_train)
-    
-    def adapt_difficulty(self, current_difficulty, tracker):
-        """Determine next difficulty level based on performance"""
-        if self.method == 'rule_based':
-            return self._rule_based_adapt(current_difficulty, tracker)
-        else:
-            return self._ml_based_adapt(current_difficulty, tracker)
-    
-    def _rule_based_adapt(self, current_difficulty, tracker):
-        """Rule-based adaptation logic"""
-        recent_streak = tracker.get_recent_streak(3)
-        
-        # Not enough data yet
-        if len(recent_streak) < 3:
-            return current_difficulty
-        
-        # Check for 3 consecutive correct answers
-        if all(recent_streak):
-            if current_difficulty == 'Easy':
-                return 'Medium'
-            elif current_difficulty == 'Medium':
-                return 'Hard'
-        
-        # Check for 2 consecutive incorrect answers
-        if len([x for x in recent_streak[-2:] if not x]) >= 2:
-            if current_difficulty == 'Hard':
-                return 'Medium'
-            elif current_difficulty == 'Medium':
-                return 'Easy'
-        
-        return current_difficulty
-    
-    def _ml_based_adapt(self, current_difficulty, tracker):
-        """ML-based adaptation using decision tree"""
-        summary = tracker.get_summary()
-        
-        if not summary or summary['total_questions'] < 3:
-            return current_difficulty
-        
-        # Prepare features
-        accuracy_rate = summary['accuracy'] / 100
-        avg_time_normalized = min(summary['avg_response_time'] / 30, 1)  # Normalize to 0-1
-        consecutive_correct = sum(tracker.get_recent_streak(5))
-        
-        features = np.array([[accuracy_rate, avg_time_normalized, consecutive_correct]])
-        
-        # Predict difficulty level
-        predicted_level_idx = self.ml_model.predict(features)[0]
-        predicted_difficulty = self.difficulty_levels[predicted_level_idx]
-        
-        return predicted_difficulty
-    
-    def recommend_next_level(self, tracker):
-        """Recommend difficulty for next session"""
-        summary = tracker.get_summary()
-        
-        if not summary:
-            return 'Easy'
-        
-        accuracy = summary['accuracy']
-        
-        if accuracy >= 80:
-            return 'Hard'
-        elif accuracy >= 60:
-            return 'Medium'
-        else:
-            return 'Easy'
+from array import array
+from bisect import bisect_left
+
+from metrics import timed
+from rules import RuleTable
+
+# The ML features use get_summary's rounding, so speculated and direct
+# predictions see exactly the same values
+def _accuracy_feature(correct, total):
+    return round((correct / total) * 100, 2) / 100
+
+def _time_feature(response_time_sum, total):
+    """Average response time, normalized to 0-1 (30 s and slower is 1)"""
+    return min(round(response_time_sum / total, 2) / 30, 1)
+
+class AdaptiveEngine:
+    def __init__(self, method='rule_based', model_version=None, rules=None, calibration=None):
+        """
+        method: 'rule_based', 'ml_based' or 'elo'
+        model_version: pin a registry model version (default: the active one);
+        for rule_based, a RuleTable saved in the registry (see model_selection.py)
+        rules: RuleTable for rule_based (default: 3 right -> up, 2 wrong -> down)
+        calibration: StudentCalibration for elo (default: an anonymous student
+        on the shared item bank); deal its puzzles with a CalibratedQueue
+        """
+        self.method = method
+        self.difficulty_levels = ['Easy', 'Medium', 'Hard']
+        self.model_version = model_version
+        self.rules = rules or RuleTable(self.difficulty_levels)
+        self.calibration = calibration
+        
+        if method == 'ml_based':
+            self._initialize_ml_model()
+        elif method == 'rule_based' and model_version is not None and rules is None:
+            from model_registry import get_registry
+            self.rules = get_registry().get_model(model_version)
+        elif method == 'elo' and calibration is None:
+            from calibration import StudentCalibration, get_item_bank
+            self.calibration = StudentCalibration(get_item_bank())
+    
+    def _initialize_ml_model(self):
+        """Attach to the shared, pre-fitted model from the process-wide registry"""
+        # Imported here so rule_based sessions never load numpy/sklearn
+        from model_registry import get_registry
+        
+        # Warm the registry so the first prediction doesn't pay the load/fit cost
+        get_registry().get_model(self.model_version)
+    
+    @property
+    def ml_model(self):
+        """Shared model for this engine (active registry version unless pinned)"""
+        if self.method != 'ml_based':
+            return None
+        from model_registry import get_registry
+        return get_registry().get_model(self.model_version)
+    
+    @timed('adapt_difficulty')
+    def adapt_difficulty(self, current_difficulty, tracker):
+        """Determine next difficulty level based on performance"""
+        if self.method == 'rule_based':
+            return self._rule_based_adapt(current_difficulty, tracker)
+        elif self.method == 'elo':
+            return self._elo_adapt(current_difficulty, tracker)
+        else:
+            return self._ml_based_adapt(current_difficulty, tracker)
+    
+    def _history(self, tracker):
+        """The last ``rules.window`` answers as bits, most recent lowest"""
+        if self.rules.window <= tracker.recent_window:
+            return tracker.recent_bits
+        history = 0
+        for is_correct in tracker.get_recent_streak(self.rules.window):
+            history = (history << 1) | int(is_correct)
+        return history
+    
+    def _rule_based_adapt(self, current_difficulty, tracker):
+        """Rule-based adaptation: one lookup in the compiled rule table"""
+        return self.rules.decide(current_difficulty, self._history(tracker), tracker.total_questions)
+    
+    def _elo_adapt(self, current_difficulty, tracker):
+        """Calibrated adaptation: the level of the item nearest the student's rating"""
+        return self.calibration.level()
+    
+    def _ml_based_adapt(self, current_difficulty, tracker):
+        """ML-based adaptation using decision tree"""
+        from inference import get_predictor
+        
+        total = tracker.total_questions
+        if total < 3:
+            return current_difficulty
+        
+        # Features: accuracy, normalized response time, correct answers in the last 5
+        features = [
+            _accuracy_feature(tracker.correct_answers, total),
+            _time_feature(tracker.response_time_sum, total),
+            sum(tracker.get_recent_streak(5)),
+        ]
+        
+        # Predict difficulty level (batched with other sessions' requests)
+        predicted_level_idx = get_predictor().predict(features, self.model_version)
+        predicted_difficulty = self.difficulty_levels[predicted_level_idx]
+        
+        return predicted_difficulty
+    
+    def speculate(self, current_difficulty, tracker):
+        """Next difficulty for both outcomes of the answer still being worked on.
+        
+        Returns ``{True: branch, False: branch}``; once the answer is
+        recorded, ``resolve(branches[is_correct], tracker)`` gives what
+        ``adapt_difficulty`` would. rule_based branches are levels.
+        ml_based ones also depend on the response time, so they hold the
+        tree's prediction as a step function of the time feature. None
+        for elo and for models other than small decision trees.
+        """
+        count = tracker.total_questions + 1
+        if self.method == 'rule_based':
+            history = self._history(tracker)
+            return {
+                outcome: self.rules.decide(current_difficulty, (history << 1) | outcome, count)
+                for outcome in (True, False)
+            }
+        if self.method != 'ml_based':
+            return None
+        if count < 3:
+            return {True: current_difficulty, False: current_difficulty}
+        
+        from inference import get_predictor
+        
+        streak = sum(tracker.get_recent_streak(4))
+        branches = {}
+        for outcome in (True, False):
+            accuracy_rate = _accuracy_feature(tracker.correct_answers + outcome, count)
+            steps = get_predictor().label_steps([accuracy_rate, 0.0, streak + outcome], 1, self.model_version)
+            if steps is None:
+                return None
+            model, bounds, labels = steps
+            branches[outcome] = (model, bounds, [self.difficulty_levels[label] for label in labels])
+        return branches
+    
+    def resolve(self, branch, tracker):
+        """Difficulty from a ``speculate`` branch, after the answer is recorded
+        (None if the active model changed in between)"""
+        if isinstance(branch, str):
+            return branch
+        model, bounds, levels = branch
+        if self.ml_model is not model:
+            return None
+        # predict_one compares float32 features against the thresholds
+        value = array('f', [_time_feature(tracker.response_time_sum, tracker.total_questions)])[0]
+        return levels[bisect_left(bounds, value)]
+    
+    def recommend_next_level(self, tracker, summary=None):
+        """Recommend difficulty for next session (``summary``: tracker.get_summary(), if already at hand)"""
+        if summary is None:
+            summary = tracker.get_summary()
+        
+        if not summary:
+            return 'Easy'
+        
+        accuracy = summary['accuracy']
+        
+        if accuracy >= 80:
+            return 'Hard'
+        elif accuracy >= 60:
+            return 'Medium'
+        else:
+            return 'Easy'
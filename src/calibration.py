@@ -0,0 +1,369 @@
+"""Online Elo calibration of puzzle items and students.
+
+Every problem in the three ProblemSpaces is an item with its own rating,
+and every student has one too. After each answer both move in O(1):
+    
+    expected = 1 / (1 + 10 ** ((item - student) / 400))
+    student += k_student * (correct - expected)
+    item    -= k_item    * (correct - expected)
+
+with K shrinking as a rating collects answers. Items are indexed by
+rating bucket (a sorted list of bucket keys plus the items in each), so
+the unseen item nearest a target rating is found with one bisect and
+moving an item to a new bucket is O(1). Item and student ratings are
+shared by every session in the process and saved as JSON, so the
+calibration keeps improving across sessions and restarts. Students are
+keyed by opaque ids from ``new_student_id``, never by name.
+"""
+import atexit
+import json
+import math
+import os
+import random
+import threading
+import uuid
+from array import array
+from bisect import bisect_left, insort
+
+from puzzle_generator import problem_space
+
+LEVELS = ('Easy', 'Medium', 'Hard')
+LEVEL_RATINGS = {'Easy': 800.0, 'Medium': 1000.0, 'Hard': 1200.0}
+LEVEL_SPREAD = 150.0  # prior spread within a level, by operand size
+TARGET_SUCCESS = 0.7  # chance of a correct answer the next puzzle aims for
+BUCKET_WIDTH = 20.0   # rating points per index bucket
+
+DEFAULT_RATINGS_PATH = os.environ.get(
+    'MATH_ADAPTIVE_RATINGS',
+    os.path.join(
+        os.environ.get(
+            'MATH_ADAPTIVE_MODEL_DIR',
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'models')
+        ),
+        'item_ratings.json'
+    )
+)
+
+
+def new_student_id():
+    """Opaque id to keep a student's rating under (carries nothing about them)"""
+    return uuid.uuid4().hex
+
+
+def is_student_id(value):
+    """Whether ``value`` has the form of a new_student_id id"""
+    return (isinstance(value, str) and len(value) == 32
+            and all(c in '0123456789abcdef' for c in value))
+
+
+def expected_score(student_rating, item_rating):
+    """Chance the student answers the item correctly"""
+    return 1 / (1 + 10 ** ((item_rating - student_rating) / 400))
+
+
+def k_factor(k_max, k_min, answers, decay=0.05):
+    """Step size for a rating that has seen ``answers`` answers"""
+    return max(k_min, k_max / (1 + decay * answers))
+
+
+class ItemBank:
+    """Item ratings for every puzzle plus the ratings of known students.
+    
+    Items are numbered globally, level by level in LEVELS order, and map
+    back to (difficulty, item in its ProblemSpace) with ``item``. Unrated
+    items start from their level's rating, spread by operand size. All
+    methods are thread safe; with a ``path`` the bank loads it if present
+    and saves every ``save_every`` updates from a background thread (and
+    on ``save``).
+    """
+    
+    def __init__(self, path=None, save_every=200, k_student=(96.0, 24.0), k_item=(48.0, 4.0)):
+        self.path = path
+        self.save_every = save_every
+        self.k_student = k_student
+        self.k_item = k_item
+        self.offsets = {}
+        self.levels = array('B')
+        self.ratings = array('d')
+        self.answers = array('I')
+        for code, level in enumerate(LEVELS):
+            space = problem_space(level)
+            self.offsets[level] = len(self.ratings)
+            self.levels.extend([code] * space.size)
+            self.ratings.extend(self._prior_ratings(level, space))
+            self.answers.extend([0] * space.size)
+        self.size = len(self.ratings)
+        self.students = {}  # student_id -> [rating, answers]
+        self.updates = 0
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        
+        if path and os.path.exists(path):
+            self._load(path)
+        
+        # Rating-bucket index: sorted keys, the items in each bucket and
+        # where each item sits in its bucket's list (for O(1) removal)
+        self._keys = []
+        self._buckets = {}
+        self._bucket_of = array('i', [0] * self.size)
+        self._position = array('I', [0] * self.size)
+        for item, rating in enumerate(self.ratings):
+            self._index(item, self._key(rating))
+    
+    @staticmethod
+    def _prior_ratings(level, space):
+        magnitude = [
+            math.log(max(space.num1[i], space.num2[i], space.answers[i], 2)) for i in range(space.size)
+        ]
+        low, high = min(magnitude), max(magnitude)
+        scale = LEVEL_SPREAD / (high - low) if high > low else 0.0
+        base = LEVEL_RATINGS[level] - LEVEL_SPREAD / 2
+        return [base + (m - low) * scale for m in magnitude]
+    
+    @staticmethod
+    def _key(rating):
+        return math.floor(rating / BUCKET_WIDTH)
+    
+    def _index(self, item, key):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = []
+            insort(self._keys, key)
+        self._bucket_of[item] = key
+        self._position[item] = len(bucket)
+        bucket.append(item)
+    
+    def _unindex(self, item):
+        key = self._bucket_of[item]
+        bucket = self._buckets[key]
+        last = bucket.pop()
+        if last != item:
+            position = self._position[item]
+            bucket[position] = last
+            self._position[last] = position
+        if not bucket:
+            del self._buckets[key]
+            del self._keys[bisect_left(self._keys, key)]
+    
+    def global_id(self, difficulty, item):
+        return self.offsets[difficulty] + item
+    
+    def item(self, global_id):
+        """(difficulty, item in its ProblemSpace) for a global item number"""
+        level = LEVELS[self.levels[global_id]]
+        return level, global_id - self.offsets[level]
+    
+    def level_of(self, global_id):
+        return LEVELS[self.levels[global_id]]
+    
+    def student(self, student_id, default_rating):
+        """(rating, answers) of a named student, or a fresh rating"""
+        with self._lock:
+            stored = self.students.get(student_id) if student_id is not None else None
+        return tuple(stored) if stored else (default_rating, 0)
+    
+    def nearest(self, target, seen=(), random=random.random):
+        """Unseen item with a rating nearest ``target`` (random within its bucket)"""
+        key = self._key(target)
+        with self._lock:
+            keys = self._keys
+            hi = bisect_left(keys, key)
+            lo = hi - 1
+            while lo >= 0 or hi < len(keys):
+                if hi >= len(keys) or (lo >= 0 and key - keys[lo] <= keys[hi] - key):
+                    bucket = self._buckets[keys[lo]]
+                    lo -= 1
+                else:
+                    bucket = self._buckets[keys[hi]]
+                    hi += 1
+                start = int(random() * len(bucket))
+                for i in range(len(bucket)):
+                    item = bucket[(start + i) % len(bucket)]
+                    if item not in seen:
+                        return item
+        return None
+    
+    def update(self, student_id, student_rating, student_answers, global_id, is_correct):
+        """Fold one answer into both ratings; returns the student's new (rating, answers)"""
+        with self._lock:
+            item_rating = self.ratings[global_id]
+            surprise = int(bool(is_correct)) - expected_score(student_rating, item_rating)
+            student_rating += k_factor(*self.k_student, student_answers) * surprise
+            item_rating -= k_factor(*self.k_item, self.answers[global_id]) * surprise
+            self.ratings[global_id] = item_rating
+            self.answers[global_id] += 1
+            key = self._key(item_rating)
+            if key != self._bucket_of[global_id]:
+                self._unindex(global_id)
+                self._index(global_id, key)
+            student_answers += 1
+            if student_id is not None:
+                self.students[student_id] = [student_rating, student_answers]
+            self.updates += 1
+            due = self.path and self.updates % self.save_every == 0
+        if due:
+            self.save(block=False)
+        return student_rating, student_answers
+    
+    def state(self):
+        """Ratings as a JSON-friendly dict"""
+        return self._state(self._snapshot())
+    
+    def _snapshot(self):
+        # Student entries are replaced, never changed in place, so a shallow copy will do
+        with self._lock:
+            return array('d', self.ratings), array('I', self.answers), dict(self.students)
+    
+    def _state(self, snapshot):
+        ratings, answers, students = snapshot
+        return {
+            'items': {
+                level: {
+                    'ratings': [round(r, 2) for r in ratings[start:start + problem_space(level).size]],
+                    'answers': list(answers[start:start + problem_space(level).size]),
+                }
+                for level, start in self.offsets.items()
+            },
+            'students': {s: [round(r, 2), n] for s, (r, n) in students.items()},
+        }
+    
+    def save(self, path=None, block=True):
+        """Write the ratings to ``path`` (default: the bank's) atomically.
+        
+        The ratings are copied on the calling thread. With ``block`` False
+        they are written from a background thread, and nothing happens
+        while another save is running.
+        """
+        path = path or self.path
+        if not path:
+            return
+        if not self._save_lock.acquire(blocking=block):
+            return  # another thread is saving right now
+        try:
+            snapshot = self._snapshot()
+            if not block:
+                threading.Thread(
+                    target=self._write, args=(path, snapshot), name='item-bank-save', daemon=True
+                ).start()
+                return
+        except BaseException:
+            self._save_lock.release()
+            raise
+        self._write(path, snapshot)
+    
+    def _write(self, path, snapshot):
+        """Serialize a snapshot to ``path``; releases the save lock taken by ``save``"""
+        try:
+            state = self._state(snapshot)
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path + '.tmp', 'w') as f:
+                json.dump(state, f)
+            os.replace(path + '.tmp', path)
+        finally:
+            self._save_lock.release()
+    
+    def _load(self, path):
+        with open(path) as f:
+            state = json.load(f)
+        for level, saved in state.get('items', {}).items():
+            start = self.offsets.get(level)
+            # A level whose problems changed since the save starts over
+            if start is None or len(saved['ratings']) != problem_space(level).size:
+                continue
+            self.ratings[start:start + len(saved['ratings'])] = array('d', saved['ratings'])
+            self.answers[start:start + len(saved['answers'])] = array('I', saved['answers'])
+        # Files from before opaque ids were keyed by class code and name: drop those
+        self.students = {
+            s: list(value) for s, value in state.get('students', {}).items() if is_student_id(s)
+        }
+
+
+class StudentCalibration:
+    """One session's side of the calibration: the student's rating and what they've seen.
+    
+    ``student_id`` (from new_student_id) keys the student in the bank so
+    their rating carries over to later sessions (None = anonymous). A new student starts where
+    ``start_difficulty`` puzzles hit ``target_success``.
+    """
+    
+    def __init__(self, bank, student_id=None, start_difficulty='Easy', target_success=TARGET_SUCCESS,
+                 seed=None):
+        self.bank = bank
+        self.student_id = student_id
+        self.target_offset = 400 * math.log10(target_success / (1 - target_success))
+        self.rating, self.answers = bank.student(
+            student_id, LEVEL_RATINGS.get(start_difficulty, LEVEL_RATINGS['Hard']) + self.target_offset
+        )
+        self.random = random.Random(seed)
+        self.seen = set()
+        self._next = None
+    
+    def target(self):
+        """Item rating the student should answer correctly with target_success"""
+        return self.rating - self.target_offset
+    
+    def peek(self):
+        """Global number of the item to deal next (stays put until taken or an answer comes in)"""
+        if self._next is None:
+            if len(self.seen) >= self.bank.size:
+                self.seen.clear()
+            self._next = self.bank.nearest(self.target(), self.seen, self.random.random)
+        return self._next
+    
+    def level(self):
+        """Difficulty of the item to deal next"""
+        return self.bank.level_of(self.peek())
+    
+    def take(self):
+        item = self.peek()
+        self.seen.add(item)
+        self._next = None
+        return item
+    
+    def record(self, global_id, is_correct):
+        self.rating, self.answers = self.bank.update(
+            self.student_id, self.rating, self.answers, global_id, is_correct
+        )
+        self._next = None
+
+
+class CalibratedQueue:
+    """PuzzleQueue stand-in for calibrated sessions.
+    
+    Deals the unseen item nearest the student's rating (whatever the
+    difficulty asked for) and feeds answers back into the ratings.
+    """
+    
+    def __init__(self, generator, calibration):
+        self.generator = generator
+        self.calibration = calibration
+        self._last = (None, None)  # (puzzle, global item) last dealt
+    
+    def next_puzzle(self, difficulty):
+        global_id = self.calibration.take()
+        level, item = self.calibration.bank.item(global_id)
+        puzzle, answer = self.generator.make_puzzle(level, item)
+        self._last = (puzzle, global_id)
+        return puzzle, answer
+    
+    def record_result(self, difficulty, puzzle, is_correct):
+        last, global_id = self._last
+        if puzzle is last:
+            self._last = (None, None)
+            self.calibration.record(global_id, is_correct)
+
+
+_bank = None
+_bank_lock = threading.Lock()
+
+
+def get_item_bank():
+    """Process-wide ItemBank, saved to MATH_ADAPTIVE_RATINGS (default models/item_ratings.json)
+    every 200 updates and at exit"""
+    global _bank
+    if _bank is None:
+        with _bank_lock:
+            if _bank is None:
+                _bank = ItemBank(DEFAULT_RATINGS_PATH)
+                atexit.register(_bank.save)
+    return _bank
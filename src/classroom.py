@@ -0,0 +1,253 @@
+"""Live classroom aggregates, fed by every PerformanceTracker.record_answer.
+
+Each answer updates a handful of counters for its class (and for the
+whole school under ALL_CLASSES): answers and accuracy overall and per
+difficulty, a response-time quantile sketch, level changes and the
+sessions seen recently. Nothing keeps raw records, so a dashboard
+snapshot costs the same with ten students or ten thousand, and it is
+only rebuilt when something changed since the last one.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+
+ALL_CLASSES = '*'
+DEFAULT_CLASS = 'default'
+LEVELS = ('Easy', 'Medium', 'Hard')  # easiest first, to tell level ups from downs
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class QuantileSketch:
+    """Response-time histogram with log-spaced buckets (DDSketch style).
+    
+    Any quantile it reports is within ``relative_accuracy`` of the true
+    value; memory is one counter per bucket between the smallest and
+    largest value seen (a few hundred for seconds-scale response times).
+    Values up to ``min_value`` share one bucket and are reported as 0.
+    """
+    __slots__ = ('gamma_log', 'min_value', 'counts', 'offset', 'zero_count', 'count')
+    
+    def __init__(self, relative_accuracy=0.02, min_value=0.01):
+        gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.gamma_log = math.log(gamma)
+        self.min_value = min_value
+        self.counts = []
+        self.offset = 0  # bucket index of counts[0]
+        self.zero_count = 0
+        self.count = 0
+    
+    def bucket(self, value):
+        """Bucket index for ``value`` (None for the zero bucket)"""
+        if value <= self.min_value:
+            return None
+        return math.ceil(math.log(value) / self.gamma_log)
+    
+    def add(self, value):
+        self.add_to_bucket(self.bucket(value))
+    
+    def add_to_bucket(self, index):
+        """Count a value whose ``bucket`` is already known (same accuracy sketches only)"""
+        self.count += 1
+        if index is None:
+            self.zero_count += 1
+            return
+        counts = self.counts
+        if not counts:
+            self.offset = index
+            counts.append(0)
+        elif index < self.offset:
+            counts[:0] = [0] * (self.offset - index)
+            self.offset = index
+        elif index >= self.offset + len(counts):
+            counts.extend([0] * (index - self.offset - len(counts) + 1))
+        counts[index - self.offset] += 1
+    
+    def quantiles(self, qs=QUANTILES):
+        """Values at the (ascending) quantiles ``qs`` in one pass, None when empty"""
+        if not self.count:
+            return [None] * len(qs)
+        results = []
+        targets = iter(qs)
+        q = next(targets)
+        seen = self.zero_count
+        while q is not None and seen > q * (self.count - 1):
+            results.append(0.0)
+            q = next(targets, None)
+        for i, n in enumerate(self.counts):
+            seen += n
+            while q is not None and seen > q * (self.count - 1):
+                # Midpoint of bucket (gamma^(k-1), gamma^k] in relative terms
+                index = self.offset + i
+                results.append(2 * math.exp(index * self.gamma_log) / (1 + math.exp(self.gamma_log)))
+                q = next(targets, None)
+        return results
+
+
+class _ClassStats:
+    """Counters for one class; ``version`` moves on every change"""
+    
+    def __init__(self):
+        self.answers = 0
+        self.correct = 0
+        self.response_times = QuantileSketch()
+        self.difficulties = {}  # name -> [answers, correct, QuantileSketch]
+        self.level_changes = {}  # (from, to) -> count
+        self.sessions = OrderedDict()  # session_id -> time of its last answer, oldest first
+        self.sessions_seen = 0
+        self.version = 0
+        self.snapshot = None
+        self.snapshot_version = -1
+    
+    def record(self, session_id, difficulty, is_correct, bucket, previous_difficulty, now):
+        self.answers += 1
+        self.correct += is_correct
+        self.response_times.add_to_bucket(bucket)
+        
+        stats = self.difficulties.get(difficulty)
+        if stats is None:
+            stats = self.difficulties[difficulty] = [0, 0, QuantileSketch()]
+        stats[0] += 1
+        stats[1] += is_correct
+        stats[2].add_to_bucket(bucket)
+        
+        if previous_difficulty is not None and previous_difficulty != difficulty:
+            key = (previous_difficulty, difficulty)
+            self.level_changes[key] = self.level_changes.get(key, 0) + 1
+        
+        sessions = self.sessions
+        if session_id in sessions:
+            sessions.move_to_end(session_id)
+        else:
+            self.sessions_seen += 1
+        sessions[session_id] = now
+        self.version += 1
+    
+    def expire_idle(self, cutoff):
+        """``expire`` if the oldest session is idle since before ``cutoff`` (O(1) otherwise)"""
+        sessions = self.sessions
+        if sessions and next(iter(sessions.values())) < cutoff:
+            self.expire(cutoff)
+    
+    def expire(self, cutoff):
+        """Forget sessions idle since before ``cutoff`` (amortized O(1))"""
+        sessions = self.sessions
+        expired = False
+        while sessions:
+            session_id, last_seen = next(iter(sessions.items()))
+            if last_seen >= cutoff:
+                break
+            del sessions[session_id]
+            expired = True
+        if expired:
+            self.version += 1
+
+
+class ClassroomAggregator:
+    """Streaming per-class aggregates for the teacher dashboard.
+    
+    ``record`` is called once per answer (by PerformanceTracker) and does
+    O(1) work under one short lock. ``snapshot`` returns a plain dict per
+    class, rebuilt only when that class changed; sessions with no answer
+    for ``active_window`` seconds stop counting as active, and are dropped
+    as answers come in even if nobody looks at the dashboard.
+    """
+    
+    def __init__(self, active_window=300, clock=time.time):
+        self.active_window = active_window
+        self.clock = clock
+        self._everyone = _ClassStats()
+        self._classes = {ALL_CLASSES: self._everyone}
+        self._lock = threading.Lock()
+    
+    def record(self, class_id, session_id, difficulty, is_correct, response_time,
+               previous_difficulty=None):
+        class_id = class_id or DEFAULT_CLASS
+        now = self.clock()
+        cutoff = now - self.active_window
+        is_correct = int(bool(is_correct))
+        bucket = self._everyone.response_times.bucket(response_time)
+        with self._lock:
+            stats = self._classes.get(class_id)
+            if stats is None:
+                stats = self._classes[class_id] = _ClassStats()
+            stats.record(session_id, difficulty, is_correct, bucket, previous_difficulty, now)
+            self._everyone.record(
+                (class_id, session_id), difficulty, is_correct, bucket, previous_difficulty, now
+            )
+            stats.expire_idle(cutoff)
+            self._everyone.expire_idle(cutoff)
+    
+    def classes(self):
+        """Class ids with at least one answer (ALL_CLASSES excluded)"""
+        with self._lock:
+            return sorted(c for c in self._classes if c != ALL_CLASSES)
+    
+    def snapshot(self, class_id=ALL_CLASSES):
+        """Dashboard numbers for one class (ALL_CLASSES = everyone), or None"""
+        cutoff = self.clock() - self.active_window
+        with self._lock:
+            stats = self._classes.get(class_id)
+            if stats is None:
+                return None
+            stats.expire(cutoff)
+            if stats.snapshot_version != stats.version:
+                stats.snapshot = self._build_snapshot(class_id, stats)
+                stats.snapshot_version = stats.version
+            return stats.snapshot
+    
+    def snapshots(self):
+        """Snapshots of every class, for the all-classes overview"""
+        return {class_id: self.snapshot(class_id) for class_id in self.classes()}
+    
+    @staticmethod
+    def _build_snapshot(class_id, stats):
+        def accuracy(correct, total):
+            return round(correct / total * 100, 2) if total else None
+        
+        def times(sketch):
+            return {
+                f'p{round(q * 100)}': None if value is None else round(value, 2)
+                for q, value in zip(QUANTILES, sketch.quantiles())
+            }
+        
+        ups = downs = 0
+        order = {level: i for i, level in enumerate(LEVELS)}
+        for (before, after), n in stats.level_changes.items():
+            if order.get(after, 0) > order.get(before, 0):
+                ups += n
+            else:
+                downs += n
+        return {
+            'class_id': class_id,
+            'active_sessions': len(stats.sessions),
+            'sessions_seen': stats.sessions_seen,
+            'answers': stats.answers,
+            'accuracy': accuracy(stats.correct, stats.answers),
+            'response_time': times(stats.response_times),
+            'difficulty': {
+                difficulty: {
+                    'answers': total,
+                    'accuracy': accuracy(correct, total),
+                    'response_time': times(sketch),
+                }
+                for difficulty, (total, correct, sketch) in stats.difficulties.items()
+            },
+            'level_ups': ups,
+            'level_downs': downs,
+            'level_changes': {f'{a} → {b}': n for (a, b), n in stats.level_changes.items()},
+        }
+
+
+_aggregator = None
+_aggregator_lock = threading.Lock()
+
+
+def get_classroom():
+    """Process-wide ClassroomAggregator shared by every session"""
+    global _aggregator
+    if _aggregator is None:
+        with _aggregator_lock:
+            if _aggregator is None:
+                _aggregator = ClassroomAggregator()
+    return _aggregator
@@ -0,0 +1,389 @@
+"""Columnar session export: fixed-width NumPy columns that analysts memory-map.
+
+An export is a directory:
+    meta.json          schema, committed row count and dictionary sizes
+    <column>.bin       one raw little-endian array per column, no header
+    questions.jsonl    question table: line k is question id k
+    sessions.jsonl     session table: line k is session code k
+
+Appends go to the end of every column file and dictionary table; rows
+become visible once ``commit`` (or ``close``) rewrites meta.json, which
+happens atomically. Readers only look at committed rows, so an append cut
+short by a crash stays invisible and the next writer truncates it.
+One writer at a time; any number of readers.
+    
+    with ColumnarWriter('export') as writer:
+        writer.append_tracker('session-1', tracker)
+    
+    data = ColumnarReader('export')
+    hard = data['difficulty'] == data.difficulty_code('Hard')
+    data['response_time'][hard].mean()
+
+``python src/export.py answers.db export`` exports a SQLite answer log.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+FORMAT_VERSION = 1
+MISSING = np.iinfo(np.int32).min  # user_answer/correct_answer that is not a 32-bit int
+TEXT_QUESTION = 0xFF              # op of a question known only as text
+
+COLUMNS = {
+    'session': '<u4',         # code in sessions.jsonl
+    'seq': '<u4',             # answer number within the session, from 1
+    'difficulty': 'u1',       # index into meta.json "difficulties"
+    'correct': 'u1',          # 1 = correct
+    'response_time': '<f4',   # seconds
+    'num1': '<u2',            # operands (0 for text-only questions)
+    'num2': '<u2',
+    'op': 'u1',               # puzzle_generator.OPERATORS index, bit 7 = visual, 0xFF = text only
+    'question': '<u4',        # id in questions.jsonl
+    'user_answer': '<i4',     # MISSING if it was not a 32-bit int
+    'correct_answer': '<i4',
+}
+
+
+def _column_path(path, name):
+    return os.path.join(path, name + '.bin')
+
+
+def _read_meta(path):
+    with open(os.path.join(path, 'meta.json')) as f:
+        meta = json.load(f)
+    if meta.get('version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported export format version: {meta.get('version')}")
+    return meta
+
+
+def _read_lines(path, count):
+    """First ``count`` JSON lines of a dictionary table"""
+    values = []
+    if count:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                values.append(json.loads(line))
+                if len(values) == count:
+                    break
+    return values
+
+
+def _int32(values):
+    """int32 array of ``values``, MISSING where a value is not a 32-bit int"""
+    out = np.full(len(values), MISSING, dtype=np.int32)
+    for i, value in enumerate(values):
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        if type(value) is int and -0x80000000 < value <= 0x7FFFFFFF:
+            out[i] = value
+    return out
+
+
+class ColumnarWriter:
+    """Appends sessions to a columnar export (created if missing).
+    
+    ``append_tracker``/``append_log`` copy an AnswerLog's typed arrays
+    straight into the columns; ``append_rows`` takes plain record
+    sequences (e.g. from the SQLite log). Question texts and session ids
+    are dictionary-encoded; new rows are committed every ``commit_rows``
+    rows, on ``commit`` and on ``close``.
+    """
+    
+    def __init__(self, path, commit_rows=1 << 20):
+        self.path = path
+        self.commit_rows = commit_rows
+        os.makedirs(path, exist_ok=True)
+        if os.path.exists(os.path.join(path, 'meta.json')):
+            meta = _read_meta(path)
+        else:
+            meta = {'rows': 0, 'difficulties': [], 'questions': 0, 'questions_bytes': 0,
+                    'sessions': 0, 'sessions_bytes': 0}
+        self.rows = self._committed = meta['rows']
+        self.difficulties = list(meta['difficulties'])
+        self._difficulty_codes = {name: code for code, name in enumerate(self.difficulties)}
+        
+        # Cut off anything a crashed append left after the committed rows
+        self._files = {}
+        for name, dtype in COLUMNS.items():
+            f = open(_column_path(path, name), 'ab')
+            f.truncate(self.rows * np.dtype(dtype).itemsize)
+            f.seek(0, os.SEEK_END)  # an append-mode position isn't moved by truncate
+            self._files[name] = f
+        self._tables = {}
+        for table in ('questions', 'sessions'):
+            table_path = os.path.join(path, table + '.jsonl')
+            f = open(table_path, 'ab')
+            f.truncate(meta[table + '_bytes'])
+            f.seek(0, os.SEEK_END)  # commit() records tell() as the table size
+            self._tables[table] = f
+        
+        self._questions = {}      # text -> id
+        self._question_keys = {}  # (num1, num2, op, emoji id) -> id
+        from puzzle_generator import emoji_id
+        for i, (text, key) in enumerate(_read_lines(os.path.join(path, 'questions.jsonl'), meta['questions'])):
+            self._questions[text] = i
+            if key is not None:
+                num1, num2, op, emoji = key
+                self._question_keys[num1, num2, op, emoji_id(emoji)] = i
+        self._n_questions = meta['questions']
+        self._sessions = {
+            session_id: code for code, session_id in
+            enumerate(_read_lines(os.path.join(path, 'sessions.jsonl'), meta['sessions']))
+        }
+    
+    def _difficulty(self, name):
+        code = self._difficulty_codes.get(name)
+        if code is None:
+            if len(self.difficulties) > 0xFF:
+                raise ValueError('More than 256 difficulty names')
+            code = self._difficulty_codes[name] = len(self.difficulties)
+            self.difficulties.append(name)
+        return code
+    
+    def _session(self, session_id):
+        code = self._sessions.get(session_id)
+        if code is None:
+            code = self._sessions[session_id] = len(self._sessions)
+            self._tables['sessions'].write((json.dumps(session_id) + '\n').encode())
+        return code
+    
+    def _question(self, text, key=None, emoji=None):
+        question = self._questions.get(text)
+        if question is None:
+            question = self._questions[text] = self._n_questions
+            self._n_questions += 1
+            entry = [text, None if key is None else [key[0], key[1], key[2], emoji]]
+            self._tables['questions'].write((json.dumps(entry, ensure_ascii=False) + '\n').encode())
+        if key is not None:
+            self._question_keys[key] = question
+        return question
+    
+    def append_tracker(self, session_id, tracker):
+        """Append a PerformanceTracker's records"""
+        self.append_log(session_id, tracker.records)
+    
+    def append_log(self, session_id, log, first_seq=1):
+        """Append an AnswerLog; its arrays are copied as they are, no record dicts"""
+        from puzzle_generator import EMOJIS, render_question
+        from tracker import DIFFICULTIES
+        
+        n = len(log)
+        if not n:
+            return
+        num1 = np.frombuffer(log.num1, dtype=np.uint16)
+        num2 = np.frombuffer(log.num2, dtype=np.uint16)
+        op = np.frombuffer(log.op, dtype=np.uint8)
+        emoji = np.frombuffer(log.emoji, dtype=np.uint16)
+        flags = np.frombuffer(log.flags, dtype=np.uint8)
+        
+        # Question ids: one dictionary lookup per distinct puzzle in the log
+        question = np.empty(n, dtype=np.uint32)
+        is_text = op == TEXT_QUESTION
+        coded = np.flatnonzero(~is_text)
+        if len(coded):
+            keys = (
+                (num1[coded].astype(np.uint64) << np.uint64(40))
+                | (num2[coded].astype(np.uint64) << np.uint64(24))
+                | (op[coded].astype(np.uint64) << np.uint64(16))
+                | emoji[coded].astype(np.uint64)
+            )
+            unique, inverse = np.unique(keys, return_inverse=True)
+            ids = np.empty(len(unique), dtype=np.uint32)
+            for k, packed in enumerate(unique.tolist()):
+                key = (packed >> 40, (packed >> 24) & 0xFFFF, (packed >> 16) & 0xFF, packed & 0xFFFF)
+                question_id = self._question_keys.get(key)
+                if question_id is None:
+                    text = render_question(key[0], key[1], key[2] & 0x7F, key[3], key[2] & 0x80)
+                    question_id = self._question(text, key, EMOJIS[key[3]])
+                ids[k] = question_id
+            question[coded] = ids[inverse]
+        for i in np.flatnonzero(is_text).tolist():
+            question[i] = self._question(log.question(i))
+        
+        user_answer = np.frombuffer(log.user_answer, dtype=np.int32).copy()
+        correct_answer = np.frombuffer(log.correct_answer, dtype=np.int32).copy()
+        for column, field in ((user_answer, 'user_answer'), (correct_answer, 'correct_answer')):
+            overflow = log.overflow(field)
+            if overflow:
+                indexes = list(overflow)
+                column[indexes] = _int32([overflow[i] for i in indexes])
+        
+        codes = np.array([self._difficulty(name) for name in DIFFICULTIES], dtype=np.uint8)
+        self._write({
+            'session': np.full(n, self._session(session_id), dtype=np.uint32),
+            'seq': np.arange(first_seq, first_seq + n, dtype=np.uint32),
+            'difficulty': codes[flags >> 1],
+            'correct': flags & 1,
+            'response_time': np.frombuffer(log.response_time, dtype=np.float32),
+            'num1': np.where(is_text, 0, num1),
+            'num2': np.where(is_text, 0, num2),
+            'op': op,
+            'question': question,
+            'user_answer': user_answer,
+            'correct_answer': correct_answer,
+        })
+    
+    def append_rows(self, session_ids, seqs, questions, user_answers, correct_answers, is_correct,
+                    response_times, difficulties):
+        """Append records given as parallel sequences (questions as text)"""
+        n = len(seqs)
+        if not n:
+            return
+        self._write({
+            'session': np.fromiter((self._session(s) for s in session_ids), dtype=np.uint32, count=n),
+            'seq': np.asarray(seqs, dtype=np.uint32),
+            'difficulty': np.fromiter((self._difficulty(d) for d in difficulties), dtype=np.uint8, count=n),
+            'correct': np.asarray(is_correct, dtype=np.uint8),
+            'response_time': np.asarray(response_times, dtype=np.float32),
+            'num1': np.zeros(n, dtype=np.uint16),
+            'num2': np.zeros(n, dtype=np.uint16),
+            'op': np.full(n, TEXT_QUESTION, dtype=np.uint8),
+            'question': np.fromiter((self._question(str(q)) for q in questions), dtype=np.uint32, count=n),
+            'user_answer': _int32(user_answers),
+            'correct_answer': _int32(correct_answers),
+        })
+    
+    def _write(self, columns):
+        for name, dtype in COLUMNS.items():
+            np.ascontiguousarray(columns[name], dtype=dtype).tofile(self._files[name])
+        self.rows += len(columns['seq'])
+        if self.rows - self._committed >= self.commit_rows:
+            self.commit()
+    
+    def commit(self):
+        """Make every appended row visible to readers"""
+        for f in list(self._files.values()) + list(self._tables.values()):
+            f.flush()
+            os.fsync(f.fileno())
+        meta = {
+            'version': FORMAT_VERSION,
+            'columns': COLUMNS,
+            'rows': self.rows,
+            'difficulties': self.difficulties,
+            'questions': self._n_questions,
+            'questions_bytes': self._tables['questions'].tell(),
+            'sessions': len(self._sessions),
+            'sessions_bytes': self._tables['sessions'].tell(),
+        }
+        meta_path = os.path.join(self.path, 'meta.json')
+        with open(meta_path + '.tmp', 'w') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(meta_path + '.tmp', meta_path)
+        self._committed = self.rows
+    
+    def close(self):
+        self.commit()
+        for f in list(self._files.values()) + list(self._tables.values()):
+            f.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+
+class ColumnarReader:
+    """Read-only, zero-copy view of a columnar export.
+    
+    ``reader[name]`` is a NumPy memory map of a column (committed rows
+    only); nothing is read until it is touched, and slicing or masking
+    reads just the pages involved. The question and session tables load
+    on first use.
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        meta = _read_meta(path)
+        self.rows = meta['rows']
+        self.difficulties = meta['difficulties']
+        self._meta = meta
+        self.columns = {}
+        for name, dtype in meta['columns'].items():
+            if self.rows:
+                self.columns[name] = np.memmap(_column_path(path, name), dtype=dtype, mode='r',
+                                               shape=(self.rows,))
+            else:
+                self.columns[name] = np.empty(0, dtype=dtype)
+        self._questions = None
+        self._sessions = None
+    
+    def __getitem__(self, name):
+        return self.columns[name]
+    
+    def __len__(self):
+        return self.rows
+    
+    def difficulty_code(self, name):
+        return self.difficulties.index(name)
+    
+    @property
+    def questions(self):
+        """Question texts by id"""
+        if self._questions is None:
+            self._questions = [
+                text for text, _ in
+                _read_lines(os.path.join(self.path, 'questions.jsonl'), self._meta['questions'])
+            ]
+        return self._questions
+    
+    @property
+    def sessions(self):
+        """Session ids by code"""
+        if self._sessions is None:
+            self._sessions = _read_lines(os.path.join(self.path, 'sessions.jsonl'), self._meta['sessions'])
+        return self._sessions
+    
+    def to_dataframe(self, columns=None):
+        """Columns (default all) as a pandas DataFrame with names decoded (copies the data)"""
+        import pandas as pd
+        columns = columns or list(self.columns)
+        frame = pd.DataFrame({name: np.asarray(self.columns[name]) for name in columns})
+        if 'difficulty' in frame:
+            frame['difficulty'] = pd.Categorical.from_codes(frame['difficulty'], self.difficulties)
+        if 'question' in frame:
+            frame['question'] = np.asarray(self.questions, dtype=object)[frame['question']]
+        if 'session' in frame:
+            frame['session'] = np.asarray(self.sessions, dtype=object)[frame['session']]
+        return frame
+
+
+def export_sqlite(db_path, path, chunk_size=100_000):
+    """Append a whole SQLite answer log (storage.SQLiteStore) to an export; returns rows"""
+    conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+    rows = 0
+    try:
+        cursor = conn.execute(
+            'SELECT session_id, seq, question, user_answer, correct_answer, is_correct,'
+            ' response_time, difficulty FROM answers ORDER BY session_id, seq'
+        )
+        with ColumnarWriter(path) as writer:
+            while True:
+                chunk = cursor.fetchmany(chunk_size)
+                if not chunk:
+                    break
+                writer.append_rows(*zip(*chunk))
+                rows += len(chunk)
+    finally:
+        conn.close()
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export a SQLite answer log to the columnar format')
+    parser.add_argument('db', help='SQLite answer log (MATH_ADAPTIVE_STORE database)')
+    parser.add_argument('out', help='export directory (appended to if it exists)')
+    args = parser.parse_args(argv)
+    
+    start = time.perf_counter()
+    rows = export_sqlite(args.db, args.out)
+    print(f'{rows:,} answers exported to {args.out} in {time.perf_counter() - start:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,233 @@
+import math
+import threading
+import time
+from array import array
+from concurrent.futures import Future
+
+import numpy as np
+from model_registry import get_registry
+
+# Trees up to this many nodes are evaluated straight from their arrays
+FAST_PATH_MAX_NODES = 255
+
+
+class TreeEvaluator:
+    """Pure-NumPy evaluation of a fitted sklearn decision tree.
+    
+    Reads the fitted ``tree_`` arrays once and walks them directly, which
+    skips sklearn's per-call input validation. Matches
+    ``DecisionTreeClassifier.predict`` for single-output classifiers.
+    """
+    
+    def __init__(self, model):
+        tree = model.tree_
+        self.children_left = tree.children_left.copy()
+        self.children_right = tree.children_right.copy()
+        self.feature = tree.feature.copy()
+        self.threshold = tree.threshold.copy()
+        self.node_labels = model.classes_[np.argmax(tree.value[:, 0, :], axis=1)]
+        self.max_depth = tree.max_depth
+        
+        # Plain lists make the single-row walk faster than NumPy indexing
+        self._left = self.children_left.tolist()
+        self._right = self.children_right.tolist()
+        self._feature = self.feature.tolist()
+        self._threshold = self.threshold.tolist()
+        self._labels = self.node_labels.tolist()
+    
+    @staticmethod
+    def supports(model, max_nodes=FAST_PATH_MAX_NODES):
+        tree = getattr(model, 'tree_', None)
+        return (
+            tree is not None
+            and tree.n_outputs == 1
+            and tree.node_count <= max_nodes
+        )
+    
+    def predict_one(self, features):
+        """Predict a single feature vector"""
+        # sklearn compares float32 inputs against the thresholds
+        features = array('f', features)
+        node = 0
+        left = self._left
+        while left[node] != -1:
+            if features[self._feature[node]] <= self._threshold[node]:
+                node = left[node]
+            else:
+                node = self._right[node]
+        return self._labels[node]
+    
+    def label_steps(self, features, free):
+        """Prediction as a step function of feature ``free``, the others fixed.
+        
+        Returns ``(bounds, labels)``: a value ``v`` of the free feature is
+        predicted ``labels[bisect_left(bounds, v)]`` (compare float32 values,
+        as ``predict_one`` does). Walks only the branches the fixed
+        features allow.
+        """
+        features = array('f', features)
+        pieces = []
+        stack = [(0, -math.inf, math.inf)]  # node, interval (lo, hi] of the free feature
+        while stack:
+            node, lo, hi = stack.pop()
+            if self._left[node] == -1:
+                pieces.append((lo, hi, self._labels[node]))
+                continue
+            feature, threshold = self._feature[node], self._threshold[node]
+            if feature != free:
+                stack.append((self._left[node] if features[feature] <= threshold else self._right[node], lo, hi))
+                continue
+            if lo < threshold:
+                stack.append((self._left[node], lo, min(hi, threshold)))
+            if hi > threshold:
+                stack.append((self._right[node], max(lo, threshold), hi))
+        pieces.sort()
+        bounds, labels = [], [pieces[0][2]]
+        for lo, _, label in pieces[1:]:
+            if label != labels[-1]:
+                bounds.append(lo)
+                labels.append(label)
+        return bounds, labels
+    
+    def predict(self, X):
+        """Predict a 2-D batch, one tree level at a time for all rows"""
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(len(X))
+        node = np.zeros(len(X), dtype=np.intp)
+        for _ in range(self.max_depth):
+            left = self.children_left[node]
+            internal = left != -1
+            if not internal.any():
+                break
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            next_node = np.where(go_left, left, self.children_right[node])
+            node = np.where(internal, next_node, node)
+        return self.node_labels[node]
+
+
+class BatchingPredictor:
+    """Coalesces predictions from concurrent sessions into vectorized batches.
+    
+    Callers block in ``predict`` (or get a Future from ``submit``); a single
+    worker thread drains the queue, waits at most ``max_latency`` seconds for
+    more requests (or until ``max_batch_size`` are queued), then runs one
+    predict per model version for the whole batch.
+    
+    With ``inline_small_trees`` (the default), ``predict`` evaluates small
+    decision trees directly in the calling thread instead: walking a few
+    nodes is cheaper than the hand-off to the worker.
+    """
+    
+    def __init__(self, max_batch_size=512, max_latency=0.001, registry=None,
+                 inline_small_trees=True):
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self.inline_small_trees = inline_small_trees
+        self.registry = registry or get_registry()
+        self._pending = []
+        self._cond = threading.Condition()
+        self._evaluators = {}
+        self._worker = None
+        self.batches = 0
+        self.predictions = 0
+    
+    def submit(self, features, version=None):
+        """Queue one feature vector; returns a Future resolving to the label"""
+        future = Future()
+        with self._cond:
+            self._ensure_worker()
+            self._pending.append((version, features, future))
+            if len(self._pending) == 1 or len(self._pending) >= self.max_batch_size:
+                self._cond.notify()
+        return future
+    
+    def predict(self, features, version=None):
+        """Predict one feature vector, blocking until its batch has run"""
+        if self.inline_small_trees:
+            evaluator = self._evaluator_for(self.registry.get_model(version))
+            if evaluator is not None:
+                return evaluator.predict_one(features)
+        return self.submit(features, version).result()
+    
+    def label_steps(self, features, free, version=None):
+        """``(model, bounds, labels)`` of TreeEvaluator.label_steps for the
+        model of ``version``, or None if it isn't a small decision tree"""
+        model = self.registry.get_model(version)
+        evaluator = self._evaluator_for(model)
+        if evaluator is None:
+            return None
+        return (model,) + evaluator.label_steps(features, free)
+    
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(
+                target=self._run, name='batching-predictor', daemon=True
+            )
+            self._worker.start()
+    
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                deadline = time.monotonic() + self.max_latency
+                while len(self._pending) < self.max_batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._pending[:self.max_batch_size]
+                del self._pending[:self.max_batch_size]
+            self._process(batch)
+    
+    def _process(self, batch):
+        by_version = {}
+        for item in batch:
+            by_version.setdefault(item[0], []).append(item)
+        
+        for version, items in by_version.items():
+            try:
+                labels = self.predict_batch([features for _, features, _ in items], version)
+            except Exception as exc:
+                for _, _, future in items:
+                    future.set_exception(exc)
+                continue
+            for (_, _, future), label in zip(items, labels):
+                future.set_result(label)
+        
+        self.batches += 1
+        self.predictions += len(batch)
+    
+    def predict_batch(self, X, version=None):
+        """Predict many rows at once with the registry model for ``version``"""
+        model = self.registry.get_model(version)
+        evaluator = self._evaluator_for(model)
+        if evaluator is not None:
+            return evaluator.predict(X).tolist()
+        return model.predict(np.asarray(X, dtype=np.float64)).tolist()
+    
+    def _evaluator_for(self, model):
+        key = id(model)
+        cached = self._evaluators.get(key)
+        if cached is not None and cached[0] is model:
+            return cached[1]
+        evaluator = TreeEvaluator(model) if TreeEvaluator.supports(model) else None
+        if len(self._evaluators) >= 8:
+            self._evaluators.clear()
+        # Keep a reference to the model so its id() can't be reused
+        self._evaluators[key] = (model, evaluator)
+        return evaluator
+
+
+_predictor = None
+_predictor_lock = threading.Lock()
+
+
+def get_predictor():
+    """The process-wide BatchingPredictor shared by all sessions"""
+    global _predictor
+    if _predictor is None:
+        with _predictor_lock:
+            if _predictor is None:
+                _predictor = BatchingPredictor()
+    return _predictor
@@ -1,225 +1,382 @@
-import streamlit as st
-import time
-from puzzle_generator import PuzzleGenerator
-from tracker import PerformanceTracker
-from adaptive_engine import AdaptiveEngine
-
-# Page configuration
-st.set_page_config(
-    page_title="Adaptive Math Learning",
-    page_icon="🧮",
-    layout="centered"
-)
-
-# Initialize session state
-if 'stage' not in st.session_state:
-    st.session_state.stage = 'welcome'
-    st.session_state.user_name = ''
-    st.session_state.difficulty = 'Easy'
-    st.session_state.question_count = 0
-    st.session_state.max_questions = 10
-    st.session_state.current_question = None
-    st.session_state.current_answer = None
-    st.session_state.puzzle_gen = PuzzleGenerator()
-    st.session_state.tracker = PerformanceTracker()
-    st.session_state.adaptive_engine = None
-    st.session_state.adaptation_method = 'rule_based'  # Default to rule-based
-
-def welcome_screen():
-    # Sidebar for teacher/parent settings
-    with st.sidebar:
-        st.markdown("### ⚙️ Settings (For Teachers/Parents)")
-        st.markdown("Choose how the app adjusts difficulty:")
-        method = st.radio(
-            "Adaptation Method:",
-            ['🎯 Simple Rules (Transparent Logic)', '🤖 Smart AI (Machine Learning)'],
-            key='method_choice',
-            help="Simple Rules: Clear if-then logic. Smart AI: Uses decision tree model."
-        )
-        st.session_state.adaptation_method = 'rule_based' if 'Simple' in method else 'ml_based'
-        
-        st.markdown("---")
-        st.markdown("**About Adaptation Methods:**")
-        if 'Simple' in method:
-            st.info("📋 **Simple Rules**: If child gets 3 correct in a row → harder level. If 2 wrong in a row → easier level.")
-        else:
-            st.info("🧠 **Smart AI**: Uses accuracy, speed, and recent performance to predict the best difficulty level.")
-    
-    st.title("🧮 Adaptive Math Learning")
-    st.markdown("### Welcome! Let's practice math together!")
-    st.markdown("*Fun math puzzles that adjust to your skill level!*")
-    
-    st.session_state.user_name = st.text_input("What's your name?", key='name_input', placeholder="Enter your name here...")
-    
-    st.markdown("#### Choose your starting difficulty:")
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        if st.button("🟢 Easy", use_container_width=True, help="Simple addition and subtraction (1-10)"):
-            st.session_state.difficulty = 'Easy'
-    with col2:
-        if st.button("🟡 Medium", use_container_width=True, help="Bigger numbers and multiplication"):
-            st.session_state.difficulty = 'Medium'
-    with col3:
-        if st.button("🔴 Hard", use_container_width=True, help="Challenging multiplication and division"):
-            st.session_state.difficulty = 'Hard'
-    
-    st.info(f"Selected Difficulty: **{st.session_state.difficulty}**")
-    
-    if st.button("🚀 Start Learning!", use_container_width=True, type="primary"):
-        if st.session_state.user_name:
-            st.session_state.adaptive_engine = AdaptiveEngine(method=st.session_state.adaptation_method)
-            st.session_state.stage = 'quiz'
-            st.rerun()
-        else:
-            st.error("Please enter your name!")
-
-def generate_new_question():
-    question, answer = st.session_state.puzzle_gen.generate_puzzle(st.session_state.difficulty)
-    st.session_state.current_question = question
-    st.session_state.current_answer = answer
-    st.session_state.tracker.start_question()
-
-def quiz_screen():
-    st.title(f"Hi {st.session_state.user_name}! 👋")
-    
-    # Progress bar
-    progress = st.session_state.question_count / st.session_state.max_questions
-    st.progress(progress)
-    st.markdown(f"**Question {st.session_state.question_count + 1} of {st.session_state.max_questions}**")
-    
-    # Display current difficulty with friendly colors
-    difficulty_color = {'Easy': '🟢', 'Medium': '🟡', 'Hard': '🔴'}
-    st.markdown(f"### Current Level: {difficulty_color[st.session_state.difficulty]} {st.session_state.difficulty}")
-    
-    # Generate question if needed
-    if st.session_state.current_question is None:
-        generate_new_question()
-    
-    # Display question in a friendly way
-    st.markdown(f"## 🧮 What is: `{st.session_state.current_question}` ?")
-    
-    # Answer input
-    user_answer = st.number_input("Your answer:", step=1, key=f'answer_{st.session_state.question_count}', value=0)
-    
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        if st.button("✅ Submit Answer", use_container_width=True, type="primary"):
-            # Record answer
-            is_correct, response_time = st.session_state.tracker.record_answer(
-                st.session_state.current_question,
-                user_answer,
-                st.session_state.current_answer,
-                st.session_state.difficulty
-            )
-            
-            # Increment question count
-            st.session_state.question_count += 1
-            
-            # Adapt difficulty BEFORE showing feedback
-            new_difficulty = st.session_state.adaptive_engine.adapt_difficulty(
-                st.session_state.difficulty,
-                st.session_state.tracker
-            )
-            
-            # Show friendly, encouraging feedback
-            if is_correct:
-                if new_difficulty != st.session_state.difficulty:
-                    if new_difficulty == 'Medium':
-                        st.success(f"🎉 Great job! You got it in {response_time:.1f}s! You're on a roll! Let's try a harder one next!")
-                    elif new_difficulty == 'Hard':
-                        st.success(f"🏆 Awesome! You got it in {response_time:.1f}s! Super! Ready for an extra challenge?")
-                else:
-                    st.success(f"✨ Excellent work! You got it in {response_time:.1f}s! Keep it up!")
-            else:
-                if new_difficulty != st.session_state.difficulty:
-                    if new_difficulty == 'Easy':
-                        st.error(f"😊 The answer was **{st.session_state.current_answer}**. No worries! Let's try an easier puzzle to help you out!")
-                    elif new_difficulty == 'Medium':
-                        st.error(f"💡 The answer was **{st.session_state.current_answer}**. Almost there! Let's try something a bit easier.")
-                else:
-                    st.error(f"👍 The answer was **{st.session_state.current_answer}**. Keep going! Practice makes perfect!")
-            
-            time.sleep(2)  # Give kids time to read the message
-            
-            # Check if session complete
-            if st.session_state.question_count >= st.session_state.max_questions:
-                st.session_state.stage = 'summary'
-                st.rerun()
-            
-            # Update difficulty
-            if new_difficulty != st.session_state.difficulty:
-                st.session_state.difficulty = new_difficulty
-            
-            # Clear current question for next one
-            st.session_state.current_question = None
-            st.rerun()
-    
-    with col2:
-        if st.button("🛑 End Session", use_container_width=True):
-            st.session_state.stage = 'summary'
-            st.rerun()
-
-def summary_screen():
-    st.title("📊 Session Summary")
-    st.markdown(f"### Great work, {st.session_state.user_name}! 🎉")
-    
-    summary = st.session_state.tracker.get_summary()
-    
-    if summary:
-        # Display key metrics in columns
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            st.metric("Total Questions", summary['total_questions'])
-        with col2:
-            st.metric("Correct Answers", summary['correct_answers'])
-        with col3:
-            st.metric("Accuracy", f"{summary['accuracy']}%")
-        
-        st.metric("⏱️ Average Response Time", f"{summary['avg_response_time']} seconds")
-        
-        # Friendly recommendation
-        recommended_level = st.session_state.adaptive_engine.recommend_next_level(st.session_state.tracker)
-        
-        if recommended_level == 'Hard':
-            st.success(f"🎯 **Amazing! Try the Hard level next time!**")
-        elif recommended_level == 'Medium':
-            st.success(f"🎯 **You're doing great! Try the Medium level next time!**")
-        else:
-            st.success(f"🎯 **Keep practicing! Start with Easy level next time!**")
-        
-        # Performance visualization
-        st.markdown("### 📈 Your Performance")
-        st.markdown("*Green = Correct, Red = Try Again*")
-        
-        if st.session_state.tracker.records:
-            import pandas as pd
-            df = pd.DataFrame(st.session_state.tracker.records)
-            st.bar_chart(df['is_correct'].astype(int))
-        
-        # Encouragement message based on accuracy
-        if summary['accuracy'] >= 80:
-            st.balloons()
-            st.markdown("### 🌟 Outstanding performance! You're a math star!")
-        elif summary['accuracy'] >= 60:
-            st.markdown("### 💪 Good job! Keep practicing and you'll be amazing!")
-        else:
-            st.markdown("### 🎈 Great effort! Every practice makes you better!")
-    
-    if st.button("🔄 Start New Session", use_container_width=True, type="primary"):
-        # Reset session state
-        st.session_state.stage = 'welcome'
-        st.session_state.question_count = 0
-        st.session_state.current_question = None
-        st.session_state.tracker = PerformanceTracker()
-        st.rerun()
-
-# Main app routing
-if st.session_state.stage == 'welcome':
-    welcome_screen()
-elif st.session_state.stage == 'quiz':
-    quiz_screen()
-elif st.session_state.stage == 'summary':
-    summary_screen()
+import streamlit as st
+import os
+import time
+import uuid
+from puzzle_generator import PuzzleGenerator, PuzzleQueue
+from tracker import PerformanceTracker
+from adaptive_engine import AdaptiveEngine
+from quiz_flow import FEEDBACK_SECONDS, prepare_next_question, speculate, submit_answer
+from storage import get_store
+from classroom import ALL_CLASSES, get_classroom
+import metrics
+
+# 'inline': feedback is shown with the next question and the server run returns
+# immediately; 'blocking': the old sleep-then-rerun behaviour
+FEEDBACK_MODE = os.environ.get('MATH_ADAPTIVE_FEEDBACK_MODE', 'inline')
+
+# Share of puzzles spent re-asking ones the child missed (0 = no reviews)
+REVIEW_RATE = float(os.environ.get('MATH_ADAPTIVE_REVIEW_RATE', 0))
+
+# How often the classroom dashboard re-reads the live aggregates
+DASHBOARD_REFRESH_SECONDS = 5
+
+# Local Prometheus endpoint and sampling profiler (both off by default)
+if os.environ.get('MATH_ADAPTIVE_METRICS_PORT'):
+    metrics.enable()
+    metrics.start_metrics_server(int(os.environ['MATH_ADAPTIVE_METRICS_PORT']))
+if os.environ.get('MATH_ADAPTIVE_PROFILE_HZ'):
+    metrics.start_sampling_profiler(int(os.environ['MATH_ADAPTIVE_PROFILE_HZ']))
+
+# Page configuration
+st.set_page_config(
+    page_title="Adaptive Math Learning",
+    page_icon="🧮",
+    layout="centered"
+)
+
+def new_tracker():
+    """Tracker for a fresh session, logged to the configured store (if any)
+    and reported to the classroom dashboard"""
+    return PerformanceTracker(
+        store=get_store(),
+        session_id=uuid.uuid4().hex,
+        classroom=get_classroom(),
+        class_id=st.session_state.get('class_code') or None
+    )
+
+# Initialize session state
+if 'stage' not in st.session_state:
+    st.session_state.stage = 'welcome'
+    st.session_state.user_name = ''
+    st.session_state.class_code = ''
+    st.session_state.difficulty = 'Easy'
+    st.session_state.question_count = 0
+    st.session_state.max_questions = 10
+    st.session_state.current_question = None
+    st.session_state.current_answer = None
+    st.session_state.feedback = None
+    st.session_state.speculation = None  # next step for both outcomes, see quiz_flow.speculate
+    st.session_state.puzzle_gen = PuzzleGenerator(review_rate=REVIEW_RATE)
+    st.session_state.puzzle_queue = PuzzleQueue(st.session_state.puzzle_gen)
+    st.session_state.tracker = new_tracker()
+    st.session_state.adaptive_engine = None
+    st.session_state.adaptation_method = 'rule_based'  # Default to rule-based
+    st.session_state.rerun_stats = {}  # screen -> [reruns, total ns, max ns]
+
+def welcome_screen():
+    # Sidebar for teacher/parent settings
+    with st.sidebar:
+        st.markdown("### ⚙️ Settings (For Teachers/Parents)")
+        st.markdown("Choose how the app adjusts difficulty:")
+        method = st.radio(
+            "Adaptation Method:",
+            ['🎯 Simple Rules (Transparent Logic)', '🤖 Smart AI (Machine Learning)',
+             '📐 Calibrated (Puzzle Ratings)'],
+            key='method_choice',
+            help="Simple Rules: Clear if-then logic. Smart AI: Uses decision tree model. "
+                 "Calibrated: Rates every puzzle and picks the one that fits best."
+        )
+        if 'Simple' in method:
+            st.session_state.adaptation_method = 'rule_based'
+        elif 'Smart' in method:
+            st.session_state.adaptation_method = 'ml_based'
+        else:
+            st.session_state.adaptation_method = 'elo'
+        
+        st.markdown("---")
+        st.markdown("**About Adaptation Methods:**")
+        if 'Simple' in method:
+            st.info("📋 **Simple Rules**: If child gets 3 correct in a row → harder level. If 2 wrong in a row → easier level.")
+        elif 'Smart' in method:
+            st.info("🧠 **Smart AI**: Uses accuracy, speed, and recent performance to predict the best difficulty level.")
+        else:
+            st.info("📐 **Calibrated**: Every puzzle and every child has a rating that updates after each answer. "
+                    "The next puzzle is the one the child should get right about 7 times in 10.")
+        
+        st.markdown("---")
+        class_code = st.text_input("Class code (optional):", key='class_code_input',
+                                   help="Groups this child's answers on the classroom dashboard")
+        st.session_state.class_code = class_code.strip()
+        st.session_state.tracker.class_id = st.session_state.class_code or None
+        if st.button("👩‍🏫 Classroom Dashboard", use_container_width=True):
+            st.session_state.stage = 'classroom'
+            st.rerun()
+    
+    st.title("🧮 Adaptive Math Learning")
+    st.markdown("### Welcome! Let's practice math together!")
+    st.markdown("*Fun math puzzles that adjust to your skill level!*")
+    
+    st.session_state.user_name = st.text_input("What's your name?", key='name_input', placeholder="Enter your name here...")
+    
+    st.markdown("#### Choose your starting difficulty:")
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        if st.button("🟢 Easy", use_container_width=True, help="Simple addition and subtraction (1-10)"):
+            st.session_state.difficulty = 'Easy'
+    with col2:
+        if st.button("🟡 Medium", use_container_width=True, help="Bigger numbers and multiplication"):
+            st.session_state.difficulty = 'Medium'
+    with col3:
+        if st.button("🔴 Hard", use_container_width=True, help="Challenging multiplication and division"):
+            st.session_state.difficulty = 'Hard'
+    
+    st.info(f"Selected Difficulty: **{st.session_state.difficulty}**")
+    
+    if st.button("🚀 Start Learning!", use_container_width=True, type="primary"):
+        if st.session_state.user_name:
+            if st.session_state.adaptation_method == 'elo':
+                start_calibrated_session()
+            else:
+                st.session_state.adaptive_engine = AdaptiveEngine(method=st.session_state.adaptation_method)
+                if not isinstance(st.session_state.puzzle_queue, PuzzleQueue):
+                    st.session_state.puzzle_queue = PuzzleQueue(st.session_state.puzzle_gen)
+            st.session_state.stage = 'quiz'
+            st.rerun()
+        else:
+            st.error("Please enter your name!")
+
+def start_calibrated_session():
+    """Elo engine and queue for this child.
+    
+    The rating is kept under an opaque student id carried in the page link
+    (?student=...), so reopening the same link continues it.
+    """
+    from calibration import CalibratedQueue, StudentCalibration, get_item_bank, is_student_id, new_student_id
+    student_id = st.query_params.get('student')
+    if not is_student_id(student_id):
+        student_id = st.query_params['student'] = new_student_id()
+    calibration = StudentCalibration(get_item_bank(), student_id, st.session_state.difficulty)
+    st.session_state.adaptive_engine = AdaptiveEngine(method='elo', calibration=calibration)
+    st.session_state.puzzle_queue = CalibratedQueue(st.session_state.puzzle_gen, calibration)
+    st.session_state.difficulty = calibration.level()
+
+def generate_new_question():
+    prepare_next_question(st.session_state)
+
+def show_feedback():
+    """Show the feedback for the last answer, if there is any to show"""
+    feedback = st.session_state.feedback
+    if feedback and feedback['text']:
+        if feedback['kind'] == 'success':
+            st.success(feedback['text'])
+        else:
+            st.error(feedback['text'])
+
+def quiz_screen():
+    st.title(f"Hi {st.session_state.user_name}! 👋")
+    
+    # Progress bar
+    progress = st.session_state.question_count / st.session_state.max_questions
+    st.progress(progress)
+    st.markdown(f"**Question {st.session_state.question_count + 1} of {st.session_state.max_questions}**")
+    
+    # Display current difficulty with friendly colors
+    difficulty_color = {'Easy': '🟢', 'Medium': '🟡', 'Hard': '🔴'}
+    st.markdown(f"### Current Level: {difficulty_color[st.session_state.difficulty]} {st.session_state.difficulty}")
+    
+    # Feedback for the previous answer stays up while the child reads the new question
+    show_feedback()
+    
+    # Generate question if needed
+    if st.session_state.current_question is None:
+        generate_new_question()
+    
+    # Display question in a friendly way
+    st.markdown(f"## 🧮 What is: `{st.session_state.current_question}` ?")
+    
+    # Answer input
+    user_answer = st.number_input("Your answer:", step=1, key=f'answer_{st.session_state.question_count}', value=0)
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        if st.button("✅ Submit Answer", use_container_width=True, type="primary"):
+            # Record, adapt and prepare the next question in this run
+            blocking = FEEDBACK_MODE == 'blocking'
+            submit_answer(st.session_state, user_answer, prepare_next=not blocking)
+            
+            if blocking:
+                # Legacy behaviour: hold the script run while kids read the message
+                show_feedback()
+                time.sleep(FEEDBACK_SECONDS)
+                st.session_state.feedback = None
+            
+            st.rerun()
+    
+    with col2:
+        if st.button("🛑 End Session", use_container_width=True):
+            st.session_state.stage = 'summary'
+            st.rerun()
+    
+    # The question is on screen: get both possible next steps ready while the child works it out
+    speculate(st.session_state)
+
+def summary_screen():
+    st.title("📊 Session Summary")
+    st.markdown(f"### Great work, {st.session_state.user_name}! 🎉")
+    
+    show_feedback()
+    
+    summary = st.session_state.tracker.get_summary()
+    
+    if summary:
+        # Display key metrics in columns
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            st.metric("Total Questions", summary['total_questions'])
+        with col2:
+            st.metric("Correct Answers", summary['correct_answers'])
+        with col3:
+            st.metric("Accuracy", f"{summary['accuracy']}%")
+        
+        st.metric("⏱️ Average Response Time", f"{summary['avg_response_time']} seconds")
+        
+        # Friendly recommendation
+        recommended_level = st.session_state.adaptive_engine.recommend_next_level(st.session_state.tracker, summary)
+        
+        if recommended_level == 'Hard':
+            st.success(f"🎯 **Amazing! Try the Hard level next time!**")
+        elif recommended_level == 'Medium':
+            st.success(f"🎯 **You're doing great! Try the Medium level next time!**")
+        else:
+            st.success(f"🎯 **Keep practicing! Start with Easy level next time!**")
+        
+        # Performance visualization
+        st.markdown("### 📈 Your Performance")
+        st.markdown("*Green = Correct, Red = Try Again*")
+        
+        if st.session_state.tracker.records:
+            st.bar_chart(st.session_state.tracker.chart_data(), x='question', y='correct')
+        
+        # Encouragement message based on accuracy
+        if summary['accuracy'] >= 80:
+            st.balloons()
+            st.markdown("### 🌟 Outstanding performance! You're a math star!")
+        elif summary['accuracy'] >= 60:
+            st.markdown("### 💪 Good job! Keep practicing and you'll be amazing!")
+        else:
+            st.markdown("### 🎈 Great effort! Every practice makes you better!")
+    
+    if st.button("🔄 Start New Session", use_container_width=True, type="primary"):
+        # Reset session state
+        st.session_state.stage = 'welcome'
+        st.session_state.question_count = 0
+        st.session_state.current_question = None
+        st.session_state.feedback = None
+        st.session_state.tracker = new_tracker()
+        st.rerun()
+
+def classroom_screen():
+    st.title("👩‍🏫 Classroom Dashboard")
+    st.markdown("*Live view of every child practicing right now*")
+    
+    classroom = get_classroom()
+    choice = st.selectbox("Class:", ['All classes'] + classroom.classes(), key='dashboard_class')
+    live_class_view(ALL_CLASSES if choice == 'All classes' else choice)
+    
+    if st.button("⬅️ Back", use_container_width=True):
+        st.session_state.stage = 'welcome'
+        st.rerun()
+
+@st.fragment(run_every=DASHBOARD_REFRESH_SECONDS)
+def live_class_view(class_id):
+    """Dashboard numbers from the aggregator's snapshot (never from raw records)"""
+    snapshot = get_classroom().snapshot(class_id)
+    if snapshot is None:
+        st.info("No answers yet. Numbers show up as soon as children start answering.")
+        return
+    
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Active Students", snapshot['active_sessions'])
+    col2.metric("Answers", snapshot['answers'])
+    col3.metric("Accuracy", f"{snapshot['accuracy']}%")
+    median = snapshot['response_time']['p50']
+    col4.metric("Median Time", f"{median}s" if median is not None else "-")
+    
+    st.markdown("### 📊 By Difficulty")
+    st.table([
+        {
+            'Level': difficulty,
+            'Answers': stats['answers'],
+            'Accuracy %': stats['accuracy'],
+            'Median s': stats['response_time']['p50'],
+            '90% within s': stats['response_time']['p90'],
+        }
+        for difficulty, stats in snapshot['difficulty'].items()
+    ])
+    
+    st.markdown(f"### 🔀 Level Changes: ⬆️ {snapshot['level_ups']}  ⬇️ {snapshot['level_downs']}")
+    if snapshot['level_changes']:
+        st.table([{'Change': change, 'Count': n} for change, n in snapshot['level_changes'].items()])
+    
+    if class_id == ALL_CLASSES:
+        classes = get_classroom().snapshots()
+        if classes:
+            st.markdown("### 🏫 All Classes")
+            st.table([
+                {
+                    'Class': name,
+                    'Active': s['active_sessions'],
+                    'Answers': s['answers'],
+                    'Accuracy %': s['accuracy'],
+                    'Median s': s['response_time']['p50'],
+                }
+                for name, s in classes.items()
+            ])
+
+def run_screen(name, screen):
+    """Run one screen, timing the rerun for this session and the process"""
+    with metrics.timer(f'screen_{name}') as t:
+        try:
+            screen()
+        finally:
+            # st.rerun() ends the run with an exception; still count it
+            elapsed = time.perf_counter_ns() - t.start
+            stats = st.session_state.rerun_stats.setdefault(name, [0, 0, 0])
+            stats[0] += 1
+            stats[1] += elapsed
+            stats[2] = max(stats[2], elapsed)
+
+def admin_panel():
+    """Per-process and per-session performance stats (when metrics are on)"""
+    if not metrics.is_enabled():
+        return
+    with st.sidebar.expander("📈 Admin: performance"):
+        histograms, counters = metrics.collect()
+        st.markdown("**This process**")
+        st.table([
+            {
+                'operation': name,
+                'samples': h.count,
+                'mean ms': round(h.sum_ns / h.count / 1e6, 3),
+                'p50 ms ≤': round(h.quantile(0.5) * 1e3, 3),
+                'p99 ms ≤': round(h.quantile(0.99) * 1e3, 3),
+            }
+            for name, h in sorted(histograms.items()) if h.count
+        ])
+        st.markdown("**This session**")
+        st.table([
+            {
+                'screen': name,
+                'reruns': runs,
+                'mean ms': round(total / runs / 1e6, 2),
+                'max ms': round(worst / 1e6, 2),
+            }
+            for name, (runs, total, worst) in st.session_state.rerun_stats.items()
+        ])
+        summary = st.session_state.tracker.get_summary()
+        if summary:
+            st.json(summary)
+
+# Main app routing
+admin_panel()
+if st.session_state.stage == 'welcome':
+    run_screen('welcome', welcome_screen)
+elif st.session_state.stage == 'quiz':
+    run_screen('quiz', quiz_screen)
+elif st.session_state.stage == 'summary':
+    run_screen('summary', summary_screen)
+elif st.session_state.stage == 'classroom':
+    run_screen('classroom', classroom_screen)
@@ -0,0 +1,385 @@
+"""Low-overhead latency histograms and counters for the hot paths.
+
+``timed`` leaves the function itself in place, so an ordinary call costs
+nothing extra. While metrics are on, a sampler thread "arms" every timed
+function MATH_ADAPTIVE_METRICS_HZ times a second (default 100): it swaps a
+timing wrapper into the class or module attribute, and the wrapper puts
+the bare function back and times that one call. The histograms of timed
+functions therefore hold samples, not every call. Each thread records
+into its own histograms without a lock; ``collect`` merges them, and
+folds in the histograms of threads that have exited.
+    
+    @timed('record_answer')
+    def record_answer(...): ...
+    
+    with timer('screen_quiz'):
+        quiz_screen()
+
+Only functions reachable by their qualified name (module-level functions
+and methods of module-level classes) can be armed, and a reference taken
+before arming (``from module import function``, a stored bound method)
+always calls the bare function. Recording is on when MATH_ADAPTIVE_METRICS
+or MATH_ADAPTIVE_METRICS_PORT is set at import time, or after ``enable()``.
+
+``start_metrics_server(port)`` serves everything in Prometheus text format
+at http://127.0.0.1:<port>/metrics (and sampled stacks at /profile when
+the sampling profiler is running).
+"""
+import functools
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+METRIC_PREFIX = 'math_adaptive'
+
+# Histogram bucket upper bounds in ns: 1.024us, 2.048us ... ~8.6s, then +Inf.
+# Powers of two so the bucket index is a bit_length() instead of a search.
+BUCKET_BOUNDS_NS = [1024 << k for k in range(24)]
+
+SAMPLE_HZ = float(os.environ.get('MATH_ADAPTIVE_METRICS_HZ', '100'))
+
+_enabled = False
+_sampling = threading.Event()  # set while the sampler should arm functions
+_sampler = None
+_sites = []  # every timed() function
+_local = threading.local()
+_stores = []  # (thread, {name: Histogram}) for each thread that has recorded
+_retired = {}  # name -> Histogram, totals of threads that have exited
+_counters = {}
+_lock = threading.Lock()
+
+
+class Histogram:
+    # One bucket per possible bit_length() so observe() needs no clamping;
+    # everything past the last bound is reported as +Inf
+    __slots__ = ('buckets', 'sum_ns')
+    
+    def __init__(self):
+        self.buckets = [0] * 64
+        self.sum_ns = 0
+    
+    def observe(self, elapsed_ns):
+        self.buckets[((elapsed_ns - 1) >> 10).bit_length()] += 1
+        self.sum_ns += elapsed_ns
+    
+    @property
+    def count(self):
+        return sum(self.buckets)
+    
+    def merge(self, other):
+        for i, n in enumerate(other.buckets):
+            self.buckets[i] += n
+        self.sum_ns += other.sum_ns
+    
+    def quantile(self, q):
+        """Approximate quantile in seconds (upper bound of the bucket)"""
+        count = self.count
+        if not count:
+            return None
+        target = q * count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= target:
+                bound = BUCKET_BOUNDS_NS[i] if i < len(BUCKET_BOUNDS_NS) else BUCKET_BOUNDS_NS[-1] * 2
+                return bound / 1e9
+        return None
+
+
+def enable(on=True):
+    """Turn recording (and the sampler thread) on or off"""
+    global _enabled, _sampler
+    _enabled = on
+    if not on:
+        _sampling.clear()
+        for site in tuple(_sites):
+            site.disarm()
+        return
+    _sampling.set()
+    with _lock:
+        if _sampler is None:
+            _sampler = threading.Thread(target=_sample_forever, name='metrics-sampler', daemon=True)
+            _sampler.start()
+
+
+def is_enabled():
+    return _enabled
+
+
+def _fold_exited():
+    """Move the stores of exited threads into _retired (call with _lock held)"""
+    live = []
+    for thread, store in _stores:
+        if thread.is_alive():
+            live.append((thread, store))
+            continue
+        for name, histogram in store.items():
+            _retired.setdefault(name, Histogram()).merge(histogram)
+    _stores[:] = live
+
+
+def _histogram(name):
+    """This thread's histogram for ``name``, created on first use"""
+    store = getattr(_local, 'histograms', None)
+    if store is None:
+        store = _local.histograms = {}
+        with _lock:
+            _fold_exited()
+            _stores.append((threading.current_thread(), store))
+    histogram = store.get(name)
+    if histogram is None:
+        histogram = store[name] = Histogram()
+    return histogram
+
+
+def observe(name, elapsed_ns):
+    """Record one latency sample (ns) for ``name``"""
+    _histogram(name).observe(elapsed_ns)
+
+
+def increment(name, amount=1):
+    """Add to the counter ``name``"""
+    if _enabled:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + amount
+
+
+async def _time_awaited(coro, name):
+    start = time.perf_counter_ns()
+    result = await coro
+    _histogram(name).observe(time.perf_counter_ns() - start)
+    return result
+
+
+class _Site:
+    """One timed function and the attribute it is called through"""
+    
+    def __init__(self, name, fn):
+        import inspect
+        self.name = name
+        self.fn = fn
+        self.attr = fn.__name__
+        self.owner = None
+        is_coroutine = inspect.iscoroutinefunction(fn)
+        clock = time.perf_counter_ns
+        
+        @functools.wraps(fn)
+        def timing(*args, **kwargs):
+            self.disarm()
+            if not _enabled:
+                return fn(*args, **kwargs)
+            if is_coroutine:
+                return _time_awaited(fn(*args, **kwargs), name)
+            start = clock()
+            result = fn(*args, **kwargs)
+            _histogram(name).observe(clock() - start)
+            return result
+        self.timing = timing
+    
+    def _resolve(self):
+        parts = self.fn.__qualname__.split('.')
+        if '<locals>' in parts:
+            return None
+        owner = sys.modules.get(self.fn.__module__)
+        for part in parts[:-1]:
+            owner = getattr(owner, part, None)
+        return owner
+    
+    def arm(self):
+        """Time the next call (if the bare function is still in place)"""
+        if self.owner is None:
+            self.owner = self._resolve()
+            if self.owner is None:
+                return
+        if vars(self.owner).get(self.attr) is self.fn:
+            setattr(self.owner, self.attr, self.timing)
+    
+    def disarm(self):
+        if self.owner is not None and vars(self.owner).get(self.attr) is self.timing:
+            setattr(self.owner, self.attr, self.fn)
+
+
+def _arm_sites():
+    for site in tuple(_sites):
+        site.arm()
+
+
+def _sample_forever():
+    interval = 1 / SAMPLE_HZ
+    while True:
+        _sampling.wait()
+        time.sleep(interval)
+        if _sampling.is_set():
+            _arm_sites()
+
+
+def timed(name):
+    """Decorator sampling the function's latency under ``name``.
+    
+    Returns the function unchanged; see the module docstring for how its
+    calls are sampled. Calls that raise are not recorded. For coroutine
+    functions the sampled call is timed until its result is ready.
+    """
+    def decorate(fn):
+        _sites.append(_Site(name, fn))
+        return fn
+    return decorate
+
+
+class timer:
+    """Context manager recording the block's latency under ``name``"""
+    __slots__ = ('name', 'start', 'elapsed')
+    
+    def __init__(self, name):
+        self.name = name
+        self.start = None
+        self.elapsed = None
+    
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.elapsed = time.perf_counter_ns() - self.start
+        if _enabled:
+            _histogram(self.name).observe(self.elapsed)
+        return False
+
+
+def collect():
+    """Snapshot of (histograms merged over all threads, counters)"""
+    with _lock:
+        _fold_exited()
+        histograms = {}
+        for name, histogram in _retired.items():
+            histograms.setdefault(name, Histogram()).merge(histogram)
+        for _, store in _stores:
+            # list() copies in one step; the owner may be adding a name
+            for name, histogram in list(store.items()):
+                histograms.setdefault(name, Histogram()).merge(histogram)
+        return histograms, dict(_counters)
+
+
+def reset():
+    """Forget everything recorded so far"""
+    with _lock:
+        for _, store in _stores:
+            store.clear()
+        _retired.clear()
+        _counters.clear()
+
+
+def render_prometheus():
+    """All metrics in Prometheus text exposition format"""
+    histograms, counters = collect()
+    lines = []
+    metric = f'{METRIC_PREFIX}_latency_seconds'
+    lines.append(f'# HELP {metric} Latency of instrumented operations.')
+    lines.append(f'# TYPE {metric} histogram')
+    for name in sorted(histograms):
+        histogram = histograms[name]
+        count = histogram.count
+        cumulative = 0
+        for bound, n in zip(BUCKET_BOUNDS_NS, histogram.buckets):
+            cumulative += n
+            lines.append(f'{metric}_bucket{{op="{name}",le="{bound / 1e9:g}"}} {cumulative}')
+        lines.append(f'{metric}_bucket{{op="{name}",le="+Inf"}} {count}')
+        lines.append(f'{metric}_sum{{op="{name}"}} {histogram.sum_ns / 1e9:.9f}')
+        lines.append(f'{metric}_count{{op="{name}"}} {count}')
+    for name in sorted(counters):
+        counter = f'{METRIC_PREFIX}_{name}_total'
+        lines.append(f'# TYPE {counter} counter')
+        lines.append(f'{counter} {counters[name]}')
+    return '\n'.join(lines) + '\n'
+
+
+class SamplingProfiler:
+    """Samples every thread's Python stack ``hz`` times a second.
+    
+    Stacks are kept as collapsed "a;b;c" strings with sample counts, the
+    input format of flamegraph tools.
+    """
+    
+    def __init__(self, hz=100, max_depth=32):
+        self.interval = 1.0 / hz
+        self.max_depth = max_depth
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+            self._thread.start()
+        return self
+    
+    def stop(self):
+        self._stop.set()
+    
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                    frame = frame.f_back
+                self.samples[';'.join(reversed(stack))] += 1
+    
+    def render(self):
+        return ''.join(f'{stack} {n}\n' for stack, n in self.samples.most_common())
+
+
+_server = None
+_profiler = None
+_server_lock = threading.Lock()
+
+
+def start_sampling_profiler(hz=100):
+    """Start the process-wide sampling profiler (once)"""
+    global _profiler
+    with _server_lock:
+        if _profiler is None:
+            _profiler = SamplingProfiler(hz).start()
+    return _profiler
+
+
+def start_metrics_server(port, host='127.0.0.1'):
+    """Serve /metrics (and /profile) on a local port from a daemon thread (once per process)"""
+    global _server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/metrics':
+                body = render_prometheus()
+            elif self.path == '/profile' and _profiler is not None:
+                body = _profiler.render()
+            else:
+                self.send_error(404)
+                return
+            payload = body.encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        
+        def log_message(self, *args):
+            pass
+    
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), Handler)
+            threading.Thread(target=_server.serve_forever, name='metrics-server', daemon=True).start()
+    return _server
+
+
+if any(os.environ.get(var, '') not in ('', '0')
+       for var in ('MATH_ADAPTIVE_METRICS', 'MATH_ADAPTIVE_METRICS_PORT')):
+    enable()
@@ -0,0 +1,185 @@
+import logging
+import os
+import threading
+import time
+
+import joblib
+import numpy as np
+from sklearn.tree import DecisionTreeClassifier
+
+BUILTIN_VERSION = 'builtin-v1'
+ARTIFACT_SUFFIX = '.joblib'
+ACTIVE_POINTER = 'ACTIVE'
+
+log = logging.getLogger(__name__)
+
+DEFAULT_MODEL_DIR = os.environ.get(
+    'MATH_ADAPTIVE_MODEL_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'models')
+)
+
+
+def fit_builtin_model():
+    """Fit the small bootstrap decision tree shipped with the app"""
+    # Features: [accuracy_rate, avg_response_time_normalized, consecutive_correct]
+    # Labels: 0=Easy, 1=Medium, 2=Hard
+    
+    X_train = np.array([
+        [0.3, 0.8, 0],  # Low accuracy, slow -> Easy
+        [0.5, 0.6, 1],  # Medium accuracy -> Easy
+        [0.7, 0.5, 2],  # Good accuracy -> Medium
+        [0.8, 0.4, 3],  # High accuracy -> Medium
+        [0.9, 0.3, 3],  # Very high accuracy -> Hard
+        [0.4, 0.7, 0],  # Struggling -> Easy
+        [0.95, 0.2, 4], # Excellent -> Hard
+    ])
+    
+    y_train = np.array([0, 0, 1, 1, 2, 0, 2])
+    
+    model = DecisionTreeClassifier(max_depth=3, random_state=42)
+    model.fit(X_train, y_train)
+    return model
+
+
+class ModelRegistry:
+    """Process-wide cache of fitted difficulty models.
+    
+    Each version is loaded (or fitted) once and shared read-only by every
+    session and thread. Artifacts live in ``model_dir`` as
+    ``<version>.joblib``; an optional ``ACTIVE`` file there names the version
+    new predictions should use, and editing it hot-swaps the model without a
+    restart. If the version it names can't be loaded, the error is logged
+    and the previous model stays active.
+    """
+    
+    def __init__(self, model_dir=DEFAULT_MODEL_DIR, refresh_interval=5.0):
+        self.model_dir = model_dir
+        self.refresh_interval = refresh_interval
+        self._models = {}
+        self._lock = threading.Lock()
+        self._active_version = None
+        self._pointer_mtime = None
+        self._last_refresh = float('-inf')
+    
+    def artifact_path(self, version):
+        return os.path.join(self.model_dir, version + ARTIFACT_SUFFIX)
+    
+    def available_versions(self):
+        """Versions that have an artifact on disk"""
+        if not os.path.isdir(self.model_dir):
+            return []
+        return sorted(
+            name[:-len(ARTIFACT_SUFFIX)] for name in os.listdir(self.model_dir)
+            if name.endswith(ARTIFACT_SUFFIX)
+        )
+    
+    def get_model(self, version=None):
+        """Return the fitted model for ``version`` (default: active version)"""
+        if version is None:
+            version = self.active_version()
+        
+        model = self._models.get(version)
+        if model is not None:
+            return model
+        
+        with self._lock:
+            model = self._models.get(version)
+            if model is None:
+                model = self._load(version)
+                self._models[version] = model
+        return model
+    
+    def _load(self, version):
+        path = self.artifact_path(version)
+        if os.path.exists(path):
+            return joblib.load(path)
+        if version == BUILTIN_VERSION:
+            return fit_builtin_model()
+        raise KeyError(f"Unknown model version: {version}")
+    
+    def register(self, version, model):
+        """Add an already fitted model under ``version``"""
+        with self._lock:
+            self._models[version] = model
+    
+    def save(self, version, model):
+        """Serialize ``model`` as an artifact and register it"""
+        os.makedirs(self.model_dir, exist_ok=True)
+        path = self.artifact_path(version)
+        tmp_path = path + '.tmp'
+        joblib.dump(model, tmp_path)
+        os.replace(tmp_path, path)
+        self.register(version, model)
+        return path
+    
+    def activate(self, version, persist=False):
+        """Make ``version`` the model used for new predictions"""
+        self.get_model(version)
+        with self._lock:
+            self._active_version = version
+        if persist:
+            os.makedirs(self.model_dir, exist_ok=True)
+            pointer = os.path.join(self.model_dir, ACTIVE_POINTER)
+            with open(pointer + '.tmp', 'w') as f:
+                f.write(version)
+            os.replace(pointer + '.tmp', pointer)
+            self._pointer_mtime = os.path.getmtime(pointer)
+    
+    def active_version(self):
+        """Currently active version, re-reading the ACTIVE pointer now and then"""
+        now = time.monotonic()
+        if now - self._last_refresh >= self.refresh_interval:
+            self._last_refresh = now
+            self._refresh_pointer()
+        return self._active_version or BUILTIN_VERSION
+    
+    def _refresh_pointer(self):
+        pointer = os.path.join(self.model_dir, ACTIVE_POINTER)
+        try:
+            mtime = os.path.getmtime(pointer)
+        except OSError:
+            return
+        if mtime == self._pointer_mtime:
+            return
+        try:
+            with open(pointer) as f:
+                version = f.read().strip()
+            if version:
+                self.get_model(version)
+        except Exception:
+            # A bad pointer must not break sessions mid-quiz: keep serving the
+            # current model, and don't retry until the file changes again
+            log.exception('ignoring %s: cannot load the version it names; still serving %s',
+                          pointer, self._active_version or BUILTIN_VERSION)
+            self._pointer_mtime = mtime
+            return
+        with self._lock:
+            if version:
+                self._active_version = version
+            self._pointer_mtime = mtime
+    
+    def evict(self, version):
+        """Drop a cached version (the active one is kept)"""
+        with self._lock:
+            if version != self._active_version:
+                self._models.pop(version, None)
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """The process-wide ModelRegistry shared by all sessions"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+    return _registry
+
+
+if __name__ == '__main__':
+    # Export the builtin model as an artifact: python src/model_registry.py
+    registry = get_registry()
+    print(registry.save(BUILTIN_VERSION, fit_builtin_model()))
@@ -0,0 +1,402 @@
+"""Model selection: replay logged sessions through candidate adaptation policies.
+
+Per-answer features are extracted once from the SQLite answer log into
+memory-mapped .npy columns (worker processes fill disjoint slices of
+the same files). Candidates - RuleTable variants, decision trees of
+several depths and other sklearn classifiers - are then evaluated in a
+process pool; every worker maps the same column files read-only, so the
+data is shared through the page cache instead of copied per worker.
+
+For each candidate on the validation sessions it reports:
+    accuracy        predicted level == the level the child handled next
+                    (training.py's label)
+    coverage        share of answers where the policy picks the level the
+                    log actually served next (replay matches)
+    replay_success  correct-answer rate on the matched answers
+    time_in_flow    share of matched answers followed by an accuracy in
+                    FLOW_BAND over the child's next FLOW_WINDOW answers
+    latency_us      median cost of one decision, called as AdaptiveEngine does
+
+The winner (best time_in_flow among candidates with enough coverage and
+decisions within the latency budget) is saved to the model registry.
+Models load with ``AdaptiveEngine('ml_based', model_version=...)``, rule
+tables with ``AdaptiveEngine('rule_based', model_version=...)``.
+    
+    python src/model_selection.py answers.db --version selected-v1
+"""
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from rules import RuleTable
+from training import LEVELS, MIN_ANSWERS, is_validation_session, max_rss_mb, session_ranges
+
+FLOW_BAND = (0.6, 0.9)
+FLOW_WINDOW = 5
+HISTORY_BITS = 8  # answers packed into the history column (bit 0 = latest)
+LATENCY_CALLS = 2000
+
+# name -> (dtype, fill for missing values)
+COLUMNS = {
+    'split': (np.uint8, 0),
+    'level': (np.int8, -1),
+    'n': (np.int32, 0),
+    'correct': (np.int32, 0),
+    'time_sum': (np.float64, 0.0),
+    'streak': (np.int8, 0),
+    'history': (np.uint8, 0),
+    'next_level': (np.int8, -1),
+    'next_correct': (np.int8, -1),
+    'future_accuracy': (np.float32, np.nan),
+}
+
+FEATURE_QUERY = """
+SELECT
+    session_id,
+    difficulty,
+    COUNT(*) OVER running,
+    SUM(is_correct) OVER running,
+    SUM(response_time) OVER running,
+    SUM(is_correct) OVER (PARTITION BY session_id ORDER BY seq ROWS 4 PRECEDING),
+    is_correct + {history},
+    LEAD(difficulty) OVER ordered,
+    LEAD(is_correct) OVER ordered,
+    AVG(is_correct) OVER (PARTITION BY session_id ORDER BY seq
+                          ROWS BETWEEN 1 FOLLOWING AND {window} FOLLOWING)
+FROM answers
+WHERE session_id >= ? AND (? IS NULL OR session_id < ?)
+WINDOW running AS (PARTITION BY session_id ORDER BY seq ROWS UNBOUNDED PRECEDING),
+       ordered AS (PARTITION BY session_id ORDER BY seq)
+ORDER BY session_id, seq
+""".format(
+    history=' + '.join(
+        f'{1 << k} * COALESCE(LAG(is_correct, {k}) OVER ordered, 0)' for k in range(1, HISTORY_BITS)
+    ),
+    window=FLOW_WINDOW,
+)
+
+
+def default_candidates():
+    """(name, kind, params) of every policy evaluated by default"""
+    candidates = [
+        (f'rules-up{up}-down{down}', 'rules', {'up_streak': up, 'down_streak': down, 'min_answers': 3})
+        for up in (2, 3, 4) for down in (1, 2, 3)
+    ]
+    candidates += [(f'tree-depth{depth}', 'tree', {'max_depth': depth}) for depth in (2, 3, 4, 6, 8)]
+    candidates += [
+        ('logistic', 'logistic', {}),
+        ('forest', 'forest', {'n_estimators': 50, 'max_depth': 6}),
+        ('boosting', 'boosting', {'max_iter': 100, 'max_depth': 4}),
+    ]
+    return candidates
+
+
+def build_model(kind, params, seed=42):
+    """Unfitted sklearn classifier for a candidate kind"""
+    if kind == 'tree':
+        from sklearn.tree import DecisionTreeClassifier
+        return DecisionTreeClassifier(random_state=seed, **params)
+    if kind == 'logistic':
+        from sklearn.linear_model import LogisticRegression
+        return LogisticRegression(max_iter=500, **params)
+    if kind == 'forest':
+        from sklearn.ensemble import RandomForestClassifier
+        return RandomForestClassifier(random_state=seed, n_jobs=1, **params)
+    if kind == 'boosting':
+        from sklearn.ensemble import HistGradientBoostingClassifier
+        return HistGradientBoostingClassifier(random_state=seed, **params)
+    raise ValueError(f'Unknown candidate kind: {kind}')
+
+
+def column_path(work_dir, name):
+    return os.path.join(work_dir, name + '.npy')
+
+
+def load_columns(work_dir, mode='r'):
+    """The feature columns as memory maps"""
+    return {name: np.load(column_path(work_dir, name), mmap_mode=mode) for name in COLUMNS}
+
+
+def range_sizes(db_path, ranges):
+    conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+    try:
+        return [
+            conn.execute(
+                'SELECT COUNT(*) FROM answers WHERE session_id >= ? AND (? IS NULL OR session_id < ?)',
+                (start, end, end)
+            ).fetchone()[0]
+            for start, end in ranges
+        ]
+    finally:
+        conn.close()
+
+
+def extract_shard(args):
+    """Worker: stream one session range into rows [offset, offset + size) of the columns"""
+    db_path, work_dir, start, end, offset, chunk_size, validation_percent = args
+    columns = load_columns(work_dir, mode='r+')
+    level_code = {level: code for code, level in enumerate(LEVELS)}
+    split_cache = {}
+    row = offset
+    
+    conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+    try:
+        cursor = conn.execute(FEATURE_QUERY, (start, end, end))
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            (session_ids, level, n, correct, time_sum, streak, history,
+             next_level, next_correct, future_accuracy) = zip(*rows)
+            split = []
+            for session_id in session_ids:
+                value = split_cache.get(session_id)
+                if value is None:
+                    if len(split_cache) > 100_000:
+                        split_cache.clear()
+                    value = split_cache[session_id] = int(
+                        is_validation_session(session_id, validation_percent)
+                    )
+                split.append(value)
+            
+            values = {
+                'split': split,
+                'level': [level_code.get(d, -1) for d in level],
+                'n': n,
+                'correct': correct,
+                'time_sum': time_sum,
+                'streak': streak,
+                'history': history,
+                'next_level': [level_code.get(d, -1) for d in next_level],
+                'next_correct': [-1 if c is None else c for c in next_correct],
+                'future_accuracy': [np.nan if a is None else a for a in future_accuracy],
+            }
+            for name, column in values.items():
+                columns[name][row:row + len(rows)] = column
+            row += len(rows)
+    finally:
+        conn.close()
+    for column in columns.values():
+        column.flush()
+    return row - offset
+
+
+def extract_features(db_path, work_dir, workers, chunk_size=100_000, validation_percent=10):
+    """Write the per-answer columns to ``work_dir``; returns the number of rows"""
+    ranges = session_ranges(db_path, workers * 4)
+    sizes = range_sizes(db_path, ranges)
+    total = sum(sizes)
+    for name, (dtype, fill) in COLUMNS.items():
+        column = np.lib.format.open_memmap(column_path(work_dir, name), mode='w+', dtype=dtype, shape=(total,))
+        column[:] = fill
+        column.flush()
+        del column
+    
+    offsets = np.cumsum([0] + sizes[:-1]).tolist()
+    jobs = [
+        (db_path, work_dir, start, end, offset, chunk_size, validation_percent)
+        for (start, end), offset in zip(ranges, offsets)
+    ]
+    if workers == 1 or len(jobs) <= 1:
+        written = sum(map(extract_shard, jobs))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            written = sum(pool.map(extract_shard, jobs))
+    if written != total:
+        raise RuntimeError(f'Extracted {written} rows, expected {total} (was the log written to meanwhile?)')
+    return total
+
+
+def model_features(columns, rows):
+    """[accuracy_rate, avg_time_normalized, consecutive_correct] for ``rows`` (same as _ml_based_adapt)"""
+    n = columns['n'][rows].astype(np.float64)
+    accuracy_rate = np.round(columns['correct'][rows] / n * 100, 2) / 100
+    avg_time_normalized = np.minimum(np.round(columns['time_sum'][rows] / n, 2) / 30, 1)
+    return np.column_stack([accuracy_rate, avg_time_normalized, columns['streak'][rows]])
+
+
+def labels(columns, rows):
+    """The level the child handled next (one below it if they missed)"""
+    next_level = columns['next_level'][rows].astype(np.int64)
+    return np.where(columns['next_correct'][rows] == 1, next_level, np.maximum(next_level - 1, 0))
+
+
+def median_latency_us(decide, inputs):
+    timings = []
+    clock = time.perf_counter_ns
+    for features in inputs:
+        start = clock()
+        decide(features)
+        timings.append(clock() - start)
+    return round(float(np.median(timings)) / 1000, 3)
+
+
+def evaluate_candidate(args):
+    """Worker: fit (unless rules) and score one candidate; returns (report, fitted policy)"""
+    work_dir, (name, kind, params), fit_rows, seed = args
+    columns = load_columns(work_dir)
+    usable = (columns['n'] >= MIN_ANSWERS) & (columns['next_level'] >= 0)
+    train_rows = np.flatnonzero(usable & (columns['split'] == 0))
+    val_rows = np.flatnonzero(usable & (columns['split'] == 1))
+    if not len(train_rows) or not len(val_rows):
+        raise ValueError('Need both training and validation sessions with more than '
+                         f'{MIN_ANSWERS} answers')
+    sample = np.random.default_rng(seed).choice(val_rows, min(LATENCY_CALLS, len(val_rows)), replace=False)
+    
+    started = time.perf_counter()
+    if kind == 'rules':
+        policy = RuleTable(LEVELS, **params)
+        state = (np.minimum(columns['n'][val_rows], policy.count_cap) << policy.window) | (
+            columns['history'][val_rows] & policy.history_mask
+        )
+        predicted = policy.table[columns['level'][val_rows], state]
+        
+        def decide(row):
+            return policy.decide(LEVELS[columns['level'][row]], int(columns['history'][row]),
+                                 int(columns['n'][row]))
+        latency = median_latency_us(decide, sample.tolist())
+    else:
+        from inference import TreeEvaluator
+        if len(train_rows) > fit_rows:
+            train_rows = np.sort(np.random.default_rng(seed).choice(train_rows, fit_rows, replace=False))
+        policy = build_model(kind, params, seed)
+        policy.fit(model_features(columns, train_rows), labels(columns, train_rows))
+        predicted = policy.predict(model_features(columns, val_rows))
+        if TreeEvaluator.supports(policy):
+            decide = TreeEvaluator(policy).predict_one
+        else:
+            def decide(features):
+                return policy.predict([features])[0]
+        latency = median_latency_us(decide, model_features(columns, sample).tolist())
+    seconds = time.perf_counter() - started
+    
+    matched = predicted == columns['next_level'][val_rows]
+    future = columns['future_accuracy'][val_rows][matched]
+    future = future[~np.isnan(future)]
+    in_flow = (future >= FLOW_BAND[0]) & (future <= FLOW_BAND[1])
+    report = {
+        'name': name,
+        'kind': kind,
+        'params': params,
+        'accuracy': round(float(np.mean(predicted == labels(columns, val_rows))), 4),
+        'coverage': round(float(matched.mean()), 4),
+        'replay_success': round(float(np.mean(columns['next_correct'][val_rows][matched] == 1)), 4)
+        if matched.any() else None,
+        'time_in_flow': round(float(in_flow.mean()), 4) if len(future) else None,
+        'latency_us': latency,
+        'seconds': round(seconds, 3),
+        'validation_answers': int(len(val_rows)),
+    }
+    return report, policy
+
+
+def select_model(db_path, version=None, workers=None, chunk_size=100_000, validation_percent=10,
+                 fit_rows=200_000, candidates=None, min_coverage=0.05, max_latency_us=100.0,
+                 activate=False, model_dir=None, work_dir=None):
+    """Extract, evaluate every candidate and save the winner; returns a report dict"""
+    from model_registry import ModelRegistry, get_registry
+    
+    workers = workers or os.cpu_count() or 1
+    version = version or time.strftime('selected-%Y%m%d-%H%M%S')
+    candidates = candidates or default_candidates()
+    stages = {}
+    
+    def finish_stage(name, started, **extra):
+        own, children = max_rss_mb()
+        stages[name] = dict(
+            seconds=round(time.perf_counter() - started, 3),
+            peak_rss_mb=own, peak_worker_rss_mb=children, **extra
+        )
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        work_dir = work_dir or tmp
+        os.makedirs(work_dir, exist_ok=True)
+        
+        started = time.perf_counter()
+        rows = extract_features(db_path, work_dir, workers, chunk_size, validation_percent)
+        finish_stage('extract', started, answers=rows,
+                     column_mb=round(sum(os.path.getsize(column_path(work_dir, c)) for c in COLUMNS) / 2 ** 20, 1))
+        
+        started = time.perf_counter()
+        jobs = [(work_dir, candidate, fit_rows, 42) for candidate in candidates]
+        if workers == 1 or len(jobs) <= 1:
+            results = list(map(evaluate_candidate, jobs))
+        else:
+            with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+                results = list(pool.map(evaluate_candidate, jobs))
+        finish_stage('evaluate', started, candidates=len(jobs))
+    
+    eligible = [
+        (report, policy) for report, policy in results
+        if report['time_in_flow'] is not None and report['coverage'] >= min_coverage
+        and report['latency_us'] <= max_latency_us
+    ]
+    if not eligible:
+        raise ValueError(f'No candidate matched the logged levels on {min_coverage:.0%} of answers '
+                         f'within {max_latency_us} us per decision')
+    winner, policy = max(eligible, key=lambda item: (item[0]['time_in_flow'], item[0]['accuracy']))
+    
+    started = time.perf_counter()
+    registry = ModelRegistry(model_dir) if model_dir else get_registry()
+    path = registry.save(version, policy)
+    method = 'rule_based' if winner['kind'] == 'rules' else 'ml_based'
+    if activate:
+        if method != 'ml_based':
+            raise ValueError(f'{winner["name"]} is a rule table; only models can be the active ml_based model')
+        registry.activate(version, persist=True)
+    finish_stage('save', started)
+    
+    report = {
+        'version': version,
+        'artifact': path,
+        'load_with': {'method': method, 'model_version': version},
+        'source': os.path.abspath(db_path),
+        'winner': winner['name'],
+        'selection': {'metric': 'time_in_flow', 'flow_band': FLOW_BAND, 'flow_window': FLOW_WINDOW,
+                      'min_coverage': min_coverage, 'max_latency_us': max_latency_us},
+        'candidates': sorted((r for r, _ in results), key=lambda r: r['time_in_flow'] or 0, reverse=True),
+        'stages': stages,
+    }
+    with open(os.path.splitext(path)[0] + '.json', 'w') as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Pick the best adaptation policy by replaying logged sessions')
+    parser.add_argument('db', help='SQLite answer log (MATH_ADAPTIVE_STORE database)')
+    parser.add_argument('--version', help='artifact version name (default: selected-<timestamp>)')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk-size', type=int, default=100_000)
+    parser.add_argument('--validation-percent', type=int, default=10)
+    parser.add_argument('--fit-rows', type=int, default=200_000, help='training answers sampled per model')
+    parser.add_argument('--min-coverage', type=float, default=0.05)
+    parser.add_argument('--max-latency-us', type=float, default=100.0, help='latency budget per decision')
+    parser.add_argument('--model-dir', help='artifact folder (default: the registry folder)')
+    parser.add_argument('--work-dir', help='keep the feature columns here (default: a temp folder)')
+    parser.add_argument('--activate', action='store_true', help='make the winner the active model')
+    args = parser.parse_args(argv)
+    
+    report = select_model(
+        args.db, version=args.version, workers=args.workers, chunk_size=args.chunk_size,
+        validation_percent=args.validation_percent, fit_rows=args.fit_rows,
+        min_coverage=args.min_coverage, max_latency_us=args.max_latency_us,
+        activate=args.activate, model_dir=args.model_dir, work_dir=args.work_dir
+    )
+    print(f"{'candidate':<20} {'accuracy':>9} {'coverage':>9} {'success':>8} {'in flow':>8} {'latency us':>11}")
+    for r in report['candidates']:
+        print(f"{r['name']:<20} {r['accuracy']:>9.3f} {r['coverage']:>9.3f} "
+              f"{r['replay_success'] or 0:>8.3f} {r['time_in_flow'] or 0:>8.3f} {r['latency_us']:>11.2f}")
+    print(f"\nwinner: {report['winner']} -> {report['artifact']}")
+    print(f"load with AdaptiveEngine(method={report['load_with']['method']!r}, "
+          f"model_version={report['version']!r})")
+
+
+if __name__ == '__main__':
+    main()
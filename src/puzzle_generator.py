@@ -1,133 +1,457 @@
-import random
-
-class PuzzleGenerator:
-    def __init__(self):
-        self.operations = ['+', '-', '*', '/']
-        
-        # Emoji themes for visual appeal
-        self.emoji_sets = {
-            'fruits': ['🍎', '🍊', '🍌', '🍇', '🍓', '🍉', '🍒'],
-            'animals': ['🐶', '🐱', '🐭', '🐹', '🐰', '🦊', '🐻'],
-            'sports': ['⚽', '🏀', '🏈', '⚾', '🎾', '🏐', '🏓'],
-            'toys': ['🎮', '🧸', '🎲', '🪀', '🎯', '🎪', '🎨'],
-            'nature': ['⭐', '🌟', '💫', '🌈', '🌸', '🌺', '🌻'],
-            'food': ['🍕', '🍔', '🍟', '🌭', '🍿', '🧁', '🍩'],
-            'vehicles': ['🚗', '🚕', '🚙', '🚌', '🚎', '🏎️', '🚓']
-        }
-    
-    def generate_puzzle(self, difficulty):
-        """Generate a math puzzle based on difficulty level"""
-        if difficulty == "Easy":
-            return self._generate_easy()
-        elif difficulty == "Medium":
-            return self._generate_medium()
-        else:  # Hard
-            return self._generate_hard()
-    
-    def _generate_easy(self):
-        """Easy: Single digit addition/subtraction with emojis"""
-        use_emoji = random.choice([True, False])  # 50% chance of emoji
-        
-        num1 = random.randint(1, 10)
-        num2 = random.randint(1, 10)
-        operation = random.choice(['+', '-'])
-        
-        if operation == '-' and num1 < num2:
-            num1, num2 = num2, num1
-        
-        if use_emoji and operation == '+':
-            # Visual addition with emojis
-            theme = random.choice(list(self.emoji_sets.keys()))
-            emoji = random.choice(self.emoji_sets[theme])
-            question = f"{emoji * num1} + {emoji * num2} = ?"
-            answer = num1 + num2
-            return question, answer
-        elif use_emoji and operation == '-':
-            # Visual subtraction with emojis
-            theme = random.choice(list(self.emoji_sets.keys()))
-            emoji = random.choice(self.emoji_sets[theme])
-            question = f"{emoji * num1} - {emoji * num2} = ?"
-            answer = num1 - num2
-            return question, answer
-        else:
-            # Regular number problem with emoji decoration
-            emoji_decoration = random.choice(['🧮', '🔢', '✏️', '📝'])
-            question = f"{emoji_decoration} {num1} {operation} {num2}"
-            answer = eval(f"{num1} {operation} {num2}")
-            return question, answer
-    
-    def _generate_medium(self):
-        """Medium: Two digit addition/subtraction or single digit multiplication with context"""
-        choice = random.choice(['add_sub', 'multiply'])
-        
-        if choice == 'add_sub':
-            num1 = random.randint(10, 50)
-            num2 = random.randint(1, 20)
-            operation = random.choice(['+', '-'])
-            
-            if operation == '-' and num1 < num2:
-                num1, num2 = num2, num1
-            
-            # Add contextual emoji
-            context_emojis = {
-                '+': ['📚', '🎁', '⭐', '🍬', '🎈'],
-                '-': ['🍪', '🎮', '🏆', '💰', '🎯']
-            }
-            emoji = random.choice(context_emojis[operation])
-            question = f"{emoji} {num1} {operation} {num2}"
-            answer = eval(f"{num1} {operation} {num2}")
-            
-        else:  # Multiplication
-            num1 = random.randint(2, 10)
-            num2 = random.randint(2, 10)
-            operation = '*'
-            
-            # Add multiplication context
-            mult_emojis = ['🎁', '📦', '🧺', '🎒', '🛍️']
-            emoji = random.choice(mult_emojis)
-            question = f"{emoji} {num1} × {num2}"
-            answer = num1 * num2
-        
-        return question, answer
-    
-    def _generate_hard(self):
-        """Hard: Large numbers or division with visual context"""
-        choice = random.choice(['multiply', 'divide'])
-        
-        if choice == 'multiply':
-            num1 = random.randint(10, 25)
-            num2 = random.randint(10, 25)
-            operation = '×'
-            
-            # Power/achievement theme for hard problems
-            hard_emojis = ['🚀', '💪', '🏆', '🎯', '⚡']
-            emoji = random.choice(hard_emojis)
-            question = f"{emoji} {num1} {operation} {num2}"
-            answer = num1 * num2
-            
-        else:  # Division
-            # Division with whole number answers
-            num2 = random.randint(2, 12)
-            answer = random.randint(5, 20)
-            num1 = num2 * answer
-            
-            # Sharing/distribution theme
-            div_emojis = ['🍕', '🍰', '🎂', '🍪', '🧁']
-            emoji = random.choice(div_emojis)
-            question = f"{emoji} {num1} ÷ {num2}"
-        
-        return question, int(answer)
-    
-    def get_emoji_explanation(self, question):
-        """Optional: Provide context for emoji-based questions"""
-        # This can be used to show kids what the emoji represents
-        explanations = {
-            '🍎': 'apples',
-            '🐶': 'puppies',
-            '⭐': 'stars',
-            '🎮': 'game controllers',
-            '🍕': 'pizza slices',
-            '🚗': 'cars'
-        }
-        # You can extend this to show contextual help if needed
-        pass
+import random
+import threading
+from array import array
+from bisect import bisect_right
+from collections import deque
+from metrics import timed
+
+# Operator codes stored in puzzles and answer records
+OPERATORS = ('+', '-', '×', '÷')
+OP_ADD, OP_SUB, OP_MUL, OP_DIV = range(len(OPERATORS))
+
+# Batches from this size up are built with NumPy array ops; below it the
+# per-call overhead costs more than a loop (PuzzleQueue refills 8 at a time)
+VECTORIZED_BATCH = 48
+
+# Every emoji a puzzle has shown, so puzzles and records keep a small id instead
+EMOJIS = []
+_emoji_ids = {}
+_emoji_lock = threading.Lock()
+
+def emoji_id(emoji):
+    """Small integer id for an emoji (registered on first use)"""
+    code = _emoji_ids.get(emoji)
+    if code is None:
+        with _emoji_lock:
+            code = _emoji_ids.get(emoji)
+            if code is None:
+                code = len(EMOJIS)
+                EMOJIS.append(emoji)
+                _emoji_ids[emoji] = code
+    return code
+
+def render_question(num1, num2, op, emoji, visual):
+    """Question text for a puzzle's codes (``visual`` repeats the emoji per operand)"""
+    symbol = OPERATORS[op]
+    emoji = EMOJIS[emoji]
+    if visual:
+        return f"{emoji * num1} {symbol} {emoji * num2} = ?"
+    return f"{emoji} {num1} {symbol} {num2}"
+
+
+class Puzzle:
+    """A puzzle as operands and codes; the question text is rendered on first use.
+    
+    Formats like the question string it replaces (``str(puzzle)``), so the
+    UI shows it as before, while the tracker stores only the codes.
+    """
+    __slots__ = ('num1', 'num2', 'op', 'emoji', 'visual', 'answer', 'item', '_text')
+    
+    def __init__(self, num1, num2, op, emoji, visual, answer, item=None):
+        self.num1 = num1
+        self.num2 = num2
+        self.op = op
+        self.emoji = emoji
+        self.visual = visual
+        self.answer = answer
+        self.item = item  # number in its difficulty's ProblemSpace
+        self._text = None
+    
+    @property
+    def text(self):
+        if self._text is None:
+            self._text = render_question(self.num1, self.num2, self.op, self.emoji, self.visual)
+        return self._text
+    
+    def __str__(self):
+        return self.text
+    
+    def __repr__(self):
+        return f"Puzzle({self.text!r}, answer={self.answer})"
+
+
+# Puzzle families per difficulty: (emoji style, operator, share of puzzles,
+# problems). The shares are the odds the old random.choice calls gave.
+def _families(difficulty):
+    if difficulty == 'Easy':
+        return [
+            ('easy', OP_ADD, 0.5, [(a, b) for a in range(1, 11) for b in range(1, 11)]),
+            # Non-negative subtraction: larger operand first
+            ('easy', OP_SUB, 0.5, [(a, b) for a in range(1, 11) for b in range(1, a + 1)]),
+        ]
+    if difficulty == 'Medium':
+        return [
+            ('context', OP_ADD, 0.25, [(a, b) for a in range(10, 51) for b in range(1, 21)]),
+            ('context', OP_SUB, 0.25, sorted({(max(a, b), min(a, b))
+                                              for a in range(10, 51) for b in range(1, 21)})),
+            ('mult', OP_MUL, 0.5, [(a, b) for a in range(2, 11) for b in range(2, 11)]),
+        ]
+    return [
+        ('hard', OP_MUL, 0.5, [(a, b) for a in range(10, 26) for b in range(10, 26)]),
+        # Exact division: dividend built from divisor and quotient
+        ('div', OP_DIV, 0.5, [(d * q, d) for d in range(2, 13) for q in range(5, 21)]),
+    ]
+
+
+class ProblemSpace:
+    """Every distinct problem of one difficulty, numbered 0..size-1 family by family"""
+    
+    def __init__(self, difficulty):
+        self.difficulty = difficulty
+        self.family_styles = []
+        self.family_ops = []
+        self.family_offsets = []
+        self.family_sizes = []
+        self.family_odds = []  # cumulative share, for picking a family
+        self.num1 = array('H')
+        self.num2 = array('H')
+        self.answers = array('H')
+        self.family = array('B')
+        for style, op, share, problems in _families(difficulty):
+            self.family_styles.append(style)
+            self.family_ops.append(op)
+            self.family_odds.append((self.family_odds[-1] if self.family_odds else 0) + share)
+            self.family_offsets.append(len(self.num1))
+            self.family_sizes.append(len(problems))
+            for a, b in problems:
+                self.num1.append(a)
+                self.num2.append(b)
+                self.answers.append(
+                    a + b if op == OP_ADD else a - b if op == OP_SUB else a * b if op == OP_MUL else a // b
+                )
+                self.family.append(len(self.family_ops) - 1)
+        self.size = len(self.num1)
+        self._columns = None
+    
+    def columns(self):
+        """(num1, num2, answers, family) as NumPy views of the arrays"""
+        if self._columns is None:
+            import numpy as np
+            self._columns = tuple(
+                np.frombuffer(column, dtype=column.typecode)
+                for column in (self.num1, self.num2, self.answers, self.family)
+            )
+        return self._columns
+
+
+_spaces = {}
+
+def problem_space(difficulty):
+    """The shared ProblemSpace for a difficulty (unknown names count as Hard)"""
+    if difficulty not in ('Easy', 'Medium'):
+        difficulty = 'Hard'
+    space = _spaces.get(difficulty)
+    if space is None:
+        space = _spaces.setdefault(difficulty, ProblemSpace(difficulty))
+    return space
+
+
+def _lazy_numpy_random(rng):
+    """Function returning a NumPy generator, seeded from ``rng`` on its first call"""
+    made = []
+    
+    def numpy_random():
+        if not made:
+            import numpy as np
+            made.append(np.random.default_rng(rng.getrandbits(64)))
+        return made[0]
+    return numpy_random
+
+
+class ProblemSampler:
+    """Per-session draws from a ProblemSpace, without repeats until a family runs out.
+    
+    Each family is dealt from a shuffled permutation of its items, made
+    the first time the family is drawn from and again when it runs out,
+    so a draw is O(1) and ``draw_batch`` deals a whole run of a family as
+    one slice. With ``review_rate`` > 0, items reported as missed are due
+    again ``review_gap`` draws later, and while any are due each draw is
+    one of them with probability ``review_rate``. ``numpy_random`` returns
+    the NumPy generator to use (by default one seeded from ``rng``).
+    """
+    __slots__ = ('space', 'random', 'numpy_random', 'no_repeat', 'review_rate', 'review_gap',
+                 '_odds', '_sizes', '_offsets', '_drawn', '_perms', '_tick', '_waiting', '_missed')
+    
+    def __init__(self, space, rng, no_repeat=True, review_rate=0.0, review_gap=3, numpy_random=None):
+        self.space = space
+        self.random = rng
+        self.numpy_random = numpy_random or _lazy_numpy_random(rng)
+        self.no_repeat = no_repeat
+        self.review_rate = review_rate
+        self.review_gap = review_gap
+        self._odds = space.family_odds
+        self._sizes = space.family_sizes
+        self._offsets = space.family_offsets
+        self._drawn = [0] * len(space.family_sizes)
+        self._perms = [None] * len(space.family_sizes)
+        self._tick = 0
+        self._waiting = deque()  # (draw number it may come back at, item)
+        self._missed = []
+    
+    def _deal(self, family, count):
+        """The next ``count`` undealt items of a family (numbers within the family)"""
+        size = self._sizes[family]
+        if not self.no_repeat:
+            return self.numpy_random().integers(0, size, count)
+        import numpy as np
+        chunks = []
+        while count:
+            perm = self._perms[family]
+            drawn = self._drawn[family]
+            if perm is None or drawn == size:
+                # Every problem of this family has been dealt: start a new shuffle
+                perm = self._perms[family] = self.numpy_random().permutation(size).astype(np.uint16)
+                drawn = 0
+            take = min(count, size - drawn)
+            chunks.append(perm[drawn:drawn + take])
+            self._drawn[family] = drawn + take
+            count -= take
+        return chunks[0] if len(chunks) == 1 else np.concatenate(chunks)
+    
+    def draw(self):
+        """Next item number: a missed item up for review or an unseen one"""
+        random = self.random.random
+        self._tick += 1
+        waiting = self._waiting
+        while waiting and waiting[0][0] <= self._tick:
+            self._missed.append(waiting.popleft()[1])
+        
+        missed = self._missed
+        if missed and random() < self.review_rate:
+            k = int(random() * len(missed))
+            missed[k], missed[-1] = missed[-1], missed[k]
+            return missed.pop()
+        
+        family = min(bisect_right(self._odds, random()), len(self._odds) - 1)
+        offset = self._offsets[family]
+        if not self.no_repeat:
+            return offset + int(random() * self._sizes[family])
+        perm = self._perms[family]
+        drawn = self._drawn[family]
+        if perm is None or drawn == self._sizes[family]:
+            return offset + int(self._deal(family, 1)[0])
+        self._drawn[family] = drawn + 1
+        return offset + int(perm[drawn])
+    
+    def draw_batch(self, n):
+        """The next ``n`` item numbers as an array.
+        
+        Families are picked for all n draws at once and each family's
+        share is dealt in one slice. Reviews depend on the draw order, so
+        with ``review_rate`` > 0 this is n single draws.
+        """
+        import numpy as np
+        if self.review_rate > 0:
+            return np.array([self.draw() for _ in range(n)], dtype=np.intp)
+        self._tick += n
+        odds = self._odds
+        families = np.minimum(
+            np.searchsorted(odds, self.numpy_random().random(n), side='right'), len(odds) - 1
+        )
+        items = np.empty(n, dtype=np.intp)
+        for family, offset in enumerate(self._offsets):
+            where = np.flatnonzero(families == family)
+            if where.size:
+                items[where] = self._deal(family, where.size) + offset
+        return items
+    
+    def missed(self, item):
+        """Report a wrong answer to ``item`` (ignored unless reviews are on)"""
+        if self.review_rate > 0:
+            self._waiting.append((self._tick + self.review_gap, item))
+
+
+class PuzzleGenerator:
+    def __init__(self, seed=None, no_repeat=True, review_rate=0.0, review_gap=3):
+        """
+        no_repeat: deal each difficulty's problems without replacement
+        review_rate: share of puzzles spent re-asking missed ones while any
+        are due (0 = off); see ProblemSampler
+        """
+        self.operations = ['+', '-', '*', '/']
+        
+        # Emoji themes for visual appeal
+        self.emoji_sets = {
+            'fruits': ['🍎', '🍊', '🍌', '🍇', '🍓', '🍉', '🍒'],
+            'animals': ['🐶', '🐱', '🐭', '🐹', '🐰', '🦊', '🐻'],
+            'sports': ['⚽', '🏀', '🏈', '⚾', '🎾', '🏐', '🏓'],
+            'toys': ['🎮', '🧸', '🎲', '🪀', '🎯', '🎪', '🎨'],
+            'nature': ['⭐', '🌟', '💫', '🌈', '🌸', '🌺', '🌻'],
+            'food': ['🍕', '🍔', '🍟', '🌭', '🍿', '🧁', '🍩'],
+            'vehicles': ['🚗', '🚕', '🚙', '🚌', '🚎', '🏎️', '🚓']
+        }
+        
+        self._themes = list(self.emoji_sets.values())
+        
+        # Decoration emojis per puzzle family
+        self.decoration_emojis = ['🧮', '🔢', '✏️', '📝']
+        self.context_emojis = {
+            '+': ['📚', '🎁', '⭐', '🍬', '🎈'],
+            '-': ['🍪', '🎮', '🏆', '💰', '🎯']
+        }
+        self.mult_emojis = ['🎁', '📦', '🧺', '🎒', '🛍️']
+        self.hard_emojis = ['🚀', '💪', '🏆', '🎯', '⚡']
+        self.div_emojis = ['🍕', '🍰', '🎂', '🍪', '🧁']
+        
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.no_repeat = no_repeat
+        self.review_rate = review_rate
+        self.review_gap = review_gap
+        self._samplers = {}
+        self.numpy_random = _lazy_numpy_random(self.random)
+        self._batch_emojis = {}
+    
+    def sampler(self, difficulty):
+        """This generator's ProblemSampler for a difficulty"""
+        space = problem_space(difficulty)
+        sampler = self._samplers.get(space.difficulty)
+        if sampler is None:
+            sampler = self._samplers[space.difficulty] = ProblemSampler(
+                space, self.random, self.no_repeat, self.review_rate, self.review_gap, self.numpy_random
+            )
+        return sampler
+    
+    @timed('generate_puzzle')
+    def generate_puzzle(self, difficulty):
+        """Generate a math puzzle based on difficulty level"""
+        sampler = self.sampler(difficulty)
+        return self._make_puzzle(sampler.space, sampler.draw())
+    
+    @timed('generate_batch')
+    def generate_batch(self, difficulty, n):
+        """Generate n puzzles at once; returns a list of (Puzzle, answer)"""
+        sampler = self.sampler(difficulty)
+        if n < VECTORIZED_BATCH:
+            space, draw, make = sampler.space, sampler.draw, self._make_puzzle
+            return [make(space, draw()) for _ in range(n)]
+        return self._vectorized_batch(sampler, n)
+    
+    def _vectorized_batch(self, sampler, n):
+        """generate_batch with the draws, operands and emojis picked as arrays"""
+        import numpy as np
+        space = sampler.space
+        rng = self.numpy_random()
+        items = sampler.draw_batch(n)
+        num1, num2, answers, families = (column[items] for column in space.columns())
+        ops = np.asarray(space.family_ops)[families]
+        
+        emojis = np.empty(n, dtype=np.intp)
+        visual = np.zeros(n, dtype=bool)
+        for family, (plain, themed) in enumerate(self.batch_emojis(space)):
+            where = np.flatnonzero(families == family)
+            if not where.size:
+                continue
+            emojis[where] = plain[rng.integers(0, len(plain), where.size)]
+            if themed is not None:
+                where = where[rng.random(where.size) < 0.5]
+                visual[where] = True
+                emojis[where] = themed[rng.integers(0, len(themed), where.size)]
+        
+        return [
+            (Puzzle(a, b, op, emoji, v, answer, item), answer)
+            for a, b, op, emoji, v, answer, item in zip(
+                num1.tolist(), num2.tolist(), ops.tolist(), emojis.tolist(),
+                visual.tolist(), answers.tolist(), items.tolist()
+            )
+        ]
+    
+    def batch_emojis(self, space):
+        """Per family of ``space``: (emoji ids, emoji ids for visual puzzles or None)"""
+        tables = self._batch_emojis.get(space.difficulty)
+        if tables is None:
+            import numpy as np
+            tables = []
+            for style, op in zip(space.family_styles, space.family_ops):
+                emojis, themes = self._emoji_choices(style, op)
+                # Every theme has as many emojis, so one pick over all of them
+                # is a random theme and then a random emoji from it
+                themed = None if themes is None else np.array(
+                    [emoji_id(e) for theme in themes for e in theme]
+                )
+                tables.append((np.array([emoji_id(e) for e in emojis]), themed))
+            tables = self._batch_emojis[space.difficulty] = tables
+        return tables
+    
+    def make_puzzle(self, difficulty, item):
+        """(Puzzle, answer) for problem ``item`` of a difficulty's ProblemSpace"""
+        return self._make_puzzle(problem_space(difficulty), item)
+    
+    def _emoji_choices(self, style, op):
+        """(emojis, themes) for a puzzle family: the emojis that decorate its
+        puzzles and, for easy ones, the themes its visual puzzles draw from"""
+        if style == 'easy':
+            # Visual addition/subtraction with emojis, or a regular number
+            # problem with emoji decoration
+            return self.decoration_emojis, self._themes
+        if style == 'context':
+            return self.context_emojis[OPERATORS[op]], None
+        if style == 'mult':
+            return self.mult_emojis, None
+        if style == 'hard':
+            # Power/achievement theme for hard problems
+            return self.hard_emojis, None
+        # Sharing/distribution theme
+        return self.div_emojis, None
+    
+    def _make_puzzle(self, space, item):
+        """(Puzzle, answer) for problem ``item`` of ``space`` with a random emoji"""
+        family = space.family[item]
+        op = space.family_ops[family]
+        random = self.random.random
+        emojis, themes = self._emoji_choices(space.family_styles[family], op)
+        visual = False
+        if themes is not None and random() < 0.5:
+            emojis, visual = themes[int(random() * len(themes))], True
+        emoji = emoji_id(emojis[int(random() * len(emojis))])
+        
+        answer = space.answers[item]
+        return Puzzle(space.num1[item], space.num2[item], op, emoji, visual, answer, item), answer
+    
+    def record_result(self, difficulty, puzzle, is_correct):
+        """Tell the sampler how a puzzle went, so missed ones can come back"""
+        item = getattr(puzzle, 'item', None)
+        if not is_correct and item is not None:
+            self.sampler(difficulty).missed(item)
+    
+    def get_emoji_explanation(self, question):
+        """Optional: Provide context for emoji-based questions"""
+        # This can be used to show kids what the emoji represents
+        explanations = {
+            '🍎': 'apples',
+            '🐶': 'puppies',
+            '⭐': 'stars',
+            '🎮': 'game controllers',
+            '🍕': 'pizza slices',
+            '🚗': 'cars'
+        }
+        # You can extend this to show contextual help if needed
+        pass
+
+
+class PuzzleQueue:
+    """Small per-session prefetch queue filled by PuzzleGenerator.generate_batch"""
+    
+    def __init__(self, generator, batch_size=8):
+        self.generator = generator
+        self.batch_size = batch_size
+        self._queues = {}
+    
+    def _queue(self, difficulty):
+        queue = self._queues.get(difficulty)
+        if not queue:
+            queue = self._queues[difficulty] = deque(
+                self.generator.generate_batch(difficulty, self.batch_size)
+            )
+        return queue
+    
+    def next_puzzle(self, difficulty):
+        """Pop the next (Puzzle, answer) for difficulty, refilling in one batch"""
+        return self._queue(difficulty).popleft()
+    
+    def peek(self, difficulty):
+        """The (Puzzle, answer) next_puzzle will return for difficulty, without taking it"""
+        return self._queue(difficulty)[0]
+    
+    def record_result(self, difficulty, puzzle, is_correct):
+        self.generator.record_result(difficulty, puzzle, is_correct)
@@ -0,0 +1,111 @@
+"""Quiz state transitions, kept free of Streamlit so they can run headless.
+
+``state`` is anything with attribute access: st.session_state in the app,
+a SimpleNamespace in benchmarks.
+"""
+from metrics import increment
+
+# How long blocking feedback holds the script run while kids read the message
+FEEDBACK_SECONDS = 2
+
+def feedback_message(is_correct, response_time, correct_answer, old_difficulty, new_difficulty):
+    """Friendly, encouraging feedback: returns ('success' | 'error', text or None)"""
+    if is_correct:
+        if new_difficulty != old_difficulty:
+            if new_difficulty == 'Medium':
+                return 'success', f"🎉 Great job! You got it in {response_time:.1f}s! You're on a roll! Let's try a harder one next!"
+            elif new_difficulty == 'Hard':
+                return 'success', f"🏆 Awesome! You got it in {response_time:.1f}s! Super! Ready for an extra challenge?"
+            return 'success', None
+        return 'success', f"✨ Excellent work! You got it in {response_time:.1f}s! Keep it up!"
+    
+    if new_difficulty != old_difficulty:
+        if new_difficulty == 'Easy':
+            return 'error', f"😊 The answer was **{correct_answer}**. No worries! Let's try an easier puzzle to help you out!"
+        elif new_difficulty == 'Medium':
+            return 'error', f"💡 The answer was **{correct_answer}**. Almost there! Let's try something a bit easier."
+        return 'error', None
+    return 'error', f"👍 The answer was **{correct_answer}**. Keep going! Practice makes perfect!"
+
+def prepare_next_question(state):
+    """Pop the next puzzle for the current difficulty and start its timer"""
+    question, answer = state.puzzle_queue.next_puzzle(state.difficulty)
+    state.current_question = question
+    state.current_answer = answer
+    state.tracker.start_question()
+
+def speculate(state):
+    """Work out the next step for both outcomes of the current question.
+    
+    Meant to run while the child is thinking, once the question is on
+    screen: the engine's next difficulty for a right and a wrong answer
+    goes in ``state.speculation`` and the queue gets a puzzle ready for
+    each, so ``submit_answer`` only has to commit the matching branch.
+    Does nothing for engines and queues that can't speculate (elo).
+    """
+    state.speculation = None
+    if state.stage != 'quiz' or state.current_question is None:
+        return
+    peek = getattr(state.puzzle_queue, 'peek', None)
+    branches = state.adaptive_engine.speculate(state.difficulty, state.tracker)
+    if peek is None or branches is None:
+        return
+    for branch in branches.values():
+        for level in ([branch] if isinstance(branch, str) else set(branch[2])):
+            peek(level)
+    state.speculation = (state.tracker.version, state.difficulty, state.current_question, branches)
+
+def _commit_speculation(state, speculation, is_correct):
+    """The matching branch's difficulty, if the speculation still applies"""
+    version, difficulty, question, branches = speculation
+    # Made for exactly this question and the tracker state before this answer
+    if (question is not state.current_question or difficulty != state.difficulty
+            or version != state.tracker.version - 1):
+        return None
+    return state.adaptive_engine.resolve(branches[is_correct], state.tracker)
+
+def submit_answer(state, user_answer, prepare_next=True):
+    """Record an answer, adapt difficulty and move to the next question.
+    
+    Everything the next screen needs is computed here, so the script run
+    can return straight away. The feedback is stored in ``state.feedback``
+    and shown on the next run; when ``prepare_next`` is set, the next
+    question is ready too and its timer starts now, since it is on screen
+    next to the feedback. Blocking callers leave it unset and prepare the
+    question once the feedback has been read. After ``speculate`` the new
+    difficulty and puzzle are already known and are only looked up.
+    """
+    old_difficulty = state.difficulty
+    is_correct, response_time = state.tracker.record_answer(
+        state.current_question,
+        user_answer,
+        state.current_answer,
+        old_difficulty
+    )
+    state.puzzle_queue.record_result(old_difficulty, state.current_question, is_correct)
+    
+    state.question_count += 1
+    
+    new_difficulty = None
+    speculation = getattr(state, 'speculation', None)
+    if speculation is not None:
+        state.speculation = None
+        new_difficulty = _commit_speculation(state, speculation, is_correct)
+        increment('speculation_misses' if new_difficulty is None else 'speculation_hits')
+    if new_difficulty is None:
+        new_difficulty = state.adaptive_engine.adapt_difficulty(old_difficulty, state.tracker)
+    kind, text = feedback_message(
+        is_correct, response_time, state.current_answer, old_difficulty, new_difficulty
+    )
+    state.feedback = {'kind': kind, 'text': text}
+    
+    if state.question_count >= state.max_questions:
+        state.stage = 'summary'
+    
+    state.difficulty = new_difficulty
+    state.current_question = None
+    
+    if prepare_next and state.stage == 'quiz':
+        prepare_next_question(state)
+    
+    return is_correct
@@ -0,0 +1,98 @@
+class RuleTable:
+    """Rule-based adaptation compiled into a state-transition table.
+    
+    The rules are the ones rule_based sessions have always used, with the
+    numbers made configurable: after at least ``min_answers`` answers, the
+    last ``up_streak`` answers all correct moves one level up and the last
+    ``down_streak`` answers all wrong moves one level down. ``levels`` can
+    hold any number of levels, easiest first.
+    
+    A student's state is ``(level, history, count)``: ``history`` packs
+    the most recent answers into an int (bit 0 = latest, 1 = correct) and
+    ``count`` is the number of answers so far, capped once it no longer
+    matters. ``next_level[level][state]`` then gives the new level with
+    one lookup per answer. The same table, as a NumPy array, evaluates
+    many students at once (``advance_many``) or replays whole histories
+    (``replay``).
+    """
+    
+    def __init__(self, levels=('Easy', 'Medium', 'Hard'), up_streak=3, down_streak=2, min_answers=3):
+        if up_streak < 1 or down_streak < 1:
+            raise ValueError('up_streak and down_streak must be at least 1')
+        self.levels = list(levels)
+        self.level_index = {level: i for i, level in enumerate(self.levels)}
+        self.up_streak = up_streak
+        self.down_streak = down_streak
+        self.min_answers = min_answers
+        
+        self.window = max(up_streak, down_streak)
+        self.history_mask = (1 << self.window) - 1
+        self.count_cap = max(min_answers, up_streak, down_streak)
+        self.n_states = (self.count_cap + 1) << self.window
+        self.next_level = [
+            [self._decide(level, state) for state in range(self.n_states)]
+            for level in range(len(self.levels))
+        ]
+        self._table = None
+    
+    def _decide(self, level, state):
+        count, history = state >> self.window, state & self.history_mask
+        if count < self.min_answers:
+            return level
+        up_mask = (1 << self.up_streak) - 1
+        down_mask = (1 << self.down_streak) - 1
+        if count >= self.up_streak and history & up_mask == up_mask and level < len(self.levels) - 1:
+            return level + 1
+        if count >= self.down_streak and history & down_mask == 0 and level > 0:
+            return level - 1
+        return level
+    
+    def state(self, history, count):
+        """Table column for a packed history and answer count"""
+        return (min(count, self.count_cap) << self.window) | (history & self.history_mask)
+    
+    def decide(self, current_difficulty, history, count):
+        """Next difficulty after the answers packed in ``history`` (O(1))"""
+        level = self.level_index.get(current_difficulty)
+        if level is None:
+            return current_difficulty
+        return self.levels[self.next_level[level][self.state(history, count)]]
+    
+    @property
+    def table(self):
+        """``next_level`` as a NumPy array (numpy is imported on first use)"""
+        if self._table is None:
+            import numpy as np
+            self._table = np.array(self.next_level, dtype=np.int8)
+        return self._table
+    
+    def advance_many(self, levels, history, count, correct):
+        """Apply one answer for many students at once.
+        
+        levels, history, count: integer arrays of current state
+        correct: boolean array, the answer each student just gave
+        Returns the new (levels, history, count) arrays.
+        """
+        import numpy as np
+        history = ((np.asarray(history) << 1) | np.asarray(correct, dtype=np.int64)) & self.history_mask
+        count = np.minimum(np.asarray(count) + 1, self.count_cap)
+        levels = self.table[np.asarray(levels), (count << self.window) | history]
+        return levels, history, count
+    
+    def replay(self, correct, start_levels=0):
+        """Replay answer histories for many students.
+        
+        correct: boolean array (students x answers), all students starting fresh
+        Returns an int8 array (students x answers) of the level after each answer.
+        """
+        import numpy as np
+        correct = np.asarray(correct, dtype=bool)
+        n_students, n_answers = correct.shape
+        levels = np.broadcast_to(np.asarray(start_levels, dtype=np.int64), (n_students,)).copy()
+        history = np.zeros(n_students, dtype=np.int64)
+        count = np.zeros(n_students, dtype=np.int64)
+        trajectory = np.empty((n_students, n_answers), dtype=np.int8)
+        for t in range(n_answers):
+            levels, history, count = self.advance_many(levels, history, count, correct[:, t])
+            trajectory[:, t] = levels
+        return trajectory
@@ -0,0 +1,415 @@
+"""Headless JSON API for non-Streamlit clients (the tablet app).
+
+One asyncio event loop serves plain HTTP/1.1 with keep-alive, standard
+library only. Sessions live in memory as small slot objects holding the
+same state the Streamlit app keeps in st.session_state, and go through
+the same quiz_flow transitions:
+    
+    POST /sessions                  {"name", "class_code", "method", "difficulty",
+                                     "max_questions", "student_id"} -> session id + first question
+    GET  /sessions/<id>/puzzle      the current question
+    POST /sessions/<id>/answer      {"answer": 12} -> correctness, feedback, next level
+    GET  /sessions/<id>/summary     summary, per-difficulty breakdown, recommended level
+    GET  /health                    live and evicted session counts
+
+Every response is a JSON object; errors are ``{"error": "..."}`` with a
+4xx/5xx status. Sessions untouched for ``idle_timeout`` seconds are
+evicted (their answers stay in the store, if MATH_ADAPTIVE_STORE is set).
+rule_based and elo decisions are O(1) lookups and run on the loop;
+ml_based sessions submit answers from a thread pool, where the shared
+BatchingPredictor coalesces them into vectorized predicts. Once a
+question has been sent, both outcomes of its answer are worked out
+(quiz_flow.speculate) while the child thinks.
+    
+    python src/server.py --port 8000
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from adaptive_engine import AdaptiveEngine
+from classroom import get_classroom
+from metrics import timed
+from puzzle_generator import PuzzleGenerator, PuzzleQueue
+from quiz_flow import prepare_next_question, speculate, submit_answer
+from rules import RuleTable
+from storage import get_store
+from tracker import PerformanceTracker
+
+METHODS = ('rule_based', 'ml_based', 'elo')
+LEVELS = ('Easy', 'Medium', 'Hard')
+MAX_QUESTIONS_LIMIT = 1000
+MAX_BODY_BYTES = 16 * 1024
+# Far past any puzzle's answer; keeps junk out of the answer log
+ANSWER_LIMIT = 2**31 - 1
+REVIEW_RATE = float(os.environ.get('MATH_ADAPTIVE_REVIEW_RATE', 0))
+
+# The default rules never change, so every session shares one compiled table
+_DEFAULT_RULES = RuleTable(LEVELS)
+
+_REASONS = {
+    200: 'OK', 201: 'Created', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+    409: 'Conflict', 413: 'Payload Too Large', 431: 'Request Header Fields Too Large',
+    500: 'Internal Server Error',
+}
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Session:
+    """One child's quiz, shaped like the quiz_flow state the Streamlit app keeps"""
+    __slots__ = (
+        'session_id', 'user_name', 'stage', 'difficulty', 'question_count', 'max_questions',
+        'current_question', 'current_answer', 'feedback', 'puzzle_queue', 'tracker',
+        'adaptive_engine', 'speculation', 'last_seen', 'busy'
+    )
+    
+    def __init__(self, session_id, user_name, difficulty, max_questions, puzzle_queue, tracker,
+                 adaptive_engine):
+        self.session_id = session_id
+        self.user_name = user_name
+        self.stage = 'quiz'
+        self.difficulty = difficulty
+        self.question_count = 0
+        self.max_questions = max_questions
+        self.current_question = None
+        self.current_answer = None
+        self.feedback = None
+        self.puzzle_queue = puzzle_queue
+        self.tracker = tracker
+        self.adaptive_engine = adaptive_engine
+        self.speculation = None
+        self.last_seen = 0.0
+        self.busy = False  # an answer is being processed off the loop
+
+
+def new_session(name='', class_code='', method='rule_based', difficulty='Easy', max_questions=10,
+                student_id=None):
+    """Build a session the way the welcome screen does, with its first question ready.
+    
+    For elo, ``student_id`` picks up the rating of an earlier session (a new
+    student gets a fresh id).
+    """
+    session_id = uuid.uuid4().hex
+    generator = PuzzleGenerator(review_rate=REVIEW_RATE)
+    tracker = PerformanceTracker(
+        store=get_store(), session_id=session_id, classroom=get_classroom(), class_id=class_code or None
+    )
+    if method == 'elo':
+        from calibration import CalibratedQueue, StudentCalibration, get_item_bank, new_student_id
+        calibration = StudentCalibration(get_item_bank(), student_id or new_student_id(), difficulty)
+        engine = AdaptiveEngine(method='elo', rules=_DEFAULT_RULES, calibration=calibration)
+        queue = CalibratedQueue(generator, calibration)
+        difficulty = calibration.level()
+    else:
+        engine = AdaptiveEngine(method=method, rules=_DEFAULT_RULES)
+        queue = PuzzleQueue(generator)
+    session = Session(session_id, name, difficulty, max_questions, queue, tracker, engine)
+    prepare_next_question(session)
+    return session
+
+
+def _question(session):
+    return {
+        'session_id': session.session_id,
+        'question': str(session.current_question),
+        'difficulty': session.difficulty,
+        'question_number': session.question_count + 1,
+        'max_questions': session.max_questions,
+    }
+
+
+def _start_params(body):
+    name = str(body.get('name', '')).strip()
+    class_code = str(body.get('class_code', '')).strip()
+    method = body.get('method', 'rule_based')
+    difficulty = body.get('difficulty', 'Easy')
+    max_questions = body.get('max_questions', 10)
+    student_id = body.get('student_id')
+    if method not in METHODS:
+        raise ApiError(400, f"method must be one of {', '.join(METHODS)}")
+    if difficulty not in LEVELS:
+        raise ApiError(400, f"difficulty must be one of {', '.join(LEVELS)}")
+    if (not isinstance(max_questions, int) or isinstance(max_questions, bool)
+            or not 1 <= max_questions <= MAX_QUESTIONS_LIMIT):
+        raise ApiError(400, f"max_questions must be an integer from 1 to {MAX_QUESTIONS_LIMIT}")
+    if student_id is not None:
+        from calibration import is_student_id
+        if not is_student_id(student_id):
+            raise ApiError(400, 'student_id must be an id returned by an earlier elo session')
+    return name, class_code, method, difficulty, max_questions, student_id
+
+
+class QuizServer:
+    """Sessions plus the request handlers; ``serve`` runs it on an event loop.
+    
+    idle_timeout: seconds without a request before a session is evicted
+    ml_workers: threads that run ml_based answer submissions
+    """
+    
+    def __init__(self, idle_timeout=900.0, ml_workers=4, clock=time.monotonic):
+        self.idle_timeout = idle_timeout
+        self.clock = clock
+        self.sessions = OrderedDict()  # session id -> Session, least recently used first
+        self.evicted = 0
+        self.pool = ThreadPoolExecutor(max_workers=ml_workers, thread_name_prefix='api-ml')
+        # (top-level routes, per-session routes): path part -> {method: handler name}.
+        # Handlers are looked up per request so metrics can sample them.
+        self._routes = (
+            {'sessions': {'POST': 'start_session'}, 'health': {'GET': 'health'}},
+            {'puzzle': {'GET': 'next_puzzle'}, 'answer': {'POST': 'submit'},
+             'summary': {'GET': 'summary'}},
+        )
+    
+    @timed('api_sessions')
+    async def start_session(self, session, body):
+        params = _start_params(body)
+        if params[2] == 'ml_based':
+            # The first ml_based session may load the model; keep that off the loop
+            loop = asyncio.get_running_loop()
+            session = await loop.run_in_executor(self.pool, new_session, *params)
+        else:
+            session = new_session(*params)
+        self._touch(session)
+        self._speculate_later(session)
+        payload = _question(session)
+        calibration = session.adaptive_engine.calibration
+        if calibration is not None:
+            # Send it back with the next session to keep the student's rating
+            payload['student_id'] = calibration.student_id
+        return 201, payload
+    
+    @timed('api_puzzle')
+    async def next_puzzle(self, session, body):
+        if session.stage != 'quiz':
+            raise ApiError(409, 'session is finished; see its summary')
+        if session.busy:
+            raise ApiError(409, 'an answer for this session is still being processed')
+        if session.current_question is None:
+            prepare_next_question(session)
+        if session.speculation is None:
+            self._speculate_later(session)
+        return 200, _question(session)
+    
+    @timed('api_answer')
+    async def submit(self, session, body):
+        answer = body.get('answer')
+        if (not isinstance(answer, int) or isinstance(answer, bool)
+                or not -ANSWER_LIMIT <= answer <= ANSWER_LIMIT):
+            raise ApiError(400, f'answer must be an integer from {-ANSWER_LIMIT} to {ANSWER_LIMIT}')
+        if session.stage != 'quiz':
+            raise ApiError(409, 'session is finished; see its summary')
+        if session.busy:
+            raise ApiError(409, 'an answer for this session is already being processed')
+        correct_answer = session.current_answer
+        if session.adaptive_engine.method == 'ml_based':
+            session.busy = True
+            try:
+                loop = asyncio.get_running_loop()
+                is_correct = await loop.run_in_executor(self.pool, submit_answer, session, answer)
+            finally:
+                session.busy = False
+        else:
+            is_correct = submit_answer(session, answer)
+        self._speculate_later(session)
+        return 200, {
+            'correct': is_correct,
+            'correct_answer': correct_answer,
+            'response_time': round(session.tracker.records.response_time[-1], 2),
+            'feedback': session.feedback,
+            'difficulty': session.difficulty,
+            'question_count': session.question_count,
+            'finished': session.stage != 'quiz',
+        }
+    
+    def _speculate_later(self, session):
+        """Speculate on the next answer once this response is on its way"""
+        asyncio.get_running_loop().call_soon(self._speculate, session)
+    
+    @staticmethod
+    def _speculate(session):
+        if not session.busy and session.speculation is None:
+            speculate(session)
+    
+    @timed('api_summary')
+    async def summary(self, session, body):
+        tracker = session.tracker
+        summary = tracker.get_summary()
+        return 200, {
+            'session_id': session.session_id,
+            'finished': session.stage != 'quiz',
+            'summary': summary,
+            'breakdown': tracker.get_difficulty_breakdown(),
+            'recommended_level': session.adaptive_engine.recommend_next_level(tracker, summary),
+            'chart': tracker.chart_data(),
+        }
+    
+    @timed('api_health')
+    async def health(self, session, body):
+        return 200, {'sessions': len(self.sessions), 'evicted': self.evicted}
+    
+    def _touch(self, session):
+        session.last_seen = self.clock()
+        self.sessions[session.session_id] = session
+        self.sessions.move_to_end(session.session_id)
+    
+    def evict_idle(self):
+        """Drop sessions idle for longer than idle_timeout; returns how many went"""
+        cutoff = self.clock() - self.idle_timeout
+        evicted = 0
+        while self.sessions:
+            session = next(iter(self.sessions.values()))
+            if session.last_seen > cutoff or session.busy:
+                break
+            del self.sessions[session.session_id]
+            evicted += 1
+        self.evicted += evicted
+        return evicted
+    
+    async def _evict_periodically(self):
+        interval = min(max(self.idle_timeout / 4, 0.1), 30.0)
+        while True:
+            await asyncio.sleep(interval)
+            self.evict_idle()
+    
+    async def dispatch(self, method, target, body):
+        """Route one request; returns (status, JSON-able dict)"""
+        parts = target.split('?', 1)[0].strip('/').split('/')
+        if len(parts) == 3 and parts[0] == 'sessions':
+            session_id, action = parts[1], parts[2]
+            handlers = self._routes[1].get(action)
+        elif len(parts) == 1:
+            session_id, action = None, parts[0]
+            handlers = self._routes[0].get(action)
+        else:
+            handlers = None
+        if handlers is None:
+            raise ApiError(404, f'no such endpoint: {target}')
+        handler = handlers.get(method)
+        if handler is None:
+            raise ApiError(405, f'{method} is not allowed on {target}')
+        
+        session = None
+        if session_id is not None:
+            session = self.sessions.get(session_id)
+            if session is None:
+                raise ApiError(404, 'unknown or expired session')
+            self._touch(session)
+        if body:
+            try:
+                body = json.loads(body)
+            except ValueError:
+                raise ApiError(400, 'request body is not valid JSON')
+            if not isinstance(body, dict):
+                raise ApiError(400, 'request body must be a JSON object')
+        else:
+            body = {}
+        return await getattr(self, handler)(session, body)
+    
+    async def _respond(self, method, target, body):
+        try:
+            return await self.dispatch(method, target, body)
+        except ApiError as exc:
+            return exc.status, {'error': str(exc)}
+        except Exception:
+            traceback.print_exc()
+            return 500, {'error': 'internal error'}
+    
+    @staticmethod
+    def _encode(status, payload, keep_alive):
+        body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode()
+        connection = '' if keep_alive else 'Connection: close\r\n'
+        head = (
+            f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\nContent-Length: {len(body)}\r\n{connection}\r\n"
+        )
+        return head.encode('latin-1') + body
+    
+    async def handle_connection(self, reader, writer):
+        """Serve requests on one keep-alive connection until the client closes it"""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except asyncio.LimitOverrunError:
+                    writer.write(self._encode(431, {'error': 'request head too large'}, False))
+                    break
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                lines = head.decode('latin-1').split('\r\n')
+                try:
+                    method, target, version = lines[0].split(' ', 2)
+                    headers = {}
+                    for line in lines[1:]:
+                        if line:
+                            name, _, value = line.partition(':')
+                            headers[name.strip().lower()] = value.strip()
+                    length = headers.get('content-length', '0')
+                    # int() would also take a sign, spaces or underscores
+                    if not (length.isascii() and length.isdigit()):
+                        raise ValueError(f'bad Content-Length: {length!r}')
+                    length = int(length)
+                except ValueError:
+                    writer.write(self._encode(400, {'error': 'malformed request'}, False))
+                    break
+                if length > MAX_BODY_BYTES:
+                    writer.write(self._encode(413, {'error': 'request body too large'}, False))
+                    break
+                body = await reader.readexactly(length) if length else b''
+                
+                status, payload = await self._respond(method, target, body)
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                writer.write(self._encode(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+    
+    async def serve(self, host='127.0.0.1', port=8000, ready=None):
+        """Serve until cancelled; ``ready`` (an Event or similar) is set once listening"""
+        server = await asyncio.start_server(self.handle_connection, host, port, backlog=4096)
+        evictor = asyncio.ensure_future(self._evict_periodically())
+        if ready is not None:
+            ready.set()
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            evictor.cancel()
+            self.pool.shutdown(wait=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--idle-timeout', type=float, default=900.0,
+                        help='seconds before an idle session is evicted')
+    parser.add_argument('--ml-workers', type=int, default=4,
+                        help='threads running ml_based answer submissions')
+    args = parser.parse_args(argv)
+    
+    server = QuizServer(idle_timeout=args.idle_timeout, ml_workers=args.ml_workers)
+    print(f'serving on http://{args.host}:{args.port}', file=sys.stderr)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
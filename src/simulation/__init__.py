@@ -0,0 +1,9 @@
+"""Headless simulated-student load harness.
+
+Drives the real PuzzleGenerator, PerformanceTracker and AdaptiveEngine
+with synthetic students, without Streamlit. Run from the repository root:
+    
+    PYTHONPATH=src python -m simulation --sessions 5000 --output results.json
+"""
+from simulation.students import POPULATIONS, StudentModel, sample_students
+from simulation.runner import run_simulation, compare_results
@@ -0,0 +1,44 @@
+import argparse
+import json
+import sys
+
+from simulation.runner import compare_results, run_simulation
+from simulation.students import POPULATIONS
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m simulation',
+        description='Simulated-student load test of the adaptive engine (no UI)'
+    )
+    parser.add_argument('--sessions', type=int, default=1000, help='concurrent simulated sessions')
+    parser.add_argument('--questions', type=int, default=20, help='answers per session')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: CPU count)')
+    parser.add_argument('--method', choices=['rule_based', 'ml_based', 'elo'], default='rule_based')
+    parser.add_argument('--population', choices=sorted(POPULATIONS), default='mixed')
+    parser.add_argument('--start-difficulty', choices=['Easy', 'Medium', 'Hard'], default='Easy')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write JSON results to this file')
+    parser.add_argument('--compare', help='baseline JSON results to compare against')
+    args = parser.parse_args(argv)
+    
+    results = run_simulation(
+        sessions=args.sessions, questions=args.questions, workers=args.workers,
+        method=args.method, population=args.population,
+        start_difficulty=args.start_difficulty, seed=args.seed
+    )
+    
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    json.dump(results, sys.stdout, indent=2)
+    print()
+    
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print('\n'.join(compare_results(baseline, results)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+import os
+import platform
+import random
+import subprocess
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from adaptive_engine import AdaptiveEngine
+from puzzle_generator import PuzzleGenerator, PuzzleQueue
+from tracker import PerformanceTracker
+from simulation.students import sample_students
+
+OPERATIONS = ('generate', 'record', 'adapt')
+_item_bank = None  # elo ratings shared by this worker's sessions (not saved)
+
+
+class SimulatedSession:
+    """One child's quiz, driven by a StudentModel on a virtual clock"""
+    
+    def __init__(self, student, method, difficulty, seed):
+        self.student = student
+        self.rng = random.Random(seed)
+        self.now = 0.0
+        self.puzzle_queue = PuzzleQueue(PuzzleGenerator(seed=seed))
+        self.tracker = PerformanceTracker(clock=self.clock)
+        self.difficulty = difficulty
+        if method == 'elo':
+            from calibration import CalibratedQueue, ItemBank, StudentCalibration
+            global _item_bank
+            if _item_bank is None:
+                _item_bank = ItemBank()
+            calibration = StudentCalibration(_item_bank, start_difficulty=difficulty, seed=seed)
+            self.engine = AdaptiveEngine(method=method, calibration=calibration)
+            self.puzzle_queue = CalibratedQueue(self.puzzle_queue.generator, calibration)
+            self.difficulty = calibration.level()
+        else:
+            self.engine = AdaptiveEngine(method=method)
+    
+    def clock(self):
+        return self.now
+    
+    def step(self):
+        """Answer one question; returns (generate, record, adapt) latency in ns"""
+        t0 = time.perf_counter_ns()
+        question, answer = self.puzzle_queue.next_puzzle(self.difficulty)
+        t1 = time.perf_counter_ns()
+        
+        self.tracker.start_question()
+        user_answer, response_time = self.student.answer(answer, self.difficulty, self.rng)
+        self.now += response_time
+        
+        t2 = time.perf_counter_ns()
+        is_correct, _ = self.tracker.record_answer(question, user_answer, answer, self.difficulty)
+        self.puzzle_queue.record_result(self.difficulty, question, is_correct)
+        t3 = time.perf_counter_ns()
+        self.difficulty = self.engine.adapt_difficulty(self.difficulty, self.tracker)
+        t4 = time.perf_counter_ns()
+        return t1 - t0, t3 - t2, t4 - t3
+
+
+def build_sessions(config, n_sessions, first_seed):
+    students = sample_students(config['population'], n_sessions, seed=first_seed)
+    return [
+        SimulatedSession(student, config['method'], config['start_difficulty'], first_seed + i)
+        for i, student in enumerate(students)
+    ]
+
+
+def run_shard(args):
+    """Worker entry point: play n_sessions sessions concurrently (round-robin)"""
+    config, n_sessions, first_seed = args
+    sessions = build_sessions(config, n_sessions, first_seed)
+    questions = config['questions']
+    latencies = np.empty((len(OPERATIONS), n_sessions * questions), dtype=np.int64)
+    
+    start = time.perf_counter()
+    i = 0
+    for _ in range(questions):
+        for session in sessions:
+            latencies[:, i] = session.step()
+            i += 1
+    elapsed = time.perf_counter() - start
+    
+    levels = {}
+    correct = 0
+    for session in sessions:
+        levels[session.difficulty] = levels.get(session.difficulty, 0) + 1
+        correct += session.tracker.correct_answers
+    return {
+        'latencies': latencies,
+        'elapsed': elapsed,
+        'final_levels': levels,
+        'correct': correct,
+    }
+
+
+def measure_memory_per_session(config, sample=200):
+    """Python heap retained per fully played session (tracemalloc)"""
+    run_shard((config, 1, 0))  # warm imports, registries and caches first
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    sessions = build_sessions(config, sample, 10 ** 6)
+    for _ in range(config['questions']):
+        for session in sessions:
+            session.step()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / sample
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+            check=True, cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _percentiles(samples_ns):
+    us = samples_ns / 1000.0
+    return {
+        'count': int(us.size),
+        'mean_us': round(float(us.mean()), 3),
+        'p50_us': round(float(np.percentile(us, 50)), 3),
+        'p99_us': round(float(np.percentile(us, 99)), 3),
+        'max_us': round(float(us.max()), 3),
+    }
+
+
+def run_simulation(sessions=1000, questions=20, workers=None, method='rule_based',
+                   population='mixed', start_difficulty='Easy', seed=0, memory_sample=200):
+    """Run the simulation and return machine-readable results (a JSON-able dict)"""
+    workers = workers or os.cpu_count() or 1
+    config = {
+        'sessions': sessions,
+        'questions': questions,
+        'workers': workers,
+        'method': method,
+        'population': population,
+        'start_difficulty': start_difficulty,
+        'seed': seed,
+    }
+    
+    shard_sizes = [sessions // workers + (1 if i < sessions % workers else 0) for i in range(workers)]
+    shards = []
+    first_seed = seed
+    for size in shard_sizes:
+        if size:
+            shards.append((config, size, first_seed))
+            first_seed += size
+    
+    start = time.perf_counter()
+    if len(shards) == 1:
+        results = [run_shard(shards[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=len(shards)) as pool:
+            results = list(pool.map(run_shard, shards))
+    wall = time.perf_counter() - start
+    
+    latencies = np.concatenate([r['latencies'] for r in results], axis=1)
+    answers = latencies.shape[1]
+    final_levels = {}
+    for r in results:
+        for level, count in r['final_levels'].items():
+            final_levels[level] = final_levels.get(level, 0) + count
+    
+    return {
+        'config': config,
+        'environment': {
+            'git_commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'latency': {op: _percentiles(latencies[k]) for k, op in enumerate(OPERATIONS)},
+        'throughput': {
+            'answers': answers,
+            'wall_seconds': round(wall, 3),
+            # Steady state: workers run side by side, so the slowest shard bounds it
+            'answers_per_second': round(answers / max(r['elapsed'] for r in results), 1),
+            'answers_per_second_per_worker': round(
+                sum(r['latencies'].shape[1] / r['elapsed'] for r in results) / len(results), 1
+            ),
+        },
+        'memory': {
+            'bytes_per_session': round(measure_memory_per_session(config, memory_sample)),
+        },
+        'outcome': {
+            'accuracy': round(sum(r['correct'] for r in results) / answers, 4),
+            'final_levels': final_levels,
+        },
+    }
+
+
+def _flatten(results, prefix=''):
+    flat = {}
+    for key, value in results.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name + '.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare_results(baseline, current):
+    """Lines comparing the numeric metrics of two result dicts"""
+    old = _flatten({k: baseline[k] for k in ('latency', 'throughput', 'memory')})
+    new = _flatten({k: current[k] for k in ('latency', 'throughput', 'memory')})
+    lines = [f"{'metric':<45} {'baseline':>12} {'current':>12} {'change':>8}"]
+    for name in sorted(old.keys() & new.keys()):
+        before, after = old[name], new[name]
+        change = f'{(after - before) / before * 100:+.1f}%' if before else 'n/a'
+        lines.append(f'{name:<45} {before:>12} {after:>12} {change:>8}')
+    return lines
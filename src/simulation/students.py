@@ -0,0 +1,70 @@
+import math
+import random
+
+DIFFICULTY_INDEX = {'Easy': 0, 'Medium': 1, 'Hard': 2}
+
+
+class StudentModel:
+    """Synthetic student answering puzzles.
+    
+    skill: 0..1, where 0.5 means Medium puzzles are a coin flip
+    error_rate: chance of a careless mistake on a puzzle they can solve
+    median_response_time / response_time_sigma: log-normal thinking time
+    (seconds) for Easy puzzles; harder levels take proportionally longer
+    learning_rate: skill gained per correct answer
+    
+    ``offset`` shifts a puzzle's difficulty within its level (in levels,
+    e.g. +0.3 for a hard puzzle of its kind); the default treats every
+    puzzle of a level alike.
+    """
+    
+    def __init__(self, skill=0.5, error_rate=0.05, median_response_time=6.0,
+                 response_time_sigma=0.4, learning_rate=0.0):
+        self.skill = skill
+        self.error_rate = error_rate
+        self.median_response_time = median_response_time
+        self.response_time_sigma = response_time_sigma
+        self.learning_rate = learning_rate
+    
+    def p_correct(self, difficulty, offset=0.0):
+        level = DIFFICULTY_INDEX.get(difficulty, 2)
+        gap = self.skill * 3 - (level + 0.5 + offset)
+        return (1 - self.error_rate) / (1 + math.exp(-3 * gap))
+    
+    def answer(self, correct_answer, difficulty, rng, offset=0.0):
+        """Return (user_answer, response_time_seconds) for one puzzle"""
+        level = DIFFICULTY_INDEX.get(difficulty, 2)
+        correct = rng.random() < self.p_correct(difficulty, offset)
+        if correct:
+            user_answer = correct_answer
+            self.skill = min(1.0, self.skill + self.learning_rate)
+        else:
+            user_answer = correct_answer + rng.choice((-2, -1, 1, 2))
+        median = self.median_response_time * (1 + 0.5 * level)
+        response_time = rng.lognormvariate(math.log(median), self.response_time_sigma)
+        return user_answer, response_time
+
+
+# name -> [(weight, StudentModel kwargs)]
+POPULATIONS = {
+    'mixed': [
+        (0.3, {'skill': 0.25, 'error_rate': 0.10, 'median_response_time': 10.0}),
+        (0.5, {'skill': 0.50, 'error_rate': 0.05, 'median_response_time': 6.0, 'learning_rate': 0.01}),
+        (0.2, {'skill': 0.85, 'error_rate': 0.02, 'median_response_time': 3.0}),
+    ],
+    'struggling': [
+        (1.0, {'skill': 0.2, 'error_rate': 0.15, 'median_response_time': 12.0, 'response_time_sigma': 0.6}),
+    ],
+    'advanced': [
+        (1.0, {'skill': 0.9, 'error_rate': 0.02, 'median_response_time': 2.5}),
+    ],
+}
+
+
+def sample_students(population, n, seed=0):
+    """Draw n StudentModels from a named population"""
+    rng = random.Random(seed)
+    profiles = POPULATIONS[population]
+    weights = [weight for weight, _ in profiles]
+    chosen = rng.choices(profiles, weights=weights, k=n)
+    return [StudentModel(**kwargs) for _, kwargs in chosen]
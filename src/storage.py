@@ -0,0 +1,255 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+RECORD_FIELDS = (
+    'question', 'user_answer', 'correct_answer', 'is_correct', 'response_time', 'difficulty'
+)
+# SQLite INTEGER is a signed 64-bit value
+SQLITE_INT_MIN, SQLITE_INT_MAX = -2**63, 2**63 - 1
+
+log = logging.getLogger(__name__)
+
+
+class MemoryStore:
+    """Keeps answer logs and snapshots in this process only (lost on restart)"""
+    
+    def __init__(self):
+        self._answers = {}
+        self._snapshots = {}
+        self._lock = threading.Lock()
+    
+    def append(self, session_id, seq, record):
+        with self._lock:
+            self._answers.setdefault(session_id, []).append((seq, dict(record)))
+    
+    def save_snapshot(self, session_id, seq, state):
+        with self._lock:
+            self._snapshots[session_id] = (seq, json.loads(json.dumps(state)))
+    
+    def load(self, session_id, with_records=False):
+        """Return (snapshot_seq, snapshot_state, records after the snapshot or all records)"""
+        with self._lock:
+            seq, state = self._snapshots.get(session_id, (0, None))
+            answers = self._answers.get(session_id, [])
+            start = 0 if with_records else seq
+            records = [dict(r) for s, r in answers if s > start]
+        return seq, state, records
+    
+    def sessions(self):
+        with self._lock:
+            return list(self._answers)
+    
+    def flush(self):
+        pass
+    
+    def close(self):
+        pass
+
+
+class SQLiteStore:
+    """Answer log in an embedded SQLite database (WAL mode) with group commit.
+    
+    ``append`` only queues the row; a background thread writes everything
+    queued in one transaction every ``flush_interval`` seconds (or once
+    ``max_batch`` rows are waiting), so a burst of answers costs one WAL
+    fsync instead of one per answer. Call ``flush`` to wait for queued rows
+    to be committed. ``append`` rejects integers SQLite can't store on the
+    caller's thread; if a batch still fails, its rows are retried one at a
+    time and only the ones that fail again are dropped (logged and counted
+    in ``dropped``), so one bad row doesn't stop the writer for everyone.
+    """
+    
+    def __init__(self, path, flush_interval=0.05, max_batch=1000, synchronous='FULL'):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.synchronous = synchronous
+        self._pending = []
+        self._cond = threading.Condition()
+        self._flushed_upto = 0
+        self._queued_upto = 0
+        self._closed = False
+        self._flush_requested = False
+        self.dropped = 0
+        
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._writer_conn = self._connect()
+        self._writer_conn.executescript("""
+            CREATE TABLE IF NOT EXISTS answers (
+                session_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                question TEXT,
+                user_answer NUMERIC,
+                correct_answer NUMERIC,
+                is_correct INTEGER,
+                response_time REAL,
+                difficulty TEXT,
+                PRIMARY KEY (session_id, seq)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS snapshots (
+                session_id TEXT PRIMARY KEY,
+                seq INTEGER NOT NULL,
+                state TEXT NOT NULL
+            );
+        """)
+        self._local = threading.local()
+        self._writer = threading.Thread(target=self._run, name='sqlite-store-writer', daemon=True)
+        self._writer.start()
+    
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(f'PRAGMA synchronous={self.synchronous}')
+        return conn
+    
+    def _reader(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+    
+    def append(self, session_id, seq, record):
+        row = (session_id, seq) + tuple(record[field] for field in RECORD_FIELDS)
+        for value in row:
+            if type(value) is int and not SQLITE_INT_MIN <= value <= SQLITE_INT_MAX:
+                raise ValueError(f'{value} does not fit in an SQLite integer')
+        self._enqueue(('answer', row))
+    
+    def save_snapshot(self, session_id, seq, state):
+        self._enqueue(('snapshot', (session_id, seq, json.dumps(state))))
+    
+    def _enqueue(self, item):
+        with self._cond:
+            if self._closed:
+                raise RuntimeError('SQLiteStore is closed')
+            self._pending.append(item)
+            self._queued_upto += 1
+            # The first row starts the writer's flush_interval countdown
+            if len(self._pending) == 1 or len(self._pending) >= self.max_batch:
+                self._cond.notify_all()
+    
+    def flush(self):
+        """Block until everything appended so far is committed"""
+        with self._cond:
+            target = self._queued_upto
+            self._flush_requested = True
+            self._cond.notify_all()
+            while self._flushed_upto < target:
+                self._cond.wait()
+    
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed and not self._flush_requested:
+                    self._cond.wait()
+                # Group commit: give the batch up to flush_interval to fill up
+                deadline = time.monotonic() + self.flush_interval
+                while (len(self._pending) < self.max_batch
+                       and not self._closed and not self._flush_requested):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                self._flush_requested = False
+                batch, self._pending = self._pending, []
+                upto = self._queued_upto
+                closed = self._closed
+            if batch:
+                try:
+                    self._commit(batch)
+                    failed = False
+                except Exception:
+                    failed = True
+                if failed:
+                    self._commit_one_by_one(batch)
+            with self._cond:
+                self._flushed_upto = upto
+                self._cond.notify_all()
+            if closed and not batch:
+                return
+    
+    def _commit_one_by_one(self, batch):
+        for item in batch:
+            try:
+                self._commit([item])
+            except Exception:
+                kind, row = item
+                log.exception('dropping %s row for session %s seq %s', kind, row[0], row[1])
+                self.dropped += 1
+    
+    def _commit(self, batch):
+        answers = [row for kind, row in batch if kind == 'answer']
+        snapshots = [row for kind, row in batch if kind == 'snapshot']
+        conn = self._writer_conn
+        conn.execute('BEGIN')
+        try:
+            if answers:
+                conn.executemany(
+                    'INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?, ?, ?)', answers
+                )
+            if snapshots:
+                conn.executemany(
+                    'INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?)', snapshots
+                )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+    
+    def load(self, session_id, with_records=False):
+        """Return (snapshot_seq, snapshot_state, records after the snapshot or all records)"""
+        self.flush()
+        conn = self._reader()
+        row = conn.execute(
+            'SELECT seq, state FROM snapshots WHERE session_id = ?', (session_id,)
+        ).fetchone()
+        seq, state = (row[0], json.loads(row[1])) if row else (0, None)
+        start = 0 if with_records else seq
+        rows = conn.execute(
+            'SELECT ' + ', '.join(RECORD_FIELDS) + ' FROM answers'
+            ' WHERE session_id = ? AND seq > ? ORDER BY seq',
+            (session_id, start)
+        ).fetchall()
+        records = []
+        for values in rows:
+            record = dict(zip(RECORD_FIELDS, values))
+            record['is_correct'] = bool(record['is_correct'])
+            records.append(record)
+        return seq, state, records
+    
+    def sessions(self):
+        self.flush()
+        return [row[0] for row in self._reader().execute('SELECT DISTINCT session_id FROM answers')]
+    
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._writer.join()
+        self._writer_conn.close()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Process-wide store chosen by MATH_ADAPTIVE_STORE.
+    
+    Unset means no store (records live only in the tracker), 'memory' a
+    MemoryStore, anything else is the path of a SQLite database.
+    """
+    global _store
+    target = os.environ.get('MATH_ADAPTIVE_STORE')
+    if not target:
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = MemoryStore() if target == 'memory' else SQLiteStore(target)
+    return _store
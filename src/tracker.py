@@ -1,50 +1,312 @@
-import time
-import pandas as pd
-
-class PerformanceTracker:
-    def __init__(self):
-        self.records = []
-        self.start_time = None
-    
-    def start_question(self):
-        """Start timing for a question"""
-        self.start_time = time.time()
-    
-    def record_answer(self, question, user_answer, correct_answer, difficulty):
-        """Record the user's answer and performance"""
-        response_time = time.time() - self.start_time
-        is_correct = (user_answer == correct_answer)
-        
-        self.records.append({
-            'question': question,
-            'user_answer': user_answer,
-            'correct_answer': correct_answer,
-            'is_correct': is_correct,
-            'response_time': round(response_time, 2),
-            'difficulty': difficulty
-        })
-        
-        return is_correct, response_time
-    
-    def get_summary(self):
-        """Generate session summary statistics"""
-        if not self.records:
-            return None
-        
-        df = pd.DataFrame(self.records)
-        
-        summary = {
-            'total_questions': len(self.records),
-            'correct_answers': df['is_correct'].sum(),
-            'accuracy': round((df['is_correct'].sum() / len(self.records)) * 100, 2),
-            'avg_response_time': round(df['response_time'].mean(), 2),
-            'recent_performance': df['is_correct'].tail(5).tolist()
-        }
-        
-        return summary
-    
-    def get_recent_streak(self, n=3):
-        """Get the last n answers to determine streaks"""
-        if len(self.records) < n:
-            return [r['is_correct'] for r in self.records]
-        return [r['is_correct'] for r in self.records[-n:]]
+import time
+from array import array
+from collections import deque
+from metrics import timed
+from puzzle_generator import Puzzle, render_question
+
+# Record dict keys, in storage.RECORD_FIELDS order (storage isn't imported
+# here to keep it off the welcome path)
+RECORD_FIELDS = (
+    'question', 'user_answer', 'correct_answer', 'is_correct', 'response_time', 'difficulty'
+)
+
+# Difficulty codes stored in answer records; other names are added on first use
+DIFFICULTIES = ['Easy', 'Medium', 'Hard']
+_difficulty_codes = {name: code for code, name in enumerate(DIFFICULTIES)}
+
+_TEXT_QUESTION = 0xFF  # op code of a record whose question was given as text
+
+CHART_MAX_POINTS = 200  # bars in the summary chart; longer sessions are averaged
+
+
+class AnswerLog:
+    """A session's answer records stored column-wise in typed arrays.
+    
+    Each answer takes about 20 bytes: puzzle operands, operator/emoji
+    codes, the answers, a byte holding the difficulty code and the
+    correctness bit, and the response time as float32. Indexing and
+    iterating give the usual record dicts, with the question text
+    rendered from the codes on demand. Questions given as plain strings
+    and answers that are not 32-bit ints are kept aside as they are.
+    """
+    
+    def __init__(self, records=()):
+        self.num1 = array('H')
+        self.num2 = array('H')
+        self.op = array('B')            # operator code, bit 7 = emoji repeated per operand
+        self.emoji = array('H')
+        self.flags = array('B')         # bit 0 = correct, higher bits = difficulty code
+        self.response_time = array('f')
+        self.user_answer = array('i')
+        self.correct_answer = array('i')
+        self._extra = {}                # (index, field) -> value that does not fit its column
+        for record in records:
+            self.append(*(record[field] for field in RECORD_FIELDS))
+    
+    def append(self, question, user_answer, correct_answer, is_correct, response_time, difficulty):
+        i = len(self.flags)
+        if isinstance(question, Puzzle) and question.num1 < 0x10000 and question.num2 < 0x10000:
+            num1, num2, emoji = question.num1, question.num2, question.emoji
+            op = question.op | (0x80 if question.visual else 0)
+        else:
+            num1 = num2 = emoji = 0
+            op = _TEXT_QUESTION
+            self._extra[i, 'question'] = str(question)
+        code = _difficulty_codes.get(difficulty)
+        if code is None:
+            code = _difficulty_codes[difficulty] = len(DIFFICULTIES)
+            DIFFICULTIES.append(difficulty)
+        if type(user_answer) is not int or not -0x80000000 <= user_answer <= 0x7FFFFFFF:
+            self._extra[i, 'user_answer'], user_answer = user_answer, 0
+        if type(correct_answer) is not int or not -0x80000000 <= correct_answer <= 0x7FFFFFFF:
+            self._extra[i, 'correct_answer'], correct_answer = correct_answer, 0
+        
+        self.num1.append(num1)
+        self.num2.append(num2)
+        self.op.append(op)
+        self.emoji.append(emoji)
+        self.flags.append((code << 1) | bool(is_correct))
+        self.response_time.append(response_time)
+        self.user_answer.append(user_answer)
+        self.correct_answer.append(correct_answer)
+    
+    def question(self, i):
+        op = self.op[i]
+        if op == _TEXT_QUESTION:
+            return self._extra[i, 'question']
+        return render_question(self.num1[i], self.num2[i], op & 0x7F, self.emoji[i], op & 0x80)
+    
+    def record(self, i):
+        """Record ``i`` as a dict (question rendered now)"""
+        if i < 0:
+            i += len(self.flags)
+        extra = self._extra
+        return {
+            'question': self.question(i),
+            'user_answer': extra.get((i, 'user_answer'), self.user_answer[i]),
+            'correct_answer': extra.get((i, 'correct_answer'), self.correct_answer[i]),
+            'is_correct': bool(self.flags[i] & 1),
+            'response_time': round(self.response_time[i], 2),
+            'difficulty': DIFFICULTIES[self.flags[i] >> 1],
+        }
+    
+    def overflow(self, field):
+        """{index: value} of the records whose ``field`` did not fit its column"""
+        return {i: value for (i, name), value in self._extra.items() if name == field}
+    
+    def correct(self, start=0):
+        """is_correct of the records from ``start`` on"""
+        return [bool(f & 1) for f in self.flags[start:]]
+    
+    def columns(self):
+        """All records as a dict of column lists (for DataFrames)"""
+        records = list(self)
+        return {field: [r[field] for r in records] for field in RECORD_FIELDS}
+    
+    def clear(self):
+        self.__init__()
+    
+    def __len__(self):
+        return len(self.flags)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.record(i) for i in range(*index.indices(len(self.flags)))]
+        if not -len(self.flags) <= index < len(self.flags):
+            raise IndexError('AnswerLog index out of range')
+        return self.record(index)
+    
+    def __iter__(self):
+        return (self.record(i) for i in range(len(self.flags)))
+
+
+class PerformanceTracker:
+    def __init__(self, recent_window=10, store=None, session_id=None, snapshot_every=50,
+                 clock=time.time, classroom=None, class_id=None):
+        """
+        store: optional storage backend (see storage.py) that every answer is
+        appended to; session_id names this session's log in it
+        clock: time source for response times (simulations pass a virtual clock)
+        classroom: optional ClassroomAggregator (see classroom.py) that every
+        answer is reported to, under class_id
+        """
+        self.records = AnswerLog()
+        self.start_time = None
+        self.clock = clock
+        self.store = store
+        self.session_id = session_id
+        self.snapshot_every = snapshot_every
+        self.classroom = classroom
+        self.class_id = class_id
+        self.last_difficulty = None
+        
+        # Running aggregates, updated in O(1) on every answer
+        self.recent_window = recent_window
+        self.total_questions = 0
+        self.correct_answers = 0
+        self.response_time_sum = 0.0
+        self.recent_answers = deque(maxlen=recent_window)
+        self.recent_bits = 0  # last recent_window answers, bit 0 = latest, 1 = correct
+        self.difficulty_stats = {}
+        
+        # Bumped on every answer; get_summary/chart_data results are cached against it
+        self.version = 0
+        self._summary_cache = (-1, None)
+        self._chart_cache = (-1, None, None)
+    
+    def start_question(self):
+        """Start timing for a question"""
+        self.start_time = self.clock()
+    
+    @timed('record_answer')
+    def record_answer(self, question, user_answer, correct_answer, difficulty):
+        """Record the user's answer and performance"""
+        response_time = max(self.clock() - self.start_time, 0.0)
+        is_correct = (user_answer == correct_answer)
+        rounded_time = round(response_time, 2)
+        
+        self.records.append(question, user_answer, correct_answer, is_correct, rounded_time, difficulty)
+        
+        if self.classroom is not None:
+            self.classroom.record(
+                self.class_id, self.session_id, difficulty, is_correct, rounded_time, self.last_difficulty
+            )
+        self._update_stats(is_correct, rounded_time, difficulty)
+        
+        if self.store is not None:
+            self.store.append(self.session_id, self.total_questions, self.records[-1])
+            if self.total_questions % self.snapshot_every == 0:
+                self.store.save_snapshot(self.session_id, self.total_questions, self.snapshot_state())
+        
+        return is_correct, response_time
+    
+    def _update_stats(self, is_correct, response_time, difficulty):
+        """Fold one answer into the running aggregates"""
+        self.total_questions += 1
+        self.version += 1
+        self.last_difficulty = difficulty
+        self.correct_answers += int(is_correct)
+        self.response_time_sum += response_time
+        self.recent_answers.append(is_correct)
+        self.recent_bits = ((self.recent_bits << 1) | int(is_correct)) & ((1 << self.recent_window) - 1)
+        
+        stats = self.difficulty_stats.get(difficulty)
+        if stats is None:
+            stats = self.difficulty_stats[difficulty] = {
+                'total': 0, 'correct': 0, 'response_time_sum': 0.0
+            }
+        stats['total'] += 1
+        stats['correct'] += int(is_correct)
+        stats['response_time_sum'] += response_time
+    
+    def snapshot_state(self):
+        """Running aggregates as a JSON-friendly dict"""
+        return {
+            'total_questions': self.total_questions,
+            'correct_answers': self.correct_answers,
+            'response_time_sum': self.response_time_sum,
+            'recent_answers': list(self.recent_answers),
+            'difficulty_stats': self.difficulty_stats,
+            'last_difficulty': self.last_difficulty
+        }
+    
+    def _load_state(self, state):
+        self.total_questions = state['total_questions']
+        self.correct_answers = state['correct_answers']
+        self.response_time_sum = state['response_time_sum']
+        self.recent_answers = deque(state['recent_answers'], maxlen=self.recent_window)
+        self.recent_bits = 0
+        for is_correct in self.recent_answers:
+            self.recent_bits = (self.recent_bits << 1) | int(is_correct)
+        self.difficulty_stats = {d: dict(stats) for d, stats in state['difficulty_stats'].items()}
+        self.last_difficulty = state.get('last_difficulty')
+        self.version += 1
+    
+    @classmethod
+    def restore(cls, store, session_id, with_records=False, **kwargs):
+        """Rehydrate a session from its latest snapshot plus the log tail.
+        
+        Only the answers after the snapshot are replayed. With
+        ``with_records`` the full record history is loaded into ``records``
+        too (needed for the summary chart); otherwise ``records`` holds just
+        the replayed tail.
+        """
+        tracker = cls(store=store, session_id=session_id, **kwargs)
+        seq, state, records = store.load(session_id, with_records=with_records)
+        if state is not None:
+            tracker._load_state(state)
+        tail = records[seq:] if with_records else records
+        for record in tail:
+            tracker._update_stats(record['is_correct'], record['response_time'], record['difficulty'])
+        tracker.records = AnswerLog(records)
+        return tracker
+    
+    @timed('get_summary')
+    def get_summary(self):
+        """Generate session summary statistics.
+        
+        The dict is cached until the next answer, so callers share it and
+        must not modify it.
+        """
+        version, summary = self._summary_cache
+        if version == self.version:
+            return summary
+        if not self.total_questions:
+            self._summary_cache = (self.version, None)
+            return None
+        
+        summary = {
+            'total_questions': self.total_questions,
+            'correct_answers': self.correct_answers,
+            'accuracy': round((self.correct_answers / self.total_questions) * 100, 2),
+            'avg_response_time': round(self.response_time_sum / self.total_questions, 2),
+            'recent_performance': list(self.recent_answers)[-5:]
+        }
+        self._summary_cache = (self.version, summary)
+        return summary
+    
+    def get_difficulty_breakdown(self):
+        """Per-difficulty counts, accuracy and average response time"""
+        breakdown = {}
+        for difficulty, stats in self.difficulty_stats.items():
+            breakdown[difficulty] = {
+                'total_questions': stats['total'],
+                'correct_answers': stats['correct'],
+                'accuracy': round((stats['correct'] / stats['total']) * 100, 2),
+                'avg_response_time': round(stats['response_time_sum'] / stats['total'], 2)
+            }
+        return breakdown
+    
+    def get_recent_streak(self, n=3):
+        """Get the last n answers to determine streaks"""
+        if n <= self.recent_window:
+            recent = list(self.recent_answers)
+            return recent[-n:] if n else []
+        return self.records.correct(max(len(self.records) - n, 0))
+    
+    def chart_data(self, max_points=CHART_MAX_POINTS):
+        """Correctness per answer for the summary chart, at most ``max_points`` bars.
+        
+        Returns ``{'question': [...], 'correct': [...]}`` with 1/0 per
+        answer; longer sessions are cut into equal runs of consecutive
+        answers, each shown as its share correct at its first question
+        number. Cached until the next answer.
+        """
+        version, points, data = self._chart_cache
+        if version == self.version and points == max_points:
+            return data
+        correct = self.records.correct()
+        step = max(1, -(-len(correct) // max_points))
+        questions, values = [], []
+        for start in range(0, len(correct), step):
+            run = correct[start:start + step]
+            questions.append(start + 1)
+            values.append(sum(run) / len(run) if step > 1 else int(run[0]))
+        data = {'question': questions, 'correct': values}
+        self._chart_cache = (self.version, max_points, data)
+        return data
+    
+    def to_dataframe(self):
+        """Full record history as a DataFrame (for charts and exports)"""
+        import pandas as pd  # only needed here; keeps pandas off the answer path
+        return pd.DataFrame(self.records.columns() if self.records else [])
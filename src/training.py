@@ -0,0 +1,253 @@
+"""Out-of-core training of the ml_based difficulty model from logged sessions.
+
+Reads the answer log written by storage.SQLiteStore and never holds it in
+memory: sessions are split into ranges that worker processes stream in
+chunks, computing the same features as AdaptiveEngine._ml_based_adapt
+with SQLite window functions and folding them into a fixed-size count
+table. The summed table (a few MB whatever the log size) is the weighted
+training set for the decision tree, which is saved as a versioned
+artifact in the model registry.
+    
+    python src/training.py answers.db --version tree-v2 --activate
+"""
+import argparse
+import json
+import os
+import resource
+import sqlite3
+import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+LEVELS = ['Easy', 'Medium', 'Hard']
+ACCURACY_BINS = 101   # accuracy rate, 0.01 resolution
+TIME_BINS = 101       # normalized average response time, 0.01 resolution
+STREAK_BINS = 6       # correct answers among the last 5
+MIN_ANSWERS = 3       # _ml_based_adapt only predicts after 3 answers
+
+# Running per-session features at every answer, plus what happened next.
+# Rows come out in (session_id, seq) primary-key order, so SQLite streams
+# each partition without a separate sort.
+FEATURE_QUERY = """
+SELECT
+    session_id,
+    COUNT(*) OVER running,
+    SUM(is_correct) OVER running,
+    SUM(response_time) OVER running,
+    SUM(is_correct) OVER (PARTITION BY session_id ORDER BY seq ROWS 4 PRECEDING),
+    LEAD(difficulty) OVER (PARTITION BY session_id ORDER BY seq),
+    LEAD(is_correct) OVER (PARTITION BY session_id ORDER BY seq)
+FROM answers
+WHERE session_id >= ? AND (? IS NULL OR session_id < ?)
+WINDOW running AS (PARTITION BY session_id ORDER BY seq ROWS UNBOUNDED PRECEDING)
+ORDER BY session_id, seq
+"""
+
+
+def max_rss_mb():
+    """Peak resident memory of this process and of its largest child (MB)"""
+    # ru_maxrss is KB on Linux, bytes on macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale
+    return round(own / 2 ** 20, 1), round(children / 2 ** 20, 1)
+
+
+def is_validation_session(session_id, validation_percent):
+    return zlib.crc32(session_id.encode()) % 100 < validation_percent
+
+
+def session_ranges(db_path, shards):
+    """Split the logged sessions into at most ``shards`` [start, end) id ranges"""
+    conn = sqlite3.connect(db_path)
+    try:
+        n_sessions = conn.execute('SELECT COUNT(DISTINCT session_id) FROM answers').fetchone()[0]
+        if not n_sessions:
+            return []
+        shards = max(1, min(shards, n_sessions))
+        bounds = []
+        for k in range(shards):
+            row = conn.execute(
+                'SELECT DISTINCT session_id FROM answers ORDER BY session_id LIMIT 1 OFFSET ?',
+                (k * n_sessions // shards,)
+            ).fetchone()
+            bounds.append(row[0])
+    finally:
+        conn.close()
+    return [(bounds[k], bounds[k + 1] if k + 1 < len(bounds) else None) for k in range(len(bounds))]
+
+
+def featurize(counts, split, n, correct, time_sum, streak, next_level, next_correct):
+    """Bin one chunk of feature rows into ``counts`` (split x acc x time x streak x label)"""
+    keep = (n >= MIN_ANSWERS) & (next_level >= 0)
+    if not keep.any():
+        return
+    n, correct, time_sum, streak = n[keep], correct[keep], time_sum[keep], streak[keep]
+    next_level, next_correct = next_level[keep], next_correct[keep]
+    split = split[keep]
+    
+    # Same arithmetic as PerformanceTracker.get_summary + _ml_based_adapt
+    accuracy_rate = np.round(correct / n * 100, 2) / 100
+    avg_time_normalized = np.minimum(np.round(time_sum / n, 2) / 30, 1)
+    
+    # Label: the level the child handled next (one below it if they missed)
+    label = np.where(next_correct == 1, next_level, np.maximum(next_level - 1, 0))
+    
+    acc_bin = np.rint(accuracy_rate * 100).astype(np.intp)
+    time_bin = np.rint(avg_time_normalized * 100).astype(np.intp)
+    streak_bin = np.clip(streak, 0, STREAK_BINS - 1).astype(np.intp)
+    cells = np.ravel_multi_index((split, acc_bin, time_bin, streak_bin, label), counts.shape)
+    counts += np.bincount(cells, minlength=counts.size).reshape(counts.shape)
+
+
+def process_shard(args):
+    """Worker: stream one session range and return its (train, validation) count tables"""
+    db_path, start, end, chunk_size, validation_percent = args
+    counts = np.zeros((2, ACCURACY_BINS, TIME_BINS, STREAK_BINS, len(LEVELS)), dtype=np.int64)
+    level_code = {level: code for code, level in enumerate(LEVELS)}
+    split_cache = {}
+    rows_read = 0
+    
+    conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+    try:
+        cursor = conn.execute(FEATURE_QUERY, (start, end, end))
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            rows_read += len(rows)
+            session_ids, n, correct, time_sum, streak, next_level, next_correct = zip(*rows)
+            
+            split = np.empty(len(rows), dtype=np.intp)
+            for i, session_id in enumerate(session_ids):
+                value = split_cache.get(session_id)
+                if value is None:
+                    if len(split_cache) > 100_000:
+                        split_cache.clear()
+                    value = split_cache[session_id] = int(
+                        is_validation_session(session_id, validation_percent)
+                    )
+                split[i] = value
+            
+            featurize(
+                counts,
+                split,
+                np.array(n, dtype=np.float64),
+                np.array(correct, dtype=np.float64),
+                np.array(time_sum, dtype=np.float64),
+                np.array(streak, dtype=np.int64),
+                np.array([level_code.get(level, -1) for level in next_level], dtype=np.intp),
+                np.array([-1 if c is None else c for c in next_correct], dtype=np.int64),
+            )
+    finally:
+        conn.close()
+    return counts, rows_read
+
+
+def table_to_training_set(counts):
+    """Non-empty cells of a count table as (X, y, sample_weight)"""
+    acc_bin, time_bin, streak_bin, label = np.nonzero(counts)
+    X = np.column_stack([acc_bin / 100, time_bin / 100, streak_bin]).astype(np.float64)
+    return X, label, counts[acc_bin, time_bin, streak_bin, label].astype(np.float64)
+
+
+def weighted_accuracy(model, counts):
+    X, y, weight = table_to_training_set(counts)
+    if not weight.sum():
+        return None
+    return float(np.average(model.predict(X) == y, weights=weight))
+
+
+def train(db_path, version=None, workers=None, chunk_size=100_000, max_depth=4,
+          validation_percent=10, activate=False, model_dir=None):
+    """Run the pipeline and return a report dict (timings, memory, accuracy, artifact)"""
+    from sklearn.tree import DecisionTreeClassifier
+    from model_registry import ModelRegistry, get_registry
+    
+    workers = workers or os.cpu_count() or 1
+    version = version or time.strftime('tree-%Y%m%d-%H%M%S')
+    stages = {}
+    
+    def finish_stage(name, started, **extra):
+        own, children = max_rss_mb()
+        stages[name] = dict(
+            seconds=round(time.perf_counter() - started, 3),
+            peak_rss_mb=own, peak_worker_rss_mb=children, **extra
+        )
+    
+    started = time.perf_counter()
+    ranges = session_ranges(db_path, workers * 4)
+    finish_stage('partition', started, shards=len(ranges))
+    
+    started = time.perf_counter()
+    counts = np.zeros((2, ACCURACY_BINS, TIME_BINS, STREAK_BINS, len(LEVELS)), dtype=np.int64)
+    rows_read = 0
+    jobs = [(db_path, start, end, chunk_size, validation_percent) for start, end in ranges]
+    if workers == 1 or len(jobs) <= 1:
+        results = map(process_shard, jobs)
+        for shard_counts, shard_rows in results:
+            counts += shard_counts
+            rows_read += shard_rows
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for shard_counts, shard_rows in pool.map(process_shard, jobs):
+                counts += shard_counts
+                rows_read += shard_rows
+    finish_stage('featurize', started, answers=rows_read,
+                 answers_per_second=round(rows_read / max(time.perf_counter() - started, 1e-9)))
+    
+    started = time.perf_counter()
+    X, y, weight = table_to_training_set(counts[0])
+    if not len(y):
+        raise ValueError(f'No training examples in {db_path} (need sessions with > {MIN_ANSWERS} answers)')
+    model = DecisionTreeClassifier(max_depth=max_depth, random_state=42)
+    model.fit(X, y, sample_weight=weight)
+    finish_stage('fit', started, distinct_rows=len(y), examples=int(weight.sum()))
+    
+    started = time.perf_counter()
+    registry = ModelRegistry(model_dir) if model_dir else get_registry()
+    path = registry.save(version, model)
+    report = {
+        'version': version,
+        'artifact': path,
+        'source': os.path.abspath(db_path),
+        'features': ['accuracy_rate', 'avg_response_time_normalized', 'consecutive_correct'],
+        'max_depth': max_depth,
+        'train_accuracy': weighted_accuracy(model, counts[0]),
+        'validation_accuracy': weighted_accuracy(model, counts[1]),
+        'validation_examples': int(counts[1].sum()),
+        'stages': stages,
+    }
+    if activate:
+        registry.activate(version, persist=True)
+    finish_stage('save', started)
+    with open(os.path.splitext(path)[0] + '.json', 'w') as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Train the difficulty model from a logged answer database')
+    parser.add_argument('db', help='SQLite answer log (MATH_ADAPTIVE_STORE database)')
+    parser.add_argument('--version', help='artifact version name (default: tree-<timestamp>)')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk-size', type=int, default=100_000)
+    parser.add_argument('--max-depth', type=int, default=4)
+    parser.add_argument('--validation-percent', type=int, default=10)
+    parser.add_argument('--model-dir', help='artifact folder (default: the registry folder)')
+    parser.add_argument('--activate', action='store_true', help='make this version the active model')
+    args = parser.parse_args(argv)
+    
+    report = train(
+        args.db, version=args.version, workers=args.workers, chunk_size=args.chunk_size,
+        max_depth=args.max_depth, validation_percent=args.validation_percent,
+        activate=args.activate, model_dir=args.model_dir
+    )
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()